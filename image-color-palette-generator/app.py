@@ -19,25 +19,47 @@ PIPELINE: FROM PIXELS TO PALETTE
    - Map the clusters to their percentage of the total pixel count.
    - Convert the RGB centroids into Web-friendly HEX codes.
    - Return a sorted JSON list to the frontend for display.
+
+The clustering itself lives in palette.py so it can be reused without Flask.
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import (Flask, Request, Response, current_app, render_template, request, jsonify, send_from_directory,
+                   stream_with_context)
 import os
 from werkzeug.utils import secure_filename  #Path Traversal Prevention
-from PIL import Image
-import numpy as np
-from sklearn.cluster import KMeans
-import uuid    #  Universally Unique Identifiers (UUIDs) generator
+import hashlib
+import json
+import shutil
+import tempfile
+from palette import (extract_dominant_colors, ALLOWED_EXTENSIONS, CLUSTER_MODES, DEFAULT_CLUSTER_MODE,
+                     INGEST_MODES, COLOR_SPACES, DEFAULT_COLOR_SPACE, DEFAULT_MERGE_DELTA_E, FRAME_SAMPLING_MODES,
+                     DEFAULT_FRAME_SAMPLING, DEFAULT_FRAME_STRIDE, NUM_COLORS)
+from batch import iter_palettes, get_shared_executor
+from content_store import ContentStore, hash_stream
+from jobs import JobQueue, QueueFullError, FINAL_STATES
+from palette_cache import (PaletteCache, ModelStateCache, make_cache_key, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS,
+                           DEFAULT_MAX_MODEL_STATES)
 
 # ──────────────────────────────────────────────────────────────────────────
 # CONFIGURATION & CONSTANTS
 # ──────────────────────────────────────────────────────────────────────────
 
+class SpooledUploadRequest(Request):
+    """Request whose file uploads are kept in ONE spooled buffer.
+
+    Small uploads live in memory, large ones roll over to a temporary file,
+    so an upload near MAX_CONTENT_LENGTH is never held in RAM more than once.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=current_app.config['UPLOAD_SPOOL_MAX_MEMORY'], mode='rb+')
+
+
 app = Flask(__name__) #  Web Application Flask object.
+app.request_class = SpooledUploadRequest
 
 # Folder setup
 UPLOAD_FOLDER = os.path.join('static', 'uploads')   # Result: C:\Users\Hector\Project\static\uploads
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'gif'}
 
 # Blank Dictionary object where Flask stores its settings
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -46,8 +68,62 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB max upload
 # Create uploads folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Number of dominant colors to extract
-NUM_COLORS = 10
+# Clustering backend used when the request does not ask for one ('exact' or 'fast', see palette.py).
+# 'exact' keeps the original palettes; PALETTE_CLUSTER_MODE=fast opts the whole app into the faster backend.
+app.config['CLUSTER_MODE'] = os.environ.get('PALETTE_CLUSTER_MODE', DEFAULT_CLUSTER_MODE)
+
+# Ingest strategy: 'quality' (full decode + LANCZOS) or 'throughput' (JPEG draft decode + cheap resampling)
+app.config['INGEST_MODE'] = os.environ.get('PALETTE_INGEST_MODE', 'quality')
+
+# Perceptual clustering: 'rgb', 'lab' or 'oklab' (?space=), and the ΔE under which centroids merge (?merge=)
+app.config['COLOR_SPACE'] = DEFAULT_COLOR_SPACE
+app.config['MERGE_DELTA_E'] = DEFAULT_MERGE_DELTA_E
+
+# Colors per palette when the request has no ?n_colors=, and the largest value a request may ask for
+app.config['NUM_COLORS'] = NUM_COLORS
+app.config['MAX_NUM_COLORS'] = 32
+
+# Animated GIF/WebP: 'first', 'stride' or 'keyframes' (?frames=), and analyze every n-th frame (?stride=)
+app.config['FRAME_SAMPLING'] = DEFAULT_FRAME_SAMPLING
+app.config['FRAME_STRIDE'] = DEFAULT_FRAME_STRIDE
+
+# When True every /upload response carries per-stage 'timings' (also enabled per request with ?debug=1)
+app.config['PALETTE_DEBUG'] = False
+
+# Palette cache: in-memory LRU + optional SQLite tier (set PALETTE_CACHE_DB to a file path to enable it)
+app.config['PALETTE_CACHE_SIZE'] = DEFAULT_MAX_ENTRIES
+app.config['PALETTE_CACHE_TTL'] = DEFAULT_TTL_SECONDS               # Also the max age of files in static/uploads
+app.config['PALETTE_CACHE_DB'] = os.environ.get('PALETTE_CACHE_DB')
+app.config['UPLOAD_FOLDER_MAX_BYTES'] = 512 * 1024 * 1024           # 512 MB budget for static/uploads
+
+# Images whose prepared pixels and K-Means fits are kept for warm starts (?n_colors= changes, /palette/<id>)
+app.config['MODEL_STATE_CACHE_SIZE'] = DEFAULT_MAX_MODEL_STATES
+
+# Uploads up to this size stay in RAM, bigger ones are spooled to a temporary file by Werkzeug
+app.config['UPLOAD_SPOOL_MAX_MEMORY'] = 1024 * 1024                 # 1 MB
+
+# Async jobs (/upload?async=1): worker threads and the max number of queued + running jobs (429 beyond it)
+app.config['JOB_WORKERS'] = 2
+app.config['JOB_MAX_QUEUE_DEPTH'] = 32
+app.config['JOB_RETENTION_SECONDS'] = 10 * 60
+app.config['SSE_KEEPALIVE_SECONDS'] = 15
+
+job_queue = JobQueue(max_workers=app.config['JOB_WORKERS'],
+                     max_depth=app.config['JOB_MAX_QUEUE_DEPTH'],
+                     retention_seconds=app.config['JOB_RETENTION_SECONDS'])
+
+image_store = ContentStore(UPLOAD_FOLDER, '/static/uploads',
+                           max_bytes=app.config['UPLOAD_FOLDER_MAX_BYTES'],
+                           max_age_seconds=app.config['PALETTE_CACHE_TTL'])
+
+palette_cache = PaletteCache(max_entries=app.config['PALETTE_CACHE_SIZE'],
+                             ttl_seconds=app.config['PALETTE_CACHE_TTL'],
+                             db_path=app.config['PALETTE_CACHE_DB'])
+
+model_states = ModelStateCache(max_entries=app.config['MODEL_STATE_CACHE_SIZE'])
+
+# Options that change the prepared pixels kept in model_states (n_colors and merge do not)
+MODEL_STATE_OPTIONS = ('mode', 'ingest', 'color_space', 'frame_sampling', 'frame_stride')
 
 
 
@@ -64,88 +140,98 @@ def allowed_file(filename: str) -> bool:
     return ('.' in filename) and (filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS)
 
 
-def rgb_to_hex(rgb: tuple) -> str:
-    """Convert RGB tuple to HEX color code.
-
-    Args:
-        rgb (tuple): Tuple of (R, G, B) values (0-255).
+def read_palette_options() -> dict:
+    """Read the optional ?n_colors=, ?mode=, ?ingest=, ?space=, ?merge=, ?frames= and ?stride= query
+    parameters, falling back to app.config.
 
     Returns:
-        str: HEX color string (e.g., '#FF5733').
-    """
-    # x: Stands for Hexadecimal.
-    # 2: Minimum width
-    # 0: Padding. Use a zero instead A space.
-    return '#{:02x}{:02x}{:02x}'.format(int(rgb[0]), int(rgb[1]), int(rgb[2]))
+        dict: Keyword arguments for extract_dominant_colors()
+              (n_colors, mode, ingest, color_space, merge_delta_e, frame_sampling, frame_stride).
 
+    Raises:
+        ValueError: If a value is not supported.
+    """
+    try:
+        n_colors = int(request.args.get('n_colors', app.config['NUM_COLORS']))
+    except ValueError:
+        raise ValueError("n_colors must be a whole number") from None
+    if not 1 <= n_colors <= app.config['MAX_NUM_COLORS']:
+        raise ValueError(f"n_colors must be between 1 and {app.config['MAX_NUM_COLORS']}")
 
-def extract_dominant_colors(image_path: str, n_colors: int = NUM_COLORS):
-    """Extract dominant colors from an image using K-Means clustering.
+    mode = request.args.get('mode', app.config['CLUSTER_MODE'])
+    if mode not in CLUSTER_MODES:
+        raise ValueError(f"Unknown mode '{mode}'")
 
-    Logic:
-    1. Open and resize image to 200x200 (or keep aspect if smaller) for speed.
-    2. Convert to numpy array of RGB pixels.
-    3. Run KMeans on the pixel colors.
-    4. Calculate percentage of pixels belonging to each cluster.
-    5. Sort by dominance (percentage descending).
+    ingest = request.args.get('ingest', app.config['INGEST_MODE'])
+    if ingest not in INGEST_MODES:
+        raise ValueError(f"Unknown ingest mode '{ingest}'")
 
-    Why resize? High-resolution images can have 10M+ pixels → KMeans becomes slow.
-    Resizing preserves the overall color distribution very well for palette generation.
+    color_space = request.args.get('space', app.config['COLOR_SPACE'])
+    if color_space not in COLOR_SPACES:
+        raise ValueError(f"Unknown color space '{color_space}'")
 
-    Args:
-        image_path (str): Path to the uploaded image.
-        n_colors (int): Number of dominant colors to extract (default: 10).
+    try:
+        merge_delta_e = float(request.args.get('merge', app.config['MERGE_DELTA_E']))
+    except ValueError:
+        raise ValueError("merge must be a number") from None
+    if not 0 <= merge_delta_e < float('inf'):
+        raise ValueError("merge must be a ΔE value of 0 or more")
 
-    Returns:
-        list[dict]: List of dictionaries with 'hex', 'rgb', and 'percentage' keys.
-    """
-    # Open image and convert to RGB
-    img = Image.open(image_path).convert('RGB')
+    frame_sampling = request.args.get('frames', app.config['FRAME_SAMPLING'])
+    if frame_sampling not in FRAME_SAMPLING_MODES:
+        raise ValueError(f"Unknown frame sampling '{frame_sampling}'")
 
-    # Resize for performance while keeping aspect ratio roughly, thumbnail equally reduce the image size ratio
-    max_size = (200, 200)
-    img.thumbnail(max_size, Image.Resampling.LANCZOS)# Using LANCZOS for high quality.
+    try:
+        frame_stride = int(request.args.get('stride', app.config['FRAME_STRIDE']))
+    except ValueError:
+        raise ValueError("stride must be a whole number") from None
+    if frame_stride < 1:
+        raise ValueError("stride must be 1 or more")
 
-    # Convert to numpy array: shape (height, width, 3)
-    img_array = np.array(img)
+    return {'n_colors': n_colors, 'mode': mode, 'ingest': ingest, 'color_space': color_space, 'merge_delta_e': merge_delta_e,
+            'frame_sampling': frame_sampling, 'frame_stride': frame_stride}
 
-    # Reshape to (pixels, 3) for KMeans, -1 is a NumPy placeholder
-    pixels = img_array.reshape(-1, 3)
 
-    # *************************************** Key section of the function *******************************************
-    # Create the model:
-    # n_clusters=10: we want 10 final colors.
-    # n_init=10: runs the 'finding' process 10 times to pick the best/most accurate result (where pixels were closest to their centers).
-    # random_state=42 ensures the 'random' starts are the same every time we run the code.
-    kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10) #Object Class Instance
+def palette_cache_key(digest: str, options: dict) -> str:
+    """Cache key for an image hash and the options from read_palette_options()."""
+    return make_cache_key(digest, options['n_colors'],
+                          *(str(options[name]) for name in sorted(options) if name != 'n_colors'))
 
-    # fit_predict assigns each pixel a 'Group ID' (0-9) based on which color center is closest.
-    labels = kmeans.fit_predict(pixels) # integers ID List for each pixel
 
-    # cluster_centers_ stores the average RGB color for each of those 10 groups (2D array that contains 10 RGB triplets).
-    centers = kmeans.cluster_centers_
-    # ***************************************************************************************************************
+def model_state_key(digest: str, options: dict) -> str:
+    """ModelStateCache key: only the options that change the prepared pixels (not n_colors or merge)."""
+    return ':'.join([digest, *(str(options[name]) for name in MODEL_STATE_OPTIONS)])
 
-    # Count pixels per cluster and calculate percentages
-    _, counts = np.unique(labels, return_counts=True)
-    # counts is a NumPy array, it divides every number inside the list individually
-    percentages = counts / len(labels) * 100
 
-    # Create list of color info and sort by percentage (most dominant first)
-    color_info = []
-    for i, center in enumerate(centers):
-        hex_color = rgb_to_hex(center)   # <====================== Helper Function
-        percentage = percentages[i]
-        color_info.append({
-            'hex': hex_color,
-            'rgb': tuple(map(int, center)), # tuple is needed because map returns a map object
-            'percentage': round(percentage, 2)
-        })
+def run_palette_job(stream, image_id: str, cache_key: str, options: dict, want_timeline: bool = False,
+                    model_state: dict | None = None, progress_callback=None) -> dict:
+    """Body of an async palette job (runs on a JobQueue worker thread).
 
-    # Sort by percentage
-    color_info.sort(key=lambda x: x['percentage'], reverse=True)
+    Args:
+        stream: The job's own spooled copy of the upload. Closed when the job ends.
+        image_id (str): SHA-256 of the uploaded bytes.
+        cache_key (str): Palette cache key for this image/settings combination.
+        options (dict): read_palette_options() result.
+        want_timeline (bool): Also return one palette per sampled frame.
+        model_state (dict | None): This job's ModelStateCache.checkout() state, for warm starts.
+        progress_callback (Callable[[int, str], None] | None): Supplied by JobQueue.
 
-    return color_info # Ascending List of Dictionaries
+    Returns:
+        dict: {'image_id', 'colors', 'warm_start', ['timeline']} (becomes the job result).
+    """
+    try:
+        timeline = [] if want_timeline else None
+        model_state = model_state if model_state is not None else {}
+        colors = extract_dominant_colors(stream, frame_timeline=timeline, model_state=model_state,
+                                         progress_callback=progress_callback, **options)
+        model_states.store(model_state_key(image_id, options), model_state)
+        palette_cache.put(cache_key, colors)
+        result = {'image_id': image_id, 'colors': colors, 'warm_start': model_state['warm_start']}
+        if timeline is not None:
+            result['timeline'] = timeline
+        return result
+    finally:
+        stream.close()
 
 
 # ──────────────────────────────────────────────────────────────────────────
@@ -166,14 +252,28 @@ def upload_image():
     Triggered by: index.html -> JavaScript fetch('/upload', {method: 'POST'})
 
     Data Flow:
-    1. IN: Receives 'multipart/form-data' containing the image file.
+    1. IN: Receives 'multipart/form-data' containing the image file
+           (and optional ?n_colors=<1-32>, ?mode=exact|fast, ?ingest=quality|throughput, ?space=rgb|lab|oklab, ?merge=<ΔE>,
+           ?frames=first|stride|keyframes, ?stride=<n>, ?timeline=1, ?preview=1, ?async=1, ?debug=1
+           query parameters).
     2. VALIDATION: Checks for file existence and allowed extensions.
-    3. SECURITY: Sanitizes filename and adds a UUID to prevent file collisions.
-    4. PROCESSING: Saves file to disk and calls extract_dominant_colors().
-    5. OUT: Returns a JSON object with:
+    3. HASH: Computes the SHA-256 of the upload stream block by block (no extra copy in RAM).
+    4. CACHE: A repeat upload of the same bytes returns the cached palette without clustering.
+    5. PROCESSING: Otherwise decodes the stream directly with extract_dominant_colors().
+    6. STORAGE: Only with ?preview=1, the file is saved to the content-addressed store (content_store.py).
+    7. OUT: Returns a JSON object with:
        - success (bool)
-       - image_url (str) -> Path used by index.html to display the image.
+       - image_id (str) -> SHA-256 of the uploaded bytes.
+       - image_url (str) -> Only with ?preview=1: path of the stored copy.
        - colors (list) -> The extracted color palette data.
+       - cached (bool) -> True when the palette came from the cache.
+       - warm_start (bool) -> True when K-Means reused the prepared pixels and centroids of an
+         earlier request for the same image (e.g. another ?n_colors=).
+       - timeline (list) -> Only with ?timeline=1: {'frame', 'duration_ms', 'colors'} per sampled frame
+         of an animated GIF/WebP (a single entry for a still image).
+       With ?async=1 (and no cached palette) it returns 202 with job_id / status_url / events_url
+       instead, or 429 when the job queue is full.
+       - timings (dict) -> Only in debug mode: decode/resize/cluster/format milliseconds.
     """
 
     # Flask parses the incoming 'multipart/form-data' and stores it in request.files dictionary-like object.
@@ -188,42 +288,261 @@ def upload_image():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400 # JavaScript cannot read Python dictionaries
 
+    # Optional clustering options, e.g. /upload?n_colors=5&mode=exact&ingest=throughput&space=lab&merge=5
+    try:
+        options = read_palette_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Per-stage timings in the response (decode, resize, cluster, format)
+    timings = {} if (app.config['PALETTE_DEBUG'] or request.args.get('debug') == '1') else None
+
+    # The analyzer reads straight from the upload stream. The image is only written
+    # to static/uploads when the client asks for a preview URL (?preview=1).
+    want_preview = request.args.get('preview') == '1'
+
+    # ?timeline=1 → also one palette per sampled frame (always computed, the cache only holds overall palettes)
+    timeline = [] if request.args.get('timeline') == '1' else None
+
+    # ?async=1 → answer 202 with a job id at once, poll /jobs/<id> or listen on /jobs/<id>/events
+    want_async = request.args.get('async') == '1'
+
     if file and allowed_file(file.filename):    # <====================== Helper Function
 
-        # Secure the filename and add unique ID to prevent collisions
-        filename = secure_filename(file.filename)
-        unique_id = str(uuid.uuid4())[:8]
+        # file.stream is the spooled upload itself: hash it in blocks instead of file.read()
+        extension = secure_filename(file.filename).rsplit('.', 1)[1].lower()
+        stream = file.stream
+        digest = hash_stream(stream)
 
-        secure_name = f"{unique_id}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_name)
+        # Repeat upload of the same bytes → skip the K-Means run
+        cache_key = palette_cache_key(digest, options)
+        colors = palette_cache.get(cache_key) if timeline is None else None
+        cached = colors is not None
 
-        try:
-            file.save(filepath)
+        # Prepared pixels and earlier fits of this image: another n_colors warm-starts K-Means
+        # (a copy per request: the shared entry is only updated through store())
+        model_state = model_states.checkout(model_state_key(digest, options)) if not cached else {}
 
-            # Extract dominant colors
-            colors = extract_dominant_colors(filepath)      # <====================== Helper Function
+        if want_async and not cached:
+            return enqueue_palette_job(stream, digest, extension, cache_key, options, want_preview,
+                                       want_timeline=timeline is not None, model_state=model_state)
 
-            # Return relative URL for the uploaded image based on the location of the running Flask app
-            image_url = f"/static/uploads/{secure_name}"
+        try:
+            # Extract dominant colors
+            if not cached:
+                colors = extract_dominant_colors(stream, timings=timings,      # <====================== Helper Function
+                                                 frame_timeline=timeline, model_state=model_state, **options)
+                model_states.store(model_state_key(digest, options), model_state)
+                palette_cache.put(cache_key, colors)
 
             # Convert the Python dictionary into a JSON string and send it to the browser.
             # This is a temporary message for the frontend, NOT a global app configuration.
             # Data send to index.html
-            return jsonify({
+            response = {
                 'success': True,
-                'image_url': image_url,
-                'colors': colors
-            })
+                'image_id': digest,
+                'colors': colors,
+                'cached': cached,
+                'warm_start': model_state.get('warm_start', False),
+            }
+
+            # Relative URL of the stored copy (deduplicated: the same bytes are only stored once)
+            if want_preview:
+                response['image_url'] = image_store.persist(stream, digest, extension)
+
+            if timeline is not None:
+                response['timeline'] = timeline
+            if timings is not None:
+                response['timings'] = timings
+            return jsonify(response)
 
         except Exception as e:
-            # Clean up file if processing fails
-            if os.path.exists(filepath):
-                os.remove(filepath)
             return jsonify({'error': f'Processing error: {str(e)}'}), 500
 
     return jsonify({'error': 'File type not allowed'}), 400
 
 
+def enqueue_palette_job(stream, digest: str, extension: str, cache_key: str, options: dict, want_preview: bool,
+                        want_timeline: bool = False, model_state: dict | None = None):
+    """Hand an upload over to the async job queue.
+
+    The request's upload stream dies with the request, so the job gets its own
+    spooled copy (in RAM if small, else a temporary file).
+
+    Returns:
+        tuple[Response, int]: 202 with the job URLs, or 429 when the queue is full.
+    """
+    job_stream = tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_MEMORY'])
+    stream.seek(0)
+    shutil.copyfileobj(stream, job_stream)
+    job_stream.seek(0)
+
+    try:
+        job = job_queue.submit(run_palette_job, job_stream, digest, cache_key, options, want_timeline,
+                               model_state)
+    except QueueFullError:
+        job_stream.close()
+        response = jsonify({'error': 'Too many images are being analyzed, please retry shortly.'})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+
+    body = {
+        'success': True,
+        'job_id': job.id,
+        'image_id': digest,
+        'status_url': f"/jobs/{job.id}",
+        'events_url': f"/jobs/{job.id}/events",
+    }
+    if want_preview:
+        body['image_url'] = image_store.persist(stream, digest, extension)
+    return jsonify(body), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Polling endpoint: current status, progress (0-100) and, once done, the result."""
+    snapshot = job_queue.snapshot(job_id)
+    if snapshot is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(snapshot)
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent-Events stream of a job's progress.
+
+    Sends a 'progress' event on every change and a final 'done' event
+    (status 'done' or 'failed') before closing. Comment lines keep idle
+    connections alive through proxies.
+
+    Browser usage:
+        const events = new EventSource(`/jobs/${jobId}/events`);
+        events.addEventListener('done', e => { showResults(JSON.parse(e.data).result); events.close(); });
+    """
+    if job_queue.snapshot(job_id) is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+
+    keepalive = app.config['SSE_KEEPALIVE_SECONDS']
+
+    def generate():
+        version = -1
+        while True:
+            new_version, snapshot = job_queue.wait_for_change(job_id, version, timeout=keepalive)
+            if snapshot is None:
+                yield "event: done\ndata: {\"status\": \"expired\"}\n\n"
+                return
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+
+            version = new_version
+            event = 'done' if snapshot['status'] in FINAL_STATES else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+            if event == 'done':
+                return
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'     # Tell nginx not to buffer the stream
+    return response
+
+
+@app.route('/upload/batch', methods=['POST'])
+def upload_batch():
+    """Extract palettes for many images in one request.
+
+    Triggered by: fetch('/upload/batch', {method: 'POST'}) with every image appended as 'files'.
+
+    Data Flow:
+    1. IN: 'multipart/form-data' with one or more 'files' parts (same options as /upload).
+    2. CACHE: Images whose palette is already cached are answered immediately.
+    3. PROCESSING: The rest are fanned out over the shared process pool (batch.py).
+    4. OUT: Newline-delimited JSON (application/x-ndjson), one line per image as soon
+       as it finishes: {"name", "colors", "cached"} or {"name", "error"}.
+       Nothing is saved to static/uploads.
+    """
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({'error': 'No files part'}), 400
+
+    try:
+        options = read_palette_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Read the uploads now: the worker processes need plain bytes, not FileStorage objects
+    rejected, cached, to_analyze = [], [], []
+    for file in files:
+        if not allowed_file(file.filename):
+            rejected.append({'name': file.filename, 'error': 'File type not allowed'})
+            continue
+        data = file.read()
+        cache_key = palette_cache_key(hashlib.sha256(data).hexdigest(), options)
+        colors = palette_cache.get(cache_key)
+        if colors is not None:
+            cached.append({'name': file.filename, 'colors': colors, 'cached': True})
+        else:
+            to_analyze.append((cache_key, file.filename, data))
+
+    def generate():
+        for result in rejected + cached:
+            yield json.dumps(result) + '\n'
+
+        # Workers get the list index as their label, so duplicate file names can't be confused
+        items = ((str(index), data) for index, (_, _, data) in enumerate(to_analyze))
+        for result in iter_palettes(items, get_shared_executor(), **options):
+            cache_key, result['name'], _ = to_analyze[int(result['name'])]
+            if 'colors' in result:
+                palette_cache.put(cache_key, result['colors'])
+                result['cached'] = False
+            yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.route('/palette/<image_id>')
+def palette_for_image(image_id):
+    """Re-extract the palette of an already uploaded image with other settings, without re-uploading it.
+
+    Typical use: the UI switches between 5, 8, 10 and 16 colors → /palette/<image_id>?n_colors=16.
+    Accepts the same query options as /upload. The image must have been analyzed recently with the
+    same decode settings (mode, ingest, space, frames, stride), so its prepared pixels are still in
+    memory; K-Means then warm-starts from the earlier centroids.
+
+    Returns:
+        JSON {success, image_id, colors, cached, warm_start}, or 404 if the image is not in memory.
+    """
+    try:
+        options = read_palette_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    cache_key = palette_cache_key(image_id, options)
+    colors = palette_cache.get(cache_key)
+    if colors is not None:
+        return jsonify({'success': True, 'image_id': image_id, 'colors': colors, 'cached': True,
+                        'warm_start': False})
+
+    model_state = model_states.checkout(model_state_key(image_id, options))
+    if 'prepared' not in model_state:
+        return jsonify({'error': 'Unknown image_id for these settings, upload the image again'}), 404
+
+    try:
+        colors = extract_dominant_colors(None, model_state=model_state, **options)
+    except Exception as e:
+        return jsonify({'error': f'Processing error: {str(e)}'}), 500
+
+    palette_cache.put(cache_key, colors)
+    return jsonify({'success': True, 'image_id': image_id, 'colors': colors, 'cached': False,
+                    'warm_start': model_state['warm_start']})
+
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Return the palette cache hit/miss counters and tier sizes as JSON."""
+    return jsonify({**palette_cache.stats(), 'model_states': len(model_states)})
+
+
 @app.route('/static/uploads/<filename>')
 def uploaded_file(filename):
     """
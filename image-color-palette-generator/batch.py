@@ -0,0 +1,197 @@
+"""
+BATCH PALETTE EXTRACTION
+------------------------
+Fans extract_dominant_colors() out over a ProcessPoolExecutor, because the
+K-Means step is CPU bound and threads would all wait on the same GIL.
+
+Used by:
+   - app.py → POST /upload/batch (streams one JSON line per finished image)
+   - the command line:
+
+        python batch.py path/to/catalog -o palettes.jsonl
+        python batch.py path/to/catalog -o palettes.csv --mode exact --workers 8
+
+Results are yielded in the order they FINISH, not the order they were
+submitted, and at most `max_in_flight` images are queued at once, so a folder
+of tens of thousands of images never sits in memory as pending futures.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from palette import (extract_dominant_colors, ALLOWED_EXTENSIONS, CLUSTER_MODES, DEFAULT_CLUSTER_MODE,
+                     INGEST_MODES, COLOR_SPACES, DEFAULT_COLOR_SPACE, DEFAULT_MERGE_DELTA_E, FRAME_SAMPLING_MODES,
+                     DEFAULT_FRAME_SAMPLING, DEFAULT_FRAME_STRIDE, NUM_COLORS)
+
+# One worker per core; K-Means already saturates a core on its own.
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Pending images per worker before we stop submitting and wait for results
+IN_FLIGHT_PER_WORKER = 4
+
+CSV_COLUMNS = ['name', 'rank', 'hex', 'r', 'g', 'b', 'percentage']
+
+_shared_executor = None
+
+
+def get_shared_executor() -> ProcessPoolExecutor:
+    """Return the process pool shared by all web requests (created on first use)."""
+    global _shared_executor
+    if _shared_executor is None:
+        _shared_executor = ProcessPoolExecutor(max_workers=DEFAULT_WORKERS)
+    return _shared_executor
+
+
+def analyze_image(name: str, source, n_colors: int = NUM_COLORS, **options) -> dict:
+    """Worker entry point: extract one palette and never raise.
+
+    Runs inside a worker process, so it must be a module-level function (picklable).
+
+    Args:
+        name (str): Label echoed back in the result (file name or relative path).
+        source (str | bytes): File path, or the raw bytes of an uploaded file.
+        n_colors (int): Number of colors to extract.
+        **options: Other extract_dominant_colors() settings (mode, ingest, color_space, merge_delta_e,
+            frame_sampling, frame_stride).
+
+    Returns:
+        dict: {'name', 'colors'} on success, {'name', 'error'} on failure.
+    """
+    try:
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        return {'name': name, 'colors': extract_dominant_colors(source, n_colors=n_colors, **options)}
+    except Exception as e:
+        return {'name': name, 'error': str(e)}
+
+
+def iter_palettes(items, executor, n_colors: int = NUM_COLORS, max_in_flight: int | None = None, **options):
+    """Analyze (name, source) pairs on a process pool and yield results as they finish.
+
+    Args:
+        items (Iterable[tuple[str, str | bytes]]): Images to analyze. Consumed lazily.
+        executor (concurrent.futures.Executor): Pool that runs analyze_image().
+        n_colors (int): Number of colors to extract.
+        max_in_flight (int | None): Cap on submitted-but-unfinished images.
+        **options: Passed to analyze_image() (mode, ingest, color_space, merge_delta_e, frame_sampling,
+            frame_stride).
+
+    Yields:
+        dict: analyze_image() results, in completion order.
+    """
+    if max_in_flight is None:
+        max_in_flight = IN_FLIGHT_PER_WORKER * getattr(executor, '_max_workers', DEFAULT_WORKERS)
+
+    items = iter(items)
+    pending = set()
+
+    while True:
+        # Top the queue up to the in-flight limit
+        for name, source in items:
+            pending.add(executor.submit(analyze_image, name, source, n_colors, **options))
+            if len(pending) >= max_in_flight:
+                break
+
+        if not pending:
+            return
+
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def find_images(directory: str):
+    """Yield (relative_path, absolute_path) for every allowed image under directory, recursively."""
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.rsplit('.', 1)[-1].lower() in ALLOWED_EXTENSIONS:
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory), path
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# COMMAND LINE
+# ──────────────────────────────────────────────────────────────────────────
+
+def write_results(results, output, fmt: str) -> tuple:
+    """Write palettes to an open text file as JSONL or CSV, one record at a time.
+
+    Args:
+        results (Iterable[dict]): analyze_image() results.
+        output (TextIO): Destination file.
+        fmt (str): 'jsonl' or 'csv'.
+
+    Returns:
+        tuple[int, int]: (images written, images that failed).
+    """
+    written = failed = 0
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(output)
+        writer.writerow(CSV_COLUMNS)
+
+    for result in results:
+        if 'error' in result:
+            failed += 1
+            print(f"⚠️ {result['name']}: {result['error']}", file=sys.stderr)
+            continue
+
+        if writer is not None:
+            for rank, color in enumerate(result['colors'], start=1):
+                writer.writerow([result['name'], rank, color['hex'], *color['rgb'], color['percentage']])
+        else:
+            output.write(json.dumps(result) + '\n')
+
+        output.flush()   # Results are usable while the batch is still running
+        written += 1
+
+    return written, failed
+
+
+def main(argv=None):
+    """Parse arguments and palettize a whole directory tree."""
+    parser = argparse.ArgumentParser(description="Extract color palettes for every image in a directory.")
+    parser.add_argument('directory', help="Folder to scan (recursively)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="Output file (.jsonl or .csv). Default: JSONL on stdout")
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help="Output format (default: from the output extension, else jsonl)")
+    parser.add_argument('-n', '--n-colors', type=int, default=NUM_COLORS, help="Colors per image (default: 10)")
+    parser.add_argument('--mode', choices=CLUSTER_MODES, default=DEFAULT_CLUSTER_MODE, help="Clustering backend")
+    parser.add_argument('--ingest', choices=INGEST_MODES, default='throughput',
+                        help="Decode strategy (default: throughput)")
+    parser.add_argument('--space', choices=COLOR_SPACES, default=DEFAULT_COLOR_SPACE,
+                        help="Color space K-Means clusters in (default: rgb)")
+    parser.add_argument('--merge', type=float, default=DEFAULT_MERGE_DELTA_E,
+                        help="Merge colors closer than this ΔE (default: 0, off)")
+    parser.add_argument('--frames', choices=FRAME_SAMPLING_MODES, default=DEFAULT_FRAME_SAMPLING,
+                        help="Which frames of animated GIF/WebP files to analyze (default: stride)")
+    parser.add_argument('--stride', type=int, default=DEFAULT_FRAME_STRIDE,
+                        help="Analyze every n-th frame of animated files (default: 1)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = iter_palettes(find_images(args.directory), executor, n_colors=args.n_colors,
+                                mode=args.mode, ingest=args.ingest, color_space=args.space,
+                                merge_delta_e=args.merge, frame_sampling=args.frames, frame_stride=args.stride)
+
+        if args.output == '-':
+            written, failed = write_results(results, sys.stdout, fmt)
+        else:
+            with open(args.output, 'w', newline='', encoding='utf-8') as output:
+                written, failed = write_results(results, output, fmt)
+
+    print(f"✅ {written} palettes written, {failed} failed.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
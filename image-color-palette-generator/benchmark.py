@@ -0,0 +1,547 @@
+"""
+PALETTE BENCHMARK SUITE
+-----------------------
+Four commands:
+
+   - modes  : p50 / p99 latency of extract_dominant_colors() for every clustering
+              backend on photo-like JPEGs of 0.5, 4 and 16 megapixels.
+   - suite  : builds a seeded synthetic corpus (gradients, photo-like noise, flat
+              graphics; 64 px up to 8K wide), times every pipeline stage
+              (decode / resize / cluster / format) per image and mode, then drives
+              POST /upload through Flask's test client at a chosen concurrency,
+              with the palette cache disabled (cold) and primed (warm).
+              Everything is written to one JSON file.
+   - compare: diffs two suite JSON files and flags regressions (exit code 1).
+   - warm   : cold extract vs warm-started re-extraction (model_state) for the
+              palette sizes the UI offers (5, 8, 10, 16 colors).
+
+The corpus is regenerated from the seed on every run, so two runs on different
+machines (or different commits) measure exactly the same pixels.
+
+Usage:
+    python benchmark.py modes --runs 20 --sizes 0.5 4
+    python benchmark.py suite -o baseline.json
+    python benchmark.py suite -o after.json --concurrency 8 --edges 64 512 2048
+    python benchmark.py compare baseline.json after.json --threshold 0.10
+    python benchmark.py warm --sizes 0.5 4
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+from palette import extract_dominant_colors, CLUSTER_MODES, DEFAULT_CLUSTER_MODE, INGEST_MODES, DEFAULT_INGEST_MODE
+
+DEFAULT_SIZES_MP = (0.5, 4, 16)
+DEFAULT_RUNS = 20
+ASPECT_RATIO = 4 / 3
+
+# Suite corpus: every kind at every width (16:9, so 7680 px is 8K UHD)
+CORPUS_KINDS = ('gradient', 'photo', 'flat')
+CORPUS_EDGES = (64, 512, 2048, 7680)
+CORPUS_ASPECT_RATIO = 16 / 9
+DEFAULT_SEED = 1234
+
+# Flat graphics: background plus this many solid rectangles
+FLAT_SHAPES = 12
+
+# Rows generated per step, so an 8K image never needs more than its own uint8 buffer plus one block
+ROW_BLOCK = 256
+
+# Suite defaults
+SUITE_RUNS = 5
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS = 16
+
+# compare: a metric regresses when it is this much worse (fraction) AND, for times, this many ms worse
+DEFAULT_THRESHOLD = 0.10
+NOISE_FLOOR_MS = 2.0
+
+STAGES = ('decode', 'resize', 'cluster', 'format')
+
+# Palette sizes the UI switches between ('warm' command)
+UI_COLOR_COUNTS = (5, 8, 10, 16)
+
+
+def make_test_image(megapixels: float, path: str, seed: int = 42):
+    """Write a photo-like JPEG (smooth gradients plus noise) of the requested size.
+
+    Args:
+        megapixels (float): Target size in millions of pixels.
+        path (str): Destination file path.
+        seed (int): Seed for the noise generator, so every run sees the same image.
+    """
+    height = int((megapixels * 1_000_000 / ASPECT_RATIO) ** 0.5)
+    width = int(height * ASPECT_RATIO)
+
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    red = 255 * x / width
+    green = 255 * y / height
+    blue = 127 + 127 * np.sin((x + y) / 150)
+    img = np.stack([red, green, blue], axis=-1) + rng.normal(0, 12, (height, width, 3))
+
+    Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(path, quality=90)
+
+
+def percentile_ms(samples: list, percentile: float) -> float:
+    """Return the given percentile of a list of second timings, in milliseconds."""
+    return float(np.percentile(samples, percentile)) * 1000
+
+
+def run_benchmark(sizes_mp, runs: int, ingest: str = DEFAULT_INGEST_MODE):
+    """Time every clustering mode on every image size and print a results table.
+
+    Args:
+        sizes_mp (Iterable[float]): Image sizes in megapixels.
+        runs (int): Timed repetitions per (size, mode) pair.
+        ingest (str): Decode strategy used for every run.
+    """
+    print(f"{'size':>8} {'mode':>6} {'p50 ms':>10} {'p99 ms':>10}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for megapixels in sizes_mp:
+            path = os.path.join(tmp_dir, f"bench_{megapixels}mp.jpg")
+            make_test_image(megapixels, path)
+
+            for mode in CLUSTER_MODES:
+                extract_dominant_colors(path, mode=mode, ingest=ingest)  # Warm-up (imports, file cache)
+
+                timings = []
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    extract_dominant_colors(path, mode=mode, ingest=ingest)
+                    timings.append(time.perf_counter() - start)
+
+                print(f"{megapixels:>6}MP {mode:>6} "
+                      f"{percentile_ms(timings, 50):>10.1f} {percentile_ms(timings, 99):>10.1f}")
+
+
+def run_warm_start_benchmark(sizes_mp, runs: int, mode: str, ingest: str = DEFAULT_INGEST_MODE):
+    """Compare a cold extraction per palette size with warm-started re-extractions of the same image.
+
+    Cold: every n_colors decodes the image and fits K-Means from scratch.
+    Warm: the first request fills a model_state; the others reuse its pixels and centroids.
+
+    Args:
+        sizes_mp (Iterable[float]): Image sizes in megapixels.
+        runs (int): Timed repetitions of the whole 5 → 8 → 10 → 16 sequence.
+        mode (str): Clustering mode.
+        ingest (str): Decode strategy.
+    """
+    print(f"{'size':>8} {'n':>4} {'cold p50 ms':>12} {'warm p50 ms':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for megapixels in sizes_mp:
+            path = os.path.join(tmp_dir, f"bench_{megapixels}mp.jpg")
+            make_test_image(megapixels, path)
+            extract_dominant_colors(path, mode=mode, ingest=ingest)   # Warm-up (imports, file cache)
+
+            cold = {n: [] for n in UI_COLOR_COUNTS}
+            warm = {n: [] for n in UI_COLOR_COUNTS}
+            for _ in range(runs):
+                for n_colors in UI_COLOR_COUNTS:
+                    start = time.perf_counter()
+                    extract_dominant_colors(path, n_colors=n_colors, mode=mode, ingest=ingest)
+                    cold[n_colors].append(time.perf_counter() - start)
+
+                model_state = {}
+                for n_colors in UI_COLOR_COUNTS:
+                    start = time.perf_counter()
+                    extract_dominant_colors(path, n_colors=n_colors, mode=mode, ingest=ingest,
+                                            model_state=model_state)
+                    warm[n_colors].append(time.perf_counter() - start)
+
+            for n_colors in UI_COLOR_COUNTS:
+                print(f"{megapixels:>6}MP {n_colors:>4} "
+                      f"{percentile_ms(cold[n_colors], 50):>12.1f} {percentile_ms(warm[n_colors], 50):>12.1f}")
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# SYNTHETIC CORPUS
+# ──────────────────────────────────────────────────────────────────────────
+
+def make_corpus_image(kind: str, width: int, seed: int = DEFAULT_SEED) -> Image.Image:
+    """Generate one deterministic corpus image.
+
+    Args:
+        kind (str): 'gradient' (smooth ramps), 'photo' (ramps plus sensor-like noise)
+            or 'flat' (a few solid shapes, like a logo or UI screenshot).
+        width (int): Width in pixels; the height follows CORPUS_ASPECT_RATIO.
+        seed (int): Seed for the shapes and the noise.
+
+    Returns:
+        Image.Image: RGB image.
+
+    Raises:
+        ValueError: If the kind is unknown.
+    """
+    if kind not in CORPUS_KINDS:
+        raise ValueError(f"Unknown corpus kind '{kind}'. Choose one of: {', '.join(CORPUS_KINDS)}")
+
+    height = max(1, round(width / CORPUS_ASPECT_RATIO))
+    rng = np.random.default_rng([seed, CORPUS_KINDS.index(kind), width])
+    img = np.empty((height, width, 3), dtype=np.uint8)
+
+    if kind == 'flat':
+        colors = rng.integers(0, 256, (FLAT_SHAPES + 1, 3), dtype=np.uint8)
+        img[:] = colors[0]
+        for color in colors[1:]:
+            left, right = np.sort(rng.integers(0, width, 2))
+            top, bottom = np.sort(rng.integers(0, height, 2))
+            img[top:bottom + 1, left:right + 1] = color
+        return Image.fromarray(img)
+
+    # Same picture at every size: the ramps and the sine wave scale with the width
+    x = np.arange(width, dtype=np.float32)
+    for top in range(0, height, ROW_BLOCK):
+        y = np.arange(top, min(top + ROW_BLOCK, height), dtype=np.float32)[:, None]
+        red = np.broadcast_to(255 * x / width, (len(y), width))
+        green = np.broadcast_to(255 * y / height, (len(y), width))
+        blue = 127 + 127 * np.sin((x + y) * (8 * np.pi / width))
+        block = np.stack([red, green, blue], axis=-1)
+        if kind == 'photo':
+            block += rng.normal(0, 12, block.shape).astype(np.float32)
+        img[top:top + len(y)] = np.clip(block, 0, 255)
+
+    return Image.fromarray(img)
+
+
+def build_corpus(folder: str, kinds=CORPUS_KINDS, edges=CORPUS_EDGES, seed: int = DEFAULT_SEED) -> list:
+    """Write the corpus to a folder: JPEG for gradients and photos, PNG for flat graphics.
+
+    Returns:
+        list[dict]: One {'name', 'kind', 'width', 'height', 'bytes', 'path'} per image.
+    """
+    corpus = []
+    for kind in kinds:
+        for width in edges:
+            img = make_corpus_image(kind, width, seed)
+            extension = 'png' if kind == 'flat' else 'jpg'
+            name = f"{kind}_{width}px.{extension}"
+            path = os.path.join(folder, name)
+            if extension == 'png':
+                img.save(path, optimize=False)
+            else:
+                img.save(path, quality=90)
+
+            corpus.append({'name': name, 'kind': kind, 'width': img.width, 'height': img.height,
+                           'bytes': os.path.getsize(path), 'path': path})
+    return corpus
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# SUITE
+# ──────────────────────────────────────────────────────────────────────────
+
+def summarize_ms(samples: list, prefix: str) -> dict:
+    """Return {'<prefix>_p50_ms', '<prefix>_p99_ms'} for a list of millisecond samples."""
+    return {f'{prefix}_p50_ms': round(float(np.percentile(samples, 50)), 3),
+            f'{prefix}_p99_ms': round(float(np.percentile(samples, 99)), 3)}
+
+
+def time_stages(image: dict, mode: str, ingest: str, runs: int) -> dict:
+    """Time extract_dominant_colors() stage by stage on one corpus image.
+
+    Returns:
+        dict: Result row with p50/p99 of the total and of every stage, in milliseconds.
+    """
+    extract_dominant_colors(image['path'], mode=mode, ingest=ingest)   # Warm-up (imports, file cache)
+
+    totals = []
+    stages = {stage: [] for stage in STAGES}
+    for _ in range(runs):
+        timings = {}
+        start = time.perf_counter()
+        extract_dominant_colors(image['path'], mode=mode, ingest=ingest, timings=timings)
+        totals.append((time.perf_counter() - start) * 1000)
+        for stage in STAGES:
+            stages[stage].append(timings.get(f'{stage}_ms', 0.0))
+
+    metrics = summarize_ms(totals, 'total')
+    for stage, samples in stages.items():
+        metrics.update(summarize_ms(samples, stage))
+
+    return {'key': f"stages/{image['name']}/{mode}/{ingest}", 'image': image['name'],
+            'mode': mode, 'ingest': ingest, 'runs': runs, 'metrics': metrics}
+
+
+@contextmanager
+def palette_cache_disabled(app_module):
+    """Swap app.py's palette cache and model-state cache for ones that never keep an entry.
+
+    Both must go: with the model states kept, every request after the first would reuse the
+    prepared pixels and fits of the image (a warm start), not measure the cold path.
+    """
+    from palette_cache import PaletteCache, ModelStateCache
+
+    original = app_module.palette_cache, app_module.model_states
+    app_module.palette_cache = PaletteCache(max_entries=0)
+    app_module.model_states = ModelStateCache(max_entries=0)
+    try:
+        yield
+    finally:
+        app_module.palette_cache, app_module.model_states = original
+
+
+def drive_upload(app_module, image: dict, query: str, concurrency: int, requests: int) -> dict:
+    """POST one image to /upload `requests` times from `concurrency` threads.
+
+    Every thread uses its own Flask test client; the app itself runs in-process.
+
+    Returns:
+        dict: {'latency_p50_ms', 'latency_p99_ms', 'requests_per_s', 'errors'}.
+    """
+    with open(image['path'], 'rb') as f:
+        data = f.read()
+
+    def post_once(_):
+        client = app_module.app.test_client()
+        start = time.perf_counter()
+        response = client.post(f'/upload{query}', data={'file': (io.BytesIO(data), image['name'])},
+                               content_type='multipart/form-data')
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(post_once, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    metrics = summarize_ms([latency for latency, _ in outcomes], 'latency')
+    metrics['requests_per_s'] = round(requests / elapsed, 3)
+    metrics['errors'] = sum(1 for _, status in outcomes if status != 200)
+    return metrics
+
+
+def run_http(corpus: list, ingest: str, concurrency: int, requests: int) -> list:
+    """Drive /upload for every corpus image, first with a cold cache, then a warm one.
+
+    Images over the app's MAX_CONTENT_LENGTH are reported as skipped.
+
+    Returns:
+        list[dict]: Result rows.
+    """
+    import app as app_module    # Imported here so 'modes' and 'compare' work without Flask
+
+    query = f'?ingest={ingest}'
+    max_bytes = app_module.app.config['MAX_CONTENT_LENGTH']
+    rows = []
+
+    for image in corpus:
+        for cache in ('cold', 'warm'):
+            row = {'key': f"http/{image['name']}/{ingest}/{cache}/c{concurrency}", 'image': image['name'],
+                   'ingest': ingest, 'cache': cache, 'concurrency': concurrency, 'requests': requests}
+            if max_bytes and image['bytes'] > max_bytes:
+                row['skipped'] = f"{image['bytes']} bytes is over MAX_CONTENT_LENGTH ({max_bytes})"
+            elif cache == 'cold':
+                with palette_cache_disabled(app_module):
+                    row['metrics'] = drive_upload(app_module, image, query, concurrency, requests)
+            else:
+                drive_upload(app_module, image, query, 1, 1)     # Prime the cache
+                row['metrics'] = drive_upload(app_module, image, query, concurrency, requests)
+            rows.append(row)
+            print(f"  {row['key']}: {row.get('metrics') or row['skipped']}", file=sys.stderr)
+
+    return rows
+
+
+def run_suite(output: str, kinds=CORPUS_KINDS, edges=CORPUS_EDGES, modes=CLUSTER_MODES,
+              ingest: str = DEFAULT_INGEST_MODE, runs: int = SUITE_RUNS, concurrency: int = DEFAULT_CONCURRENCY,
+              requests: int = DEFAULT_REQUESTS, seed: int = DEFAULT_SEED, http: bool = True) -> dict:
+    """Build the corpus, run the stage and HTTP benchmarks and write the JSON report.
+
+    Args:
+        output (str): JSON file to write.
+        kinds (Iterable[str]): Corpus kinds to include.
+        edges (Iterable[int]): Corpus widths in pixels.
+        modes (Iterable[str]): Clustering modes for the stage timings.
+        ingest (str): Decode strategy for every run.
+        runs (int): Timed runs per (image, mode) in the stage benchmark.
+        concurrency (int): Parallel clients in the HTTP benchmark.
+        requests (int): Requests per image and cache state in the HTTP benchmark.
+        seed (int): Corpus seed.
+        http (bool): False skips the HTTP benchmark.
+
+    Returns:
+        dict: The report that was written.
+    """
+    report = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'seed': seed,
+            'runs': runs,
+            'ingest': ingest,
+            'concurrency': concurrency,
+            'requests': requests,
+        },
+        'corpus': [],
+        'results': [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print("Building corpus...", file=sys.stderr)
+        corpus = build_corpus(tmp_dir, kinds, edges, seed)
+        report['corpus'] = [{k: v for k, v in image.items() if k != 'path'} for image in corpus]
+
+        print("Timing pipeline stages...", file=sys.stderr)
+        for image in corpus:
+            for mode in modes:
+                row = time_stages(image, mode, ingest, runs)
+                report['results'].append(row)
+                print(f"  {row['key']}: total p50 {row['metrics']['total_p50_ms']:.1f} ms", file=sys.stderr)
+
+        if http:
+            print(f"Driving /upload at concurrency {concurrency}...", file=sys.stderr)
+            report['results'].extend(run_http(corpus, ingest, concurrency, requests))
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {output}", file=sys.stderr)
+    return report
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# COMPARE
+# ──────────────────────────────────────────────────────────────────────────
+
+def compare_reports(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD,
+                    noise_floor_ms: float = NOISE_FLOOR_MS) -> list:
+    """Compare every metric present in both reports.
+
+    '*_ms' metrics regress when they grow by more than `threshold` (fraction) and by
+    more than `noise_floor_ms`; '*_per_s' metrics regress when they drop by more
+    than `threshold`. 'errors' regresses whenever it grows.
+
+    Returns:
+        list[dict]: {'key', 'metric', 'baseline', 'current', 'change', 'regression'} per metric.
+    """
+    baseline_rows = {row['key']: row.get('metrics') for row in baseline['results']}
+    comparisons = []
+
+    for row in current['results']:
+        old_metrics, new_metrics = baseline_rows.get(row['key']), row.get('metrics')
+        if not old_metrics or not new_metrics:
+            continue
+
+        for metric, new in new_metrics.items():
+            old = old_metrics.get(metric)
+            if old is None:
+                continue
+
+            change = (new - old) / old if old else 0.0
+            if metric.endswith('_ms'):
+                regression = change > threshold and new - old > noise_floor_ms
+            elif metric.endswith('_per_s'):
+                regression = change < -threshold
+            else:
+                regression = new > old
+
+            comparisons.append({'key': row['key'], 'metric': metric, 'baseline': old, 'current': new,
+                                'change': round(change, 4), 'regression': regression})
+
+    return comparisons
+
+
+def print_comparison(comparisons: list, show_all: bool = False):
+    """Print regressions (or every compared metric) as a table."""
+    rows = comparisons if show_all else [c for c in comparisons if c['regression']]
+    if rows:
+        print(f"{'key':<48} {'metric':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for c in rows:
+        flag = '  ⚠️ REGRESSION' if c['regression'] else ''
+        print(f"{c['key']:<48} {c['metric']:<18} {c['baseline']:>10.2f} {c['current']:>10.2f} "
+              f"{c['change']:>+8.1%}{flag}")
+
+    regressions = sum(1 for c in comparisons if c['regression'])
+    print(f"{len(comparisons)} metrics compared, {regressions} regression(s).")
+
+
+def main(argv=None):
+    """Parse arguments and run one of the benchmark commands."""
+    parser = argparse.ArgumentParser(description="Benchmark the palette generator.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    modes = commands.add_parser('modes', help="p50/p99 per clustering mode on photo-like JPEGs")
+    modes.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES_MP,
+                       help="Image sizes in megapixels (default: 0.5 4 16)")
+    modes.add_argument('--runs', type=int, default=DEFAULT_RUNS,
+                       help="Timed runs per size and mode (default: 20)")
+    modes.add_argument('--ingest', choices=INGEST_MODES, default=DEFAULT_INGEST_MODE,
+                       help="Decode strategy (default: quality)")
+
+    suite = commands.add_parser('suite', help="Corpus, stage timings and /upload load test → JSON")
+    suite.add_argument('-o', '--output', default='benchmark_results.json', help="JSON report path")
+    suite.add_argument('--kinds', nargs='+', choices=CORPUS_KINDS, default=CORPUS_KINDS,
+                       help="Corpus kinds (default: all)")
+    suite.add_argument('--edges', type=int, nargs='+', default=CORPUS_EDGES,
+                       help="Corpus widths in pixels (default: 64 512 2048 7680)")
+    suite.add_argument('--modes', nargs='+', choices=CLUSTER_MODES, default=CLUSTER_MODES,
+                       help="Clustering modes to time (default: all)")
+    suite.add_argument('--ingest', choices=INGEST_MODES, default=DEFAULT_INGEST_MODE,
+                       help="Decode strategy (default: quality)")
+    suite.add_argument('--runs', type=int, default=SUITE_RUNS, help="Timed runs per image and mode (default: 5)")
+    suite.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                       help="Parallel /upload clients (default: 4)")
+    suite.add_argument('--requests', type=int, default=DEFAULT_REQUESTS,
+                       help="/upload requests per image and cache state (default: 16)")
+    suite.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Corpus seed")
+    suite.add_argument('--no-http', action='store_true', help="Skip the /upload load test")
+
+    compare = commands.add_parser('compare', help="Flag regressions between two suite reports")
+    compare.add_argument('baseline', help="Earlier suite JSON")
+    compare.add_argument('current', help="Newer suite JSON")
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help="Relative slowdown that counts as a regression (default: 0.10)")
+    compare.add_argument('--noise-floor-ms', type=float, default=NOISE_FLOOR_MS,
+                         help="Ignore time differences smaller than this (default: 2 ms)")
+    compare.add_argument('--all', action='store_true', help="Print every compared metric, not only regressions")
+
+    warm = commands.add_parser('warm', help="Cold vs warm-started re-extraction for 5/8/10/16 colors")
+    warm.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES_MP,
+                      help="Image sizes in megapixels (default: 0.5 4 16)")
+    warm.add_argument('--runs', type=int, default=SUITE_RUNS, help="Timed runs of the sequence (default: 5)")
+    warm.add_argument('--mode', choices=CLUSTER_MODES, default=DEFAULT_CLUSTER_MODE, help="Clustering backend")
+    warm.add_argument('--ingest', choices=INGEST_MODES, default=DEFAULT_INGEST_MODE,
+                      help="Decode strategy (default: quality)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'modes':
+        run_benchmark(args.sizes, args.runs, args.ingest)
+        return 0
+
+    if args.command == 'warm':
+        run_warm_start_benchmark(args.sizes, args.runs, args.mode, args.ingest)
+        return 0
+
+    if args.command == 'suite':
+        run_suite(args.output, args.kinds, args.edges, args.modes, args.ingest, args.runs,
+                  args.concurrency, args.requests, args.seed, http=not args.no_http)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    comparisons = compare_reports(baseline, current, args.threshold, args.noise_floor_ms)
+    print_comparison(comparisons, show_all=args.all)
+    return 1 if any(c['regression'] for c in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+COLOR SPACES (VECTORIZED)
+-------------------------
+sRGB ⇄ CIELAB and sRGB ⇄ OKLab conversions written as whole-array NumPy
+operations: every function takes an (N, 3) array and converts all N colors
+at once, no per-pixel Python calls.
+
+Why bother? Euclidean distance in RGB does not match what the eye sees:
+two greens 20 units apart can look identical while two blues 20 units apart
+look clearly different. In CIELAB / OKLab, distance ≈ perceived difference
+(ΔE), so K-Means groups colors the way a person would.
+
+   - CIELAB: D65 white point, L in [0, 100]. ΔE76 = Euclidean distance.
+   - OKLab : L in [0, 1]. Used for clustering only; merging always measures ΔE76 in CIELAB.
+"""
+
+import numpy as np
+
+COLOR_SPACES = ('rgb', 'lab', 'oklab')
+
+# sRGB (linear) → CIE XYZ, D65 white point
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_XYZ_TO_RGB = np.linalg.inv(_RGB_TO_XYZ)
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+# CIE constants of the piecewise cube root: ε = (6/29)^3
+_LAB_EPSILON = (6 / 29) ** 3
+_LAB_DELTA = 6 / 29
+
+# Björn Ottosson's OKLab matrices (linear sRGB → LMS → OKLab)
+_RGB_TO_LMS = np.array([
+    [0.4122214708, 0.5363325363, 0.0514459929],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+])
+_LMS_TO_OKLAB = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+])
+_LMS_TO_RGB = np.linalg.inv(_RGB_TO_LMS)
+_OKLAB_TO_LMS = np.linalg.inv(_LMS_TO_OKLAB)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# sRGB GAMMA
+# ──────────────────────────────────────────────────────────────────────────
+
+def srgb_to_linear(rgb: np.ndarray) -> np.ndarray:
+    """0-255 sRGB values → linear light in [0, 1]."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(linear: np.ndarray) -> np.ndarray:
+    """Linear light → 0-255 sRGB values (float, clipped to the gamut)."""
+    c = np.clip(linear, 0.0, 1.0)
+    c = np.where(c <= 0.0031308, c * 12.92, 1.055 * np.power(c, 1 / 2.4) - 0.055)
+    # Round away float noise so a round trip of 10 gives 10.0, not 9.9999999 (which truncates to 9)
+    return np.round(c * 255.0, 6)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# CIELAB
+# ──────────────────────────────────────────────────────────────────────────
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """(N, 3) sRGB 0-255 → (N, 3) CIELAB."""
+    xyz = srgb_to_linear(rgb) @ _RGB_TO_XYZ.T / _D65_WHITE
+    f = np.where(xyz > _LAB_EPSILON, np.cbrt(xyz), xyz / (3 * _LAB_DELTA ** 2) + 4 / 29)
+    return np.stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+
+
+def lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """(N, 3) CIELAB → (N, 3) sRGB 0-255 (float)."""
+    fy = (lab[:, 0] + 16) / 116
+    f = np.stack([fy + lab[:, 1] / 500, fy, fy - lab[:, 2] / 200], axis=1)
+    xyz = np.where(f > _LAB_DELTA, f ** 3, 3 * _LAB_DELTA ** 2 * (f - 4 / 29)) * _D65_WHITE
+    return linear_to_srgb(xyz @ _XYZ_TO_RGB.T)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# OKLAB
+# ──────────────────────────────────────────────────────────────────────────
+
+def rgb_to_oklab(rgb: np.ndarray) -> np.ndarray:
+    """(N, 3) sRGB 0-255 → (N, 3) OKLab."""
+    lms = srgb_to_linear(rgb) @ _RGB_TO_LMS.T
+    return np.cbrt(lms) @ _LMS_TO_OKLAB.T
+
+
+def oklab_to_rgb(oklab: np.ndarray) -> np.ndarray:
+    """(N, 3) OKLab → (N, 3) sRGB 0-255 (float)."""
+    lms = (oklab @ _OKLAB_TO_LMS.T) ** 3
+    return linear_to_srgb(lms @ _LMS_TO_RGB.T)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# DISPATCH
+# ──────────────────────────────────────────────────────────────────────────
+
+def from_rgb(rgb: np.ndarray, space: str) -> np.ndarray:
+    """Convert (N, 3) sRGB 0-255 colors into `space` (one of COLOR_SPACES)."""
+    if space == 'lab':
+        return rgb_to_lab(rgb)
+    if space == 'oklab':
+        return rgb_to_oklab(rgb)
+    return np.asarray(rgb, dtype=np.float64)
+
+
+def to_rgb(colors: np.ndarray, space: str) -> np.ndarray:
+    """Convert (N, 3) colors in `space` back to sRGB 0-255 (float)."""
+    if space == 'lab':
+        return lab_to_rgb(colors)
+    if space == 'oklab':
+        return oklab_to_rgb(colors)
+    return np.clip(colors, 0, 255)
+
+
+def rgb_to_hex_array(rgb: np.ndarray) -> np.ndarray:
+    """(N, 3) sRGB 0-255 → (N,) array of '#rrggbb' strings, formatted in one call.
+
+    Channels are truncated to integers, like rgb_to_hex() in palette.py.
+    """
+    channels = np.clip(rgb, 0, 255).astype(np.int64)
+    packed = (channels[:, 0] << 16) | (channels[:, 1] << 8) | channels[:, 2]
+    return np.char.mod('#%06x', packed)
+
+
+def merge_similar_colors(rgb: np.ndarray, weights: np.ndarray, delta_e: float):
+    """Fold together colors that are closer than delta_e (CIE76 ΔE in CIELAB).
+
+    The most dominant color of every near-duplicate group survives and absorbs the
+    others: its color becomes the weight-averaged Lab color of the group and its
+    weight the sum. A ΔE around 2.3 is a "just noticeable difference".
+
+    Args:
+        rgb (np.ndarray): (k, 3) sRGB 0-255 colors.
+        weights (np.ndarray): (k,) pixel counts.
+        delta_e (float): Merge threshold. 0 or less disables merging.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (merged rgb (m, 3), merged weights (m,)) with m <= k.
+    """
+    if delta_e <= 0 or len(rgb) < 2:
+        return rgb, weights
+
+    order = np.argsort(-weights, kind='stable')      # Most dominant first
+    rgb, weights = rgb[order], weights[order]
+    lab = rgb_to_lab(rgb)
+
+    # Pairwise ΔE for all k x k pairs at once (k is small: the palette size)
+    distances = np.linalg.norm(lab[:, None, :] - lab[None, :, :], axis=2)
+
+    owner = np.arange(len(lab))                      # Which surviving color absorbs each color
+    for i in range(len(lab)):
+        if owner[i] != i:
+            continue
+        absorbed = (distances[i] < delta_e) & (owner == np.arange(len(lab))) & (np.arange(len(lab)) > i)
+        owner[absorbed] = i
+
+    survivors = np.unique(owner)
+    merged_weights = np.bincount(owner, weights=weights)[survivors]
+    merged_lab = np.stack([
+        np.bincount(owner, weights=weights * lab[:, channel])[survivors] for channel in range(3)
+    ], axis=1) / merged_weights[:, None]
+
+    # Colors that absorbed nothing keep their exact RGB (no Lab round-trip drift)
+    merged_rgb = lab_to_rgb(merged_lab)
+    untouched = np.bincount(owner)[survivors] == 1
+    merged_rgb[untouched] = rgb[survivors[untouched]]
+
+    return merged_rgb, merged_weights
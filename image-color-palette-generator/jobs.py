@@ -0,0 +1,153 @@
+"""
+ASYNC PALETTE JOBS
+------------------
+Lets /upload?async=1 answer immediately with a job id while the clustering
+runs on a small local worker pool.
+
+   - JobQueue.submit() raises QueueFullError once `max_depth` jobs are queued or
+     running, so a burst of uploads turns into HTTP 429s instead of an unbounded
+     pile of spooled images in memory.
+   - Every job publishes its progress through a threading.Condition, so the
+     polling endpoint (/jobs/<id>) and the Server-Sent-Events stream
+     (/jobs/<id>/events) read the same state.
+   - Finished jobs are forgotten `retention_seconds` after they complete.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_DEPTH = 32
+DEFAULT_RETENTION_SECONDS = 10 * 60
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+FINAL_STATES = (DONE, FAILED)
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit() when max_depth jobs are already pending."""
+
+
+class Job:
+    """State of one background job. Mutated only through JobQueue."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.progress = 0
+        self.stage = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.version = 0        # Bumped on every change, lets SSE listeners detect updates
+
+    def to_dict(self) -> dict:
+        """JSON-ready snapshot of the job."""
+        snapshot = {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'stage': self.stage,
+        }
+        if self.status == DONE:
+            snapshot['result'] = self.result
+        elif self.status == FAILED:
+            snapshot['error'] = self.error
+        return snapshot
+
+
+class JobQueue:
+    """Bounded thread pool plus a registry of jobs and their progress."""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_depth: int = DEFAULT_MAX_DEPTH,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        """
+        Args:
+            max_workers (int): Jobs running at the same time.
+            max_depth (int): Jobs queued or running before submit() refuses new ones.
+            retention_seconds (float): How long a finished job stays queryable.
+        """
+        self.max_depth = max_depth
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='palette-job')
+        self._jobs = {}
+        self._pending = 0
+        self._changed = threading.Condition()
+
+    # ---------------------------- PUBLIC API ------------------------------- #
+    def submit(self, fn, *args, **kwargs) -> Job:
+        """Queue fn(*args, progress_callback=..., **kwargs) and return its Job.
+
+        The function's return value becomes job.result; an exception becomes job.error.
+
+        Raises:
+            QueueFullError: If max_depth jobs are already queued or running.
+        """
+        with self._changed:
+            self._forget_expired()
+            if self._pending >= self.max_depth:
+                raise QueueFullError(f"{self._pending} jobs already pending")
+            job = Job()
+            self._jobs[job.id] = job
+            self._pending += 1
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def snapshot(self, job_id: str) -> dict | None:
+        """Return a consistent to_dict() of the job, or None."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def wait_for_change(self, job_id: str, seen_version: int, timeout: float):
+        """Block until the job changes past seen_version (or timeout).
+
+        Returns:
+            tuple[int, dict | None]: (current version, snapshot). Snapshot is None if the job is gone.
+        """
+        with self._changed:
+            self._changed.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id].version > seen_version,
+                timeout=timeout)
+            job = self._jobs.get(job_id)
+            if job is None:
+                return seen_version, None
+            return job.version, job.to_dict()
+
+    # ---------------------------- INTERNAL HELPERS ------------------------------- #
+    def _run(self, job: Job, fn, args, kwargs):
+        """Worker thread body: run the job function and record its outcome."""
+        self._update(job, status=RUNNING, stage='starting')
+
+        def progress_callback(percent: int, stage: str):
+            self._update(job, progress=percent, stage=stage)
+
+        try:
+            result = fn(*args, progress_callback=progress_callback, **kwargs)
+            self._update(job, status=DONE, progress=100, stage=DONE, result=result)
+        except Exception as e:
+            self._update(job, status=FAILED, stage=FAILED, error=str(e))
+
+    def _update(self, job: Job, **changes):
+        """Apply changes to a job and wake every listener."""
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            if changes.get('status') in FINAL_STATES:
+                job.finished_at = time.time()
+                self._pending -= 1
+            job.version += 1
+            self._changed.notify_all()
+
+    def _forget_expired(self):
+        """Drop finished jobs older than retention_seconds. Caller holds the lock."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,552 @@
+"""
+PALETTE ENGINE: FROM PIXELS TO PALETTE
+--------------------------------------
+The pure image → palette logic used by the Flask app (app.py) and the
+benchmark script (benchmark.py). It has no Flask dependency, so it can be
+imported from worker processes and command-line tools.
+
+Clustering backends ("modes"):
+   - 'exact': Original behaviour. K-Means (n_init=10) over every thumbnail pixel.
+   - 'fast' : Collapse the pixels into a 3D color histogram first
+              (5 bits per channel → 32 x 32 x 32 = 32,768 possible bins).
+              Only the occupied bins are clustered, using the pixel count of
+              each bin as its sample weight. A 200x200 thumbnail has 40,000
+              pixels but usually only a few thousand occupied bins, so the
+              K-Means work shrinks by an order of magnitude.
+
+Ingest modes (how the image is decoded and shrunk to the thumbnail):
+   - 'quality'   : Full decode + LANCZOS. Original behaviour.
+   - 'throughput': JPEG draft decoding (the decoder itself scales by 1/2, 1/4 or 1/8),
+                   Pillow's reduce() box-binning for other formats, and a cheap
+                   BOX/BILINEAR filter for the final resize. On 20+ MP JPEGs this
+                   skips most of the decode and resampling work.
+
+Color spaces (where K-Means measures distances, see color_space.py):
+   - 'rgb'  : Original behaviour.
+   - 'lab'  : CIELAB, perceptually uniform (distance ≈ ΔE).
+   - 'oklab': OKLab, a more modern perceptual space with better blues/purples.
+Near-duplicate centroids closer than `merge_delta_e` (ΔE76) are merged, so
+the palette may hold fewer than n_colors colors when the image has fewer
+visually distinct ones.
+
+Animated GIF / WebP (frame sampling):
+   - 'first'    : Only the first frame, like a still image.
+   - 'stride'   : Every `frame_stride`-th frame (the stride grows automatically so
+                  at most MAX_SAMPLED_FRAMES frames are analyzed).
+   - 'keyframes': Walk the frames at the stride and keep only those that differ
+                  visibly (mean absolute difference) from the last kept one.
+Frames are decoded one at a time with seek(), each is shrunk to a thumbnail
+straight away, so a 500-frame GIF never sits in memory as full-size frames.
+The sampled thumbnails are pooled into one pixel table for the overall
+palette; the caller can also ask for one palette per sampled frame.
+
+Every stage can report its wall time (decode, resize, cluster, format) into a
+`timings` dictionary supplied by the caller.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from PIL import Image
+import numpy as np
+from sklearn.cluster import KMeans
+
+from color_space import COLOR_SPACES, from_rgb, to_rgb, rgb_to_hex_array, merge_similar_colors
+
+# ──────────────────────────────────────────────────────────────────────────
+# CONFIGURATION & CONSTANTS
+# ──────────────────────────────────────────────────────────────────────────
+
+# Image types accepted by the web app and the batch tools
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'gif'}
+
+# Number of dominant colors to extract
+NUM_COLORS = 10
+
+# Thumbnail bounding box used before clustering
+THUMBNAIL_SIZE = (200, 200)
+
+# Ingest (decode + resize) strategies
+INGEST_MODES = ('quality', 'throughput')
+DEFAULT_INGEST_MODE = 'quality'
+
+# 'throughput' ingest: decode/reduce to at least this multiple of the thumbnail, then resample.
+REDUCING_GAP = 2.0
+# Remaining downscale factor above which the final resize uses BOX instead of BILINEAR
+LARGE_DOWNSCALE_FACTOR = 4
+# Modes that can be resized before the RGB conversion (others, like palette 'P', must convert first)
+RESIZE_FIRST_MODES = ('RGB', 'L')
+
+# Clustering backends
+CLUSTER_MODES = ('exact', 'fast')
+DEFAULT_CLUSTER_MODE = 'exact'      # 'fast' is opt-in: its palettes differ slightly from the original ones
+
+# Histogram quantization for the 'fast' mode: 5 bits per channel.
+HISTOGRAM_BITS = 5
+HISTOGRAM_SHIFT = 8 - HISTOGRAM_BITS            # Drop the 3 least significant bits of each channel
+HISTOGRAM_BINS = 1 << (3 * HISTOGRAM_BITS)      # 32,768 bins in the color cube
+
+# The weighted fit is cheap, so a few restarts are enough to stay stable.
+FAST_N_INIT = 4
+
+# Animated images: which frames are analyzed
+FRAME_SAMPLING_MODES = ('first', 'stride', 'keyframes')
+DEFAULT_FRAME_SAMPLING = 'stride'
+DEFAULT_FRAME_STRIDE = 1
+
+# Upper bound on analyzed frames; the stride is raised to stay under it
+MAX_SAMPLED_FRAMES = 32
+# 'keyframes' may look at more frames than it keeps, but not more than this
+MAX_SCANNED_FRAMES = 4 * MAX_SAMPLED_FRAMES
+# Mean absolute channel difference (0-255) above which a frame counts as a new keyframe
+KEYFRAME_MIN_DIFFERENCE = 12.0
+
+# 'exact' mode on pooled frames: subsample down to this many pixels (4 thumbnails' worth)
+MAX_POOLED_PIXELS = 4 * THUMBNAIL_SIZE[0] * THUMBNAIL_SIZE[1]
+
+# Space K-Means clusters in ('rgb', 'lab' or 'oklab')
+DEFAULT_COLOR_SPACE = 'rgb'
+
+# Centroids closer than this ΔE76 are merged (0 = never merge, keep exactly n_colors)
+DEFAULT_MERGE_DELTA_E = 0.0
+
+
+def rgb_to_hex(rgb: tuple) -> str:
+    """Convert RGB tuple to HEX color code.
+
+    Args:
+        rgb (tuple): Tuple of (R, G, B) values (0-255).
+
+    Returns:
+        str: HEX color string (e.g., '#FF5733').
+    """
+    # x: Stands for Hexadecimal.
+    # 2: Minimum width
+    # 0: Padding. Use a zero instead A space.
+    return '#{:02x}{:02x}{:02x}'.format(int(rgb[0]), int(rgb[1]), int(rgb[2]))
+
+
+@contextmanager
+def stage_timer(timings: dict | None, stage: str):
+    """Add the wall time of the enclosed block to timings[f'{stage}_ms'] (no-op when timings is None)."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        key = f'{stage}_ms'
+        timings[key] = round(timings.get(key, 0.0) + (time.perf_counter() - start) * 1000, 3)
+
+
+# ──────────────────────────────────────────────────────────────────────────
+# PIPELINE STAGES
+# ──────────────────────────────────────────────────────────────────────────
+
+def load_frames(image_source, ingest: str = DEFAULT_INGEST_MODE, frame_sampling: str = DEFAULT_FRAME_SAMPLING,
+                frame_stride: int = DEFAULT_FRAME_STRIDE, timings: dict | None = None) -> list:
+    """Decode an image (every sampled frame of it, if animated) into thumbnail pixel tables.
+
+    Args:
+        image_source: File path or binary file-like object accepted by Image.open().
+        ingest (str): One of INGEST_MODES.
+        frame_sampling (str): One of FRAME_SAMPLING_MODES. Ignored for still images.
+        frame_stride (int): Analyze every n-th frame (at least 1).
+        timings (dict | None): Receives 'decode_ms' and 'resize_ms' when given.
+
+    Returns:
+        list[tuple[int, int | None, np.ndarray]]: (frame index, frame duration in ms, uint8 pixels
+        of shape (pixels, 3)) per sampled frame. A still image gives [(0, None, pixels)].
+
+    Raises:
+        ValueError: If the ingest or frame sampling mode is unknown.
+    """
+    if ingest not in INGEST_MODES:
+        raise ValueError(f"Unknown ingest mode '{ingest}'. Choose one of: {', '.join(INGEST_MODES)}")
+    if frame_sampling not in FRAME_SAMPLING_MODES:
+        raise ValueError(f"Unknown frame sampling '{frame_sampling}'. "
+                         f"Choose one of: {', '.join(FRAME_SAMPLING_MODES)}")
+
+    with stage_timer(timings, 'decode'):
+        img = Image.open(image_source)      # Lazy: reads the header only
+
+    if getattr(img, 'is_animated', False) and frame_sampling != 'first':
+        return _sample_frames(img, ingest, frame_sampling, max(1, frame_stride), timings)
+
+    if ingest == 'throughput':
+        img = _ingest_throughput(img, timings)
+    else:
+        # Open image and convert to RGB
+        with stage_timer(timings, 'decode'):
+            img = img.convert('RGB')
+
+        # Resize for performance while keeping aspect ratio roughly, thumbnail equally reduce the image size ratio
+        with stage_timer(timings, 'resize'):
+            img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)  # Using LANCZOS for high quality.
+
+    # Convert to numpy array: shape (height, width, 3)
+    # Reshape to (pixels, 3) for KMeans, -1 is a NumPy placeholder
+    return [(0, None, np.asarray(img, dtype=np.uint8).reshape(-1, 3))]
+
+
+def _ingest_throughput(img: Image.Image, timings: dict | None) -> Image.Image:
+    """'throughput' ingest: decode as little as possible, then resample cheaply.
+
+    Returns:
+        Image.Image: RGB thumbnail that fits inside THUMBNAIL_SIZE.
+    """
+    with stage_timer(timings, 'decode'):
+        # JPEG only: ask the decoder for a 1/2, 1/4 or 1/8 scale image that is still
+        # at least REDUCING_GAP times the thumbnail. Other formats ignore draft().
+        draft_size = (int(THUMBNAIL_SIZE[0] * REDUCING_GAP), int(THUMBNAIL_SIZE[1] * REDUCING_GAP))
+        img.draft('RGB', draft_size)
+        img.load()
+
+        if img.mode not in RESIZE_FIRST_MODES:
+            img = img.convert('RGB')
+
+    with stage_timer(timings, 'resize'):
+        factor = max(img.width / THUMBNAIL_SIZE[0], img.height / THUMBNAIL_SIZE[1])
+        resample = Image.Resampling.BOX if factor > LARGE_DOWNSCALE_FACTOR else Image.Resampling.BILINEAR
+
+        # reducing_gap: Pillow first bins by an integer factor with reduce(), then resamples the rest
+        img.thumbnail(THUMBNAIL_SIZE, resample, reducing_gap=REDUCING_GAP)
+        img = img.convert('RGB')
+
+    return img
+
+
+def _sample_frames(img: Image.Image, ingest: str, frame_sampling: str, frame_stride: int,
+                   timings: dict | None) -> list:
+    """Seek through an animated image and thumbnail the sampled frames, one frame in memory at a time.
+
+    Returns:
+        list[tuple[int, int | None, np.ndarray]]: See load_frames().
+    """
+    n_frames = img.n_frames
+    budget = MAX_SCANNED_FRAMES if frame_sampling == 'keyframes' else MAX_SAMPLED_FRAMES
+    stride = max(frame_stride, math.ceil(n_frames / budget))
+    resample = Image.Resampling.LANCZOS if ingest == 'quality' else Image.Resampling.BILINEAR
+
+    frames = []
+    last_kept = None
+    for index in range(0, n_frames, stride):
+        with stage_timer(timings, 'decode'):
+            img.seek(index)                         # Forward only: the decoder keeps just the current canvas
+            frame = img.convert('RGB')              # Composited frame (disposal and transparency applied)
+            duration = img.info.get('duration')
+
+        with stage_timer(timings, 'resize'):
+            frame.thumbnail(THUMBNAIL_SIZE, resample)
+            pixels = np.asarray(frame, dtype=np.uint8).reshape(-1, 3)
+
+        if frame_sampling == 'keyframes':
+            # Every frame has the canvas size, so the thumbnails line up pixel for pixel
+            signed = pixels.astype(np.int16)
+            if last_kept is not None and np.abs(signed - last_kept).mean() < KEYFRAME_MIN_DIFFERENCE:
+                continue
+            last_kept = signed
+
+        frames.append((index, duration, pixels))
+        if len(frames) >= MAX_SAMPLED_FRAMES:
+            break
+
+    return frames
+
+
+def pool_frame_pixels(frame_pixels: list, mode: str = DEFAULT_CLUSTER_MODE) -> np.ndarray:
+    """Stack the pixel tables of several frames into one.
+
+    'fast' mode collapses the pool into a histogram anyway, so every pixel is kept.
+    'exact' mode clusters raw pixels, so the pool is evenly subsampled to MAX_POOLED_PIXELS.
+
+    Args:
+        frame_pixels (list[np.ndarray]): uint8 arrays of shape (pixels, 3).
+        mode (str): Clustering mode the pool is meant for.
+
+    Returns:
+        np.ndarray: uint8 array of shape (pixels, 3).
+    """
+    if len(frame_pixels) == 1:
+        return frame_pixels[0]
+
+    pixels = np.concatenate(frame_pixels)
+    if mode == 'exact' and len(pixels) > MAX_POOLED_PIXELS:
+        pixels = pixels[::math.ceil(len(pixels) / MAX_POOLED_PIXELS)]
+    return pixels
+
+
+def quantize_to_histogram(pixels: np.ndarray):
+    """Collapse a pixel table into the occupied bins of a 5-bit color histogram.
+
+    Each bin is represented by the mean color of the pixels that fell into it
+    (not the bin's geometric center), so no precision is lost for flat colors.
+
+    Args:
+        pixels (np.ndarray): uint8 array of shape (pixels, 3).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (bin_colors (bins, 3) float64, counts (bins,) float64).
+    """
+    quantized = (pixels >> HISTOGRAM_SHIFT).astype(np.int32)
+
+    # Pack the three 5-bit channel indices into one integer: RRRRRGGGGGBBBBB
+    bin_index = (quantized[:, 0] << (2 * HISTOGRAM_BITS)) | (quantized[:, 1] << HISTOGRAM_BITS) | quantized[:, 2]
+
+    counts = np.bincount(bin_index, minlength=HISTOGRAM_BINS)
+    occupied = np.nonzero(counts)[0]
+
+    # Per-bin channel sums → per-bin mean colors
+    sums = np.stack([
+        np.bincount(bin_index, weights=pixels[:, channel], minlength=HISTOGRAM_BINS)[occupied]
+        for channel in range(3)
+    ], axis=1)
+    weights = counts[occupied].astype(np.float64)
+
+    return sums / weights[:, None], weights
+
+
+class PreparedImage:
+    """Clustering input of one image plus every K-Means fit already made on it.
+
+    Building it does the expensive, n_colors-independent work once: histogram
+    quantization ('fast') and the color-space conversion. cluster() can then be
+    called for any n_colors; after the first fit, later fits warm-start from the
+    centroids of the nearest earlier fit and run a single K-Means pass instead of
+    n_init random restarts.
+
+    One instance can be shared between threads (ModelStateCache): cluster() holds a
+    lock from the lookup of an earlier fit to the store of the new one.
+    """
+
+    def __init__(self, pixels: np.ndarray, mode: str = DEFAULT_CLUSTER_MODE, color_space: str = DEFAULT_COLOR_SPACE):
+        """
+        Args:
+            pixels (np.ndarray): uint8 array of shape (pixels, 3).
+            mode (str): One of CLUSTER_MODES.
+            color_space (str): One of COLOR_SPACES.
+
+        Raises:
+            ValueError: If the mode or color space is unknown.
+        """
+        if mode not in CLUSTER_MODES:
+            raise ValueError(f"Unknown clustering mode '{mode}'. Choose one of: {', '.join(CLUSTER_MODES)}")
+        if color_space not in COLOR_SPACES:
+            raise ValueError(f"Unknown color space '{color_space}'. Choose one of: {', '.join(COLOR_SPACES)}")
+
+        if mode == 'fast':
+            samples, self.sample_weight = quantize_to_histogram(pixels)
+            self.n_init = FAST_N_INIT
+        else:
+            samples, self.sample_weight = pixels, None
+            self.n_init = 10
+
+        self.mode = mode
+        self.color_space = color_space
+
+        # A flat graphic can have fewer distinct colors than requested clusters.
+        self.n_unique = len(np.unique(samples, axis=0))
+
+        # Whole-array conversion into the clustering space (a no-op for 'rgb')
+        self.samples = from_rgb(samples, color_space)
+
+        self.fits = {}      # n_clusters -> (centers in the clustering space, weights)
+        self._lock = threading.Lock()
+
+    def cluster(self, n_colors: int = NUM_COLORS):
+        """Group the samples into n_colors clusters, reusing earlier fits when possible.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, bool]: (centers (k, 3) sRGB 0-255, weights (k,), warm_start)
+            where weights is the number of pixels assigned to each center and warm_start tells
+            whether an earlier fit was reused.
+        """
+        n_clusters = max(1, min(n_colors, self.n_unique))
+        with self._lock:
+            return self._cluster(n_clusters)
+
+    def _cluster(self, n_clusters: int):
+        """cluster() body, called with the lock held."""
+        if n_clusters in self.fits:
+            centers, weights = self.fits[n_clusters]
+            return to_rgb(centers, self.color_space), weights, True
+
+        warm_start = bool(self.fits)
+
+        # *************************************** Key section of the function *******************************************
+        # n_init: runs the 'finding' process several times to pick the best result (where pixels were closest to their centers).
+        # random_state=42 ensures the 'random' starts are the same every time we run the code.
+        # Warm start: one run that begins at the centroids of an earlier fit, which are already close to the answer.
+        if warm_start:
+            kmeans = KMeans(n_clusters=n_clusters, init=self._warm_start_centers(n_clusters), n_init=1, random_state=42)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=self.n_init)  # Object Class Instance
+
+        # fit_predict assigns each sample a 'Group ID' based on which color center is closest.
+        labels = kmeans.fit_predict(self.samples, sample_weight=self.sample_weight)  # integers ID List for each sample
+        # ***************************************************************************************************************
+
+        # Pixels per cluster. In 'fast' mode every sample is a bin that stands for 'count' pixels.
+        weights = np.bincount(labels, weights=self.sample_weight, minlength=n_clusters)
+
+        self.fits[n_clusters] = (kmeans.cluster_centers_, weights)
+        return to_rgb(kmeans.cluster_centers_, self.color_space), weights, warm_start
+
+    def _warm_start_centers(self, n_clusters: int) -> np.ndarray:
+        """Initial centroids for n_clusters, taken from the closest earlier fit.
+
+        Fewer clusters: keep the heaviest earlier centroids.
+        More clusters : keep all of them and add, one at a time, the sample that is
+                        farthest (weighted) from every centroid so far, i.e. a
+                        deterministic k-means++ step.
+        """
+        nearest = min(self.fits, key=lambda k: (abs(k - n_clusters), -k))
+        centers, weights = self.fits[nearest]
+
+        if nearest >= n_clusters:
+            return centers[np.argsort(-weights, kind='stable')[:n_clusters]]
+
+        sample_weight = self.sample_weight if self.sample_weight is not None else 1.0
+        seeds = list(centers)
+        distances = ((self.samples[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        while len(seeds) < n_clusters:
+            farthest = self.samples[np.argmax(distances * sample_weight)]
+            seeds.append(farthest)
+            distances = np.minimum(distances, ((self.samples - farthest) ** 2).sum(axis=1))
+        return np.array(seeds)
+
+
+def cluster_pixels(pixels: np.ndarray, n_colors: int = NUM_COLORS, mode: str = DEFAULT_CLUSTER_MODE,
+                   color_space: str = DEFAULT_COLOR_SPACE):
+    """Group pixels into n_colors clusters with the selected backend (one cold fit).
+
+    Args:
+        pixels (np.ndarray): uint8 array of shape (pixels, 3).
+        n_colors (int): Number of clusters requested.
+        mode (str): One of CLUSTER_MODES.
+        color_space (str): One of COLOR_SPACES. Centers are always returned as sRGB.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (centers (k, 3) sRGB 0-255, weights (k,)) where
+        weights is the number of pixels assigned to each center.
+
+    Raises:
+        ValueError: If the mode or color space is unknown.
+    """
+    centers, weights, _ = PreparedImage(pixels, mode, color_space).cluster(n_colors)
+    return centers, weights
+
+
+def format_palette(centers: np.ndarray, weights: np.ndarray) -> list:
+    """Turn cluster centers and sizes into the JSON-ready palette list.
+
+    Sorting, percentages, integer RGB and hex strings are computed for the whole
+    palette at once with NumPy; Python only assembles the final dictionaries.
+
+    Args:
+        centers (np.ndarray): Array of shape (k, 3) with RGB centroids.
+        weights (np.ndarray): Array of shape (k,) with pixels per centroid.
+
+    Returns:
+        list[dict]: Dictionaries with 'hex', 'rgb', and 'percentage' keys, most dominant first.
+    """
+    # Sort by weight (most dominant first); 'stable' keeps ties in cluster order
+    order = np.argsort(-weights, kind='stable')
+    centers, weights = centers[order], weights[order]
+
+    # weights is a NumPy array, it divides every number inside the list individually
+    percentages = np.round(weights / weights.sum() * 100, 2).tolist()
+    rgb_values = np.clip(centers, 0, 255).astype(np.int64).tolist()
+    hex_values = rgb_to_hex_array(centers).tolist()
+
+    return [
+        {'hex': hex_value, 'rgb': tuple(rgb), 'percentage': percentage}
+        for hex_value, rgb, percentage in zip(hex_values, rgb_values, percentages)
+    ]  # Descending List of Dictionaries
+
+
+def extract_dominant_colors(image_source, n_colors: int = NUM_COLORS, mode: str = DEFAULT_CLUSTER_MODE,
+                            ingest: str = DEFAULT_INGEST_MODE, color_space: str = DEFAULT_COLOR_SPACE,
+                            merge_delta_e: float = DEFAULT_MERGE_DELTA_E,
+                            frame_sampling: str = DEFAULT_FRAME_SAMPLING, frame_stride: int = DEFAULT_FRAME_STRIDE,
+                            timings: dict | None = None, frame_timeline: list | None = None,
+                            model_state: dict | None = None, progress_callback=None):
+    """Extract dominant colors from an image using K-Means clustering.
+
+    Logic:
+    1. Open and resize image to 200x200 (or keep aspect if smaller) for speed.
+       Animated images: every sampled frame is resized and the pixels are pooled.
+    2. Convert to numpy array of RGB pixels.
+    3. Run KMeans on the pixel colors ('exact') or on their histogram bins ('fast'),
+       in RGB or in a perceptual color space.
+    4. Merge centroids closer than merge_delta_e (optional).
+    5. Calculate percentage of pixels belonging to each cluster.
+    6. Sort by dominance (percentage descending).
+
+    Why resize? High-resolution images can have 10M+ pixels → KMeans becomes slow.
+    Resizing preserves the overall color distribution very well for palette generation.
+
+    Args:
+        image_source: Path to the uploaded image (or a binary file-like object).
+        n_colors (int): Number of dominant colors to extract (default: 10).
+        mode (str): Clustering backend, 'exact' or 'fast' (default: 'exact').
+        ingest (str): Decode strategy, 'quality' or 'throughput' (default: 'quality').
+        color_space (str): Clustering space, 'rgb', 'lab' or 'oklab' (default: 'rgb').
+        merge_delta_e (float): ΔE76 below which centroids are merged (default: 0, off).
+        frame_sampling (str): Animated images only: 'first', 'stride' or 'keyframes' (default: 'stride').
+        frame_stride (int): Animated images only: analyze every n-th frame (default: 1).
+        timings (dict | None): If given, receives per-stage wall times in milliseconds
+            ('decode_ms', 'resize_ms', 'cluster_ms', 'format_ms').
+        frame_timeline (list | None): If given, receives one {'frame', 'duration_ms', 'colors'}
+            entry per sampled frame (a single entry for a still image).
+        model_state (dict | None): Per-image state for repeat requests. Pass the same dict for
+            the same image and settings: the first call stores its PreparedImage under 'prepared';
+            later calls skip decoding (image_source may then be None) and warm-start K-Means.
+            'warm_start' is set to whether this call reused an earlier fit.
+        progress_callback (Callable[[int, str], None] | None): Called as (percent, stage)
+            when each stage starts, and with (100, 'done') at the end.
+
+    Returns:
+        list[dict]: List of dictionaries with 'hex', 'rgb', and 'percentage' keys.
+    """
+    report = progress_callback or (lambda percent, stage: None)
+
+    def palette_of(pixels: np.ndarray) -> list:
+        with stage_timer(timings, 'cluster'):
+            centers, weights = cluster_pixels(pixels, n_colors=n_colors, mode=mode, color_space=color_space)
+            centers, weights = merge_similar_colors(centers, weights, merge_delta_e)
+        with stage_timer(timings, 'format'):
+            return format_palette(centers, weights)
+
+    prepared = model_state.get('prepared') if model_state is not None else None
+
+    report(0, 'decode')
+    if prepared is None or frame_timeline is not None:
+        frames = load_frames(image_source, ingest, frame_sampling, frame_stride, timings)
+
+    report(40, 'cluster')
+    with stage_timer(timings, 'cluster'):
+        if prepared is None:
+            prepared = PreparedImage(pool_frame_pixels([pixels for _, _, pixels in frames], mode), mode, color_space)
+        centers, weights, warm_start = prepared.cluster(n_colors)
+        centers, weights = merge_similar_colors(centers, weights, merge_delta_e)
+
+    report(90, 'format')
+    with stage_timer(timings, 'format'):
+        colors = format_palette(centers, weights)
+
+    if model_state is not None:
+        model_state['prepared'] = prepared
+        model_state['warm_start'] = warm_start
+
+    if frame_timeline is not None:
+        report(95, 'timeline')
+        for index, duration, pixels in frames:
+            frame_colors = colors if len(frames) == 1 else palette_of(pixels)
+            frame_timeline.append({'frame': index, 'duration_ms': duration, 'colors': frame_colors})
+
+    report(100, 'done')
+    return colors
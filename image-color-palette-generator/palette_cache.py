@@ -0,0 +1,247 @@
+"""
+PALETTE CACHE
+-------------
+Remembers the palette of every image we have already analyzed, so a repeat
+upload of the same bytes skips both the disk write and the K-Means run.
+
+Two tiers:
+   1. Memory: an LRU (least recently used) dictionary limited to `max_entries`.
+   2. Disk (optional): a single SQLite file, shared by every Flask worker process
+      and surviving restarts. Memory misses fall through to it and get promoted.
+
+ModelStateCache keeps, per image and settings, the prepared K-Means input and
+fitted centroids (see PreparedImage in palette.py), so asking for a different
+number of colors skips decoding and warm-starts the fit. It holds NumPy arrays,
+so it is memory-only.
+
+Every entry expires `ttl_seconds` after it was stored. prune_folder() applies
+the same size/age policy to the uploads folder, so neither can grow without bound.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60      # One week
+DEFAULT_MAX_DISK_ENTRIES = 50_000
+DEFAULT_MAX_MODEL_STATES = 32                # Prepared images: up to ~1 MB each in 'exact' mode
+
+
+def make_cache_key(digest: str, n_colors: int, *settings: str) -> str:
+    """Build the cache key for one image/settings combination.
+
+    Args:
+        digest (str): Hex content hash of the uploaded bytes.
+        n_colors (int): Number of colors requested.
+        *settings (str): Every other option that changes the palette (clustering mode, ingest mode, ...).
+
+    Returns:
+        str: Key such as '3fa2...:10:fast:quality'.
+    """
+    return ':'.join([digest, str(n_colors), *settings])
+
+
+class PaletteCache:
+    """Two-tier (memory LRU + optional SQLite) cache of extracted palettes.
+
+    Thread safe: Flask's development server handles requests on several threads.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 db_path: str | None = None, max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES):
+        """
+        Args:
+            max_entries (int): Maximum number of palettes kept in memory.
+            ttl_seconds (float): Lifetime of an entry in both tiers.
+            db_path (str | None): SQLite file for the disk tier. None disables it.
+            max_disk_entries (int): Maximum number of rows kept in the disk tier.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()     # key -> (stored_at, value), oldest first
+        self._lock = threading.Lock()
+        self._db = None
+
+        # Hit/miss counters exposed through stats()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS palettes (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS palettes_stored_at ON palettes (stored_at)")
+            self._db.commit()
+
+    # ---------------------------- PUBLIC API ------------------------------- #
+    def get(self, key: str):
+        """Return the cached value for key, or None on a miss (or expired entry)."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)   # Mark as most recently used
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, stored_at FROM palettes WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] <= self.ttl_seconds:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)   # Promote to the memory tier
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value):
+        """Store a JSON-serializable value in every tier."""
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, now, value)
+
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO palettes (key, value, stored_at) VALUES (?, ?, ?)",
+                                 (key, json.dumps(value), now))
+                self._evict_disk(now)
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM palettes").fetchone()[0]
+
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+            }
+
+    # ---------------------------- INTERNAL HELPERS ------------------------------- #
+    def _remember(self, key: str, stored_at: float, value):
+        """Insert into the memory tier and drop the least recently used entries."""
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        """Drop expired rows, then the oldest rows beyond max_disk_entries."""
+        self._db.execute("DELETE FROM palettes WHERE stored_at < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM palettes WHERE key IN ("
+            "SELECT key FROM palettes ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,))
+
+
+class ModelStateCache:
+    """Memory-only LRU of per-image PreparedImage objects for extract_dominant_colors().
+
+    Each request gets its own `model_state` dictionary from checkout() (seeded with the
+    shared PreparedImage, if any) and hands it back with store(): concurrent requests for
+    the same image never write to one dictionary. The PreparedImage itself is shared and
+    serializes its fits with its own lock.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_MODEL_STATES):
+        """
+        Args:
+            max_entries (int): Maximum number of images whose state is kept.
+        """
+        self.max_entries = max_entries
+        self._states = OrderedDict()     # key -> PreparedImage, oldest first
+        self._lock = threading.Lock()
+
+    def checkout(self, key: str) -> dict:
+        """Return a new `model_state` dictionary for one request, holding the stored PreparedImage (if any)."""
+        with self._lock:
+            prepared = self._states.get(key)
+            if prepared is None:
+                return {}
+            self._states.move_to_end(key)
+            return {'prepared': prepared}
+
+    def store(self, key: str, model_state: dict):
+        """Keep the PreparedImage of a finished request (evicting the LRU entry if needed).
+
+        If another request stored one for the same key in the meantime, that one is kept:
+        its fits are the ones later requests warm-start from.
+        """
+        prepared = model_state.get('prepared')
+        if prepared is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._states.setdefault(key, prepared)
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+def prune_folder(folder: str, max_bytes: int, max_age_seconds: float) -> int:
+    """Apply the size/age eviction policy to a folder of uploaded files.
+
+    Files older than max_age_seconds are always removed. If the rest still adds
+    up to more than max_bytes, the least recently modified files go first.
+
+    Args:
+        folder (str): Directory to prune (not recursive).
+        max_bytes (int): Maximum total size of the folder.
+        max_age_seconds (float): Maximum age of a file (by modification time).
+
+    Returns:
+        int: Number of files removed.
+    """
+    now = time.time()
+    removed = 0
+    survivors = []
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            if now - stat.st_mtime > max_age_seconds:
+                removed += _remove_quietly(entry.path)
+            else:
+                survivors.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in survivors)
+    for _, size, path in sorted(survivors):   # Oldest first
+        if total <= max_bytes:
+            break
+        removed += _remove_quietly(path)
+        total -= size
+
+    return removed
+
+
+def _remove_quietly(path: str) -> int:
+    """Delete a file, ignoring races with another worker. Returns 1 if it was removed."""
+    try:
+        os.remove(path)
+        return 1
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,191 @@
+"""
+BATCH WATERMARKING (COMMAND LINE)
+---------------------------------
+Watermarks every image of a directory tree with the headless engine
+(watermark_engine.py), mirroring the folder structure into an output folder.
+
+    python batch_watermark.py shoot/ -o shoot_watermarked/ --text "yourwebsite.com"
+    python batch_watermark.py shoot/ -o out/ --logo logo.png --scale 20 --position "Top Right" --workers 8
+    python batch_watermark.py shoot/ -o out/ --text "© studio" --tiled --angle 30 --gap 200
+    python batch_watermark.py shoot/ -o out/ --text "© studio" --quality 85 --progressive --keep-qtables
+
+Images are spread over a ProcessPoolExecutor (compositing is CPU bound, threads
+would all wait on the GIL). At most `max_in_flight` images are submitted at once
+and each worker opens, watermarks and saves its own file, so memory stays flat
+whether the shoot has a hundred images or a hundred thousand. PNG/TIFF images
+above large_image.LARGE_IMAGE_PIXELS are streamed in strips rather than decoded.
+Photos are turned upright from their EXIF orientation, and keep their EXIF and
+ICC profile (see benchmark_jpeg.py to choose the JPEG options of a bulk run).
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from font_registry import DEFAULT_FONT_FAMILY
+from large_image import should_stream, watermark_large_file
+from watermark_engine import (WatermarkSettings, JpegOptions, watermark_file, POSITIONS, DEFAULT_OPACITY,
+                              DEFAULT_FONT_SIZE, DEFAULT_LOGO_SCALE, DEFAULT_POSITION, DEFAULT_TILE_ANGLE,
+                              DEFAULT_TILE_GAP, DEFAULT_JPEG_QUALITY, DEFAULT_JPEG_SUBSAMPLING, JPEG_SUBSAMPLINGS)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tiff", ".webp")
+
+# One worker per core
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Pending images per worker before we stop submitting and wait for results
+IN_FLIGHT_PER_WORKER = 2
+
+
+def find_images(directory: str):
+    """Yield (relative_path, absolute_path) for every image under directory, recursively."""
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, filename)
+                yield os.path.relpath(path, directory), path
+
+
+def watermark_one(name: str, src_path: str, dst_path: str, settings: WatermarkSettings,
+                  jpeg: JpegOptions | None = None) -> dict:
+    """Worker entry point: watermark one file and never raise.
+
+    Returns:
+        dict: {'name'} on success, {'name', 'error'} on failure.
+    """
+    try:
+        if should_stream(src_path, dst_path):
+            watermark_large_file(src_path, dst_path, settings)   # Too big to decode at once: strip by strip
+        else:
+            watermark_file(src_path, dst_path, settings, jpeg)
+        return {'name': name}
+    except Exception as e:
+        return {'name': name, 'error': str(e)}
+
+
+def iter_watermarks(items, output_dir: str, settings: WatermarkSettings, executor, max_in_flight: int | None = None,
+                    jpeg: JpegOptions | None = None):
+    """Watermark (relative_path, absolute_path) pairs on a pool and yield results as they finish.
+
+    Args:
+        items (Iterable[tuple[str, str]]): Images to process. Consumed lazily.
+        output_dir (str): Root of the mirrored output tree.
+        settings (WatermarkSettings): Watermark applied to every image.
+        executor (concurrent.futures.Executor): Pool that runs watermark_one().
+        max_in_flight (int | None): Cap on submitted-but-unfinished images.
+        jpeg (JpegOptions | None): Encoding of JPEG outputs.
+
+    Yields:
+        dict: watermark_one() results, in completion order.
+    """
+    if max_in_flight is None:
+        max_in_flight = IN_FLIGHT_PER_WORKER * getattr(executor, '_max_workers', DEFAULT_WORKERS)
+
+    items = iter(items)
+    pending = set()
+
+    while True:
+        # Top the queue up to the in-flight limit
+        for name, src_path in items:
+            dst_path = os.path.join(output_dir, name)
+            pending.add(executor.submit(watermark_one, name, src_path, dst_path, settings, jpeg))
+            if len(pending) >= max_in_flight:
+                break
+
+        if not pending:
+            return
+
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def parse_color(value: str) -> tuple:
+    """'#rrggbb' (or 'rrggbb') → (r, g, b)."""
+    value = value.lstrip('#')
+    if len(value) != 6:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a #rrggbb color")
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a #rrggbb color") from None
+
+
+def add_watermark_arguments(parser: argparse.ArgumentParser):
+    """Add the watermark and JPEG output options (shared with watch_folder.py)."""
+    kind = parser.add_mutually_exclusive_group(required=True)
+    kind.add_argument('--text', help="Text watermark")
+    kind.add_argument('--logo', help="Logo watermark (PNG with transparency recommended)")
+
+    parser.add_argument('--font', default=DEFAULT_FONT_FAMILY,
+                        help="Installed font family or .ttf/.otf file (default: Arial)")
+    parser.add_argument('--font-size', type=int, default=DEFAULT_FONT_SIZE, help="Text size in px (default: 48)")
+    parser.add_argument('--color', type=parse_color, default='#ffffff', help="Text color as #rrggbb (default: white)")
+    parser.add_argument('--scale', type=int, default=DEFAULT_LOGO_SCALE, help="Logo scale in %% (default: 28)")
+    parser.add_argument('--opacity', type=int, default=DEFAULT_OPACITY, help="Opacity in %% (default: 55)")
+    parser.add_argument('--position', choices=POSITIONS, default=DEFAULT_POSITION, help="Watermark position")
+    parser.add_argument('--tiled', action='store_true', help="Repeat the watermark over the whole image")
+    parser.add_argument('--angle', type=int, default=DEFAULT_TILE_ANGLE, help="Tile rotation in degrees (default: 30)")
+    parser.add_argument('--gap', type=int, default=DEFAULT_TILE_GAP, help="Space between tiles in px (default: 150)")
+    parser.add_argument('--quality', type=int, default=DEFAULT_JPEG_QUALITY, help="JPEG quality 1-100 (default: 90)")
+    parser.add_argument('--progressive', action='store_true', help="Progressive JPEG")
+    parser.add_argument('--optimize', action='store_true', help="Optimized JPEG Huffman tables (smaller, slower)")
+    parser.add_argument('--subsampling', choices=JPEG_SUBSAMPLINGS, default=DEFAULT_JPEG_SUBSAMPLING,
+                        help="JPEG chroma subsampling (default: 4:2:0)")
+    parser.add_argument('--keep-qtables', action='store_true',
+                        help="Reuse each JPEG source's quantization tables instead of --quality")
+
+
+def settings_from_args(parser: argparse.ArgumentParser, args) -> tuple:
+    """(WatermarkSettings, JpegOptions) from add_watermark_arguments() options; invalid ones exit via parser.error()."""
+    try:
+        settings = WatermarkSettings(kind="Logo" if args.logo else "Text", text=args.text or "",
+                                     font_size=args.font_size, font_family=args.font, color=args.color, opacity=args.opacity,
+                                     position=args.position, logo_path=args.logo, logo_scale=args.scale,
+                                     layout="Tiled" if args.tiled else "Single", tile_angle=args.angle,
+                                     tile_gap=args.gap)
+        jpeg = JpegOptions(quality=args.quality, progressive=args.progressive, optimize=args.optimize,
+                           subsampling=args.subsampling, keep_qtables=args.keep_qtables)
+    except ValueError as e:
+        parser.error(str(e))
+    return settings, jpeg
+
+
+def check_output_dir(parser: argparse.ArgumentParser, directory: str, output_dir: str):
+    """Exit via parser.error() if output_dir is directory or inside it (the originals would be
+    overwritten, or the output picked up as input). Symbolic links are resolved: a link to the
+    hot folder would make the watch daemon watermark its own output forever."""
+    directory, output_dir = os.path.realpath(directory), os.path.realpath(output_dir)
+    if os.path.commonpath([directory, output_dir]) == directory:
+        parser.error("The output folder must not be the input folder or inside it")
+
+
+def main(argv=None):
+    """Parse arguments and watermark a whole directory tree."""
+    parser = argparse.ArgumentParser(description="Watermark every image in a directory tree.")
+    parser.add_argument('directory', help="Folder to scan (recursively)")
+    parser.add_argument('-o', '--output', required=True, help="Output folder (the tree is mirrored into it)")
+    add_watermark_arguments(parser)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    settings, jpeg = settings_from_args(parser, args)
+    check_output_dir(parser, args.directory, args.output)
+
+    done = failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for result in iter_watermarks(find_images(args.directory), args.output, settings, executor, jpeg=jpeg):
+            if 'error' in result:
+                failed += 1
+                print(f"❌ {result['name']}: {result['error']}", file=sys.stderr)
+            else:
+                done += 1
+                print(f"✅ {result['name']}")
+
+    print(f"{done} images watermarked, {failed} failed.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+JPEG OUTPUT BENCHMARK
+---------------------
+Encode time and file size of one watermarked photo for each JPEG setting, to pick
+the throughput / size trade-off of a bulk run (batch_watermark.py --quality ...).
+
+    python benchmark_jpeg.py                              # synthetic 24 MP photo
+    python benchmark_jpeg.py --image shoot/IMG_0042.jpg --quality 80 90 --repeat 5
+
+For every quality × subsampling, the photo is encoded baseline, progressive, optimized
+and both; "keep" rows reuse the source's own quantization tables (JpegOptions.keep_qtables).
+PSNR (dB, higher is closer) compares each output with the watermarked image before
+encoding, so sizes can be weighed against what they cost in quality.
+
+Without --image, a smooth gradient photo with fine noise is generated and saved as a
+quality 92 JPEG first, so the "keep" rows have source tables to reuse.
+"""
+
+import argparse
+import io
+import json
+import math
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageChops, ImageFilter, ImageStat
+
+from watermark_engine import (WatermarkSettings, JpegOptions, apply_watermark, load_image,
+                              JPEG_SUBSAMPLINGS, DEFAULT_FONT_SIZE)
+
+DEFAULT_QUALITIES = (75, 85, 90, 95)
+DEFAULT_SUBSAMPLINGS = ("4:2:0", "4:4:4")
+DEFAULT_MEGAPIXELS = 24
+DEFAULT_REPEAT = 3
+
+# Quality of the synthetic source JPEG (a typical camera setting)
+SOURCE_QUALITY = 92
+
+# (label, progressive, optimize)
+ENCODINGS = (("baseline", False, False), ("progressive", True, False), ("optimize", False, True),
+             ("prog+opt", True, True))
+
+
+def synthetic_photo(megapixels: float) -> bytes:
+    """A 3:2 JPEG with smooth gradients (sky) and fine noise (texture), as bytes."""
+    h = int((megapixels * 1_000_000 / 1.5) ** 0.5)
+    size = (int(h * 1.5), h)
+    noise = Image.effect_noise(size, 24).filter(ImageFilter.GaussianBlur(1))
+    photo = Image.merge("RGB", (Image.linear_gradient("L").resize(size), noise,
+                                Image.radial_gradient("L").resize(size)))
+    buffer = io.BytesIO()
+    photo.save(buffer, "JPEG", quality=SOURCE_QUALITY)
+    return buffer.getvalue()
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    """Peak signal-to-noise ratio between two RGB images of the same size, in dB."""
+    mse = sum(ImageStat.Stat(ImageChops.difference(a, b)).sum2) / (a.width * a.height * 3)
+    return math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def encode(image: Image.Image, jpeg: JpegOptions, metadata, repeat: int) -> tuple:
+    """(median encode seconds, encoded bytes) of saving image with these options."""
+    times = []
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        # The options save_watermarked() would use, encoded into memory (no disk in the timing)
+        image.save(buffer, "JPEG", **jpeg.save_options(image.mode, metadata))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), buffer.getvalue()
+
+
+def run(image: Image.Image, metadata, qualities, subsamplings, repeat: int):
+    """Yield one result dict per (options) combination."""
+    megapixels = image.width * image.height / 1_000_000
+    variants = [JpegOptions(quality=q, subsampling=s, progressive=p, optimize=o)
+                for q in qualities for s in subsamplings for _, p, o in ENCODINGS]
+    if metadata.qtables:
+        variants += [JpegOptions(keep_qtables=True, progressive=p, optimize=o) for _, p, o in ENCODINGS]
+
+    for jpeg in variants:
+        seconds, data = encode(image, jpeg, metadata, repeat)
+        with Image.open(io.BytesIO(data)) as decoded:
+            quality = psnr(image, decoded.convert("RGB"))
+        label = next(name for name, p, o in ENCODINGS if (p, o) == (jpeg.progressive, jpeg.optimize))
+        yield {'quality': "keep" if jpeg.keep_qtables else jpeg.quality,
+               'subsampling': (metadata.subsampling or "?") if jpeg.keep_qtables else jpeg.subsampling,
+               'encoding': label, 'ms': round(seconds * 1000, 1), 'mp_per_s': round(megapixels / seconds, 1),
+               'kb': round(len(data) / 1024), 'psnr': round(quality, 2)}
+
+
+def main(argv=None):
+    """Parse arguments, watermark the photo once and print one row per JPEG setting."""
+    parser = argparse.ArgumentParser(description="JPEG encode time and size per output setting.")
+    parser.add_argument('--image', help="Photo to test (default: a synthetic JPEG)")
+    parser.add_argument('--megapixels', type=float, default=DEFAULT_MEGAPIXELS,
+                        help="Size of the synthetic photo (default: 24)")
+    parser.add_argument('--quality', type=int, nargs='+', default=DEFAULT_QUALITIES,
+                        help="Qualities to test (default: 75 85 90 95)")
+    parser.add_argument('--subsampling', choices=JPEG_SUBSAMPLINGS, nargs='+', default=DEFAULT_SUBSAMPLINGS,
+                        help="Chroma subsamplings to test (default: 4:2:0 4:4:4)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Encodes per setting, median kept")
+    parser.add_argument('--json', help="Also write the raw results to this JSON file")
+    args = parser.parse_args(argv)
+
+    image, metadata = load_image(args.image or io.BytesIO(synthetic_photo(args.megapixels)))
+    with image:
+        settings = WatermarkSettings(kind="Text", text="© yourwebsite.com", font_size=DEFAULT_FONT_SIZE * 4)
+        photo = apply_watermark(image.convert("RGB"), settings, in_place=True)
+
+    print(f"{photo.width}x{photo.height} ({photo.width * photo.height / 1_000_000:.1f} MP), "
+          f"source subsampling {metadata.subsampling or 'n/a'}")
+    print(f"{'quality':>8}  {'sub':<6}{'encoding':<12}{'ms':>9}{'MP/s':>8}{'KB':>9}{'PSNR':>8}")
+    results = []
+    for r in run(photo, metadata, args.quality, args.subsampling, args.repeat):
+        results.append(r)
+        print(f"{r['quality']:>8}  {r['subsampling']:<6}{r['encoding']:<12}{r['ms']:>9}{r['mp_per_s']:>8}"
+              f"{r['kb']:>9}{r['psnr']:>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
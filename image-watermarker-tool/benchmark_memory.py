@@ -0,0 +1,149 @@
+"""
+WATERMARK MEMORY BENCHMARK
+--------------------------
+Compares the peak memory and time of watermarking one large photo with:
+
+   - legacy: the original GUI path. Full-frame RGBA copy of the photo, plus (Text) a
+     transparent full-frame layer, blended with Image.alpha_composite() into a third image.
+   - region: watermark_engine.apply_watermark(). The photo stays RGB and only the
+     rectangle under the watermark is blended (in_place=True also drops the one RGB copy).
+
+    python benchmark_memory.py                        # 12, 24 and 45 MP, text and logo
+    python benchmark_memory.py --megapixels 45 --kind logo
+
+Each measurement runs in a fresh Python process, because ru_maxrss is a high-water mark
+that never goes down: the child creates the photo, records its peak, watermarks it and
+reports how much the peak grew. Needs the `resource` module (Linux / macOS).
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from font_registry import load_font
+from watermark_engine import (WatermarkSettings, apply_watermark, get_position, get_sprite, DEFAULT_FONT_SIZE,
+                              DEFAULT_POSITION)
+
+STRATEGIES = ("legacy", "region")
+KINDS = ("text", "logo")
+DEFAULT_MEGAPIXELS = (12, 24, 45)
+
+# 3:2, like most camera sensors
+ASPECT_RATIO = 3 / 2
+
+WATERMARK_TEXT = "© yourwebsite.com"
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process so far, in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def photo_size(megapixels: float) -> tuple:
+    """(w, h) of a 3:2 image with about this many megapixels."""
+    h = int((megapixels * 1_000_000 / ASPECT_RATIO) ** 0.5)
+    return int(h * ASPECT_RATIO), h
+
+
+def make_logo(path: str):
+    """Write a semi-transparent 1200x600 PNG logo to path."""
+    logo = Image.new("RGBA", (1200, 600), (0, 0, 0, 0))
+    ImageDraw.Draw(logo).ellipse((0, 0, 1199, 599), fill=(220, 40, 40, 200))
+    logo.save(path)
+
+
+def legacy_watermark(image: Image.Image, settings: WatermarkSettings) -> Image.Image:
+    """The pre-engine GUI compositing: full-frame RGBA working copy (and full-frame text layer)."""
+    result = image.copy().convert("RGBA")
+    if settings.kind == "Text":
+        font = load_font(settings.font_size, settings.font_family)
+        fill_color = tuple(settings.color) + (int(255 * settings.opacity / 100.0),)
+        layer = Image.new("RGBA", result.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        bbox = draw.textbbox((0, 0), settings.text, font=font)
+        x, y = get_position(result.width, result.height, bbox[2] - bbox[0], bbox[3] - bbox[1], settings.position)
+        draw.text((x, y), settings.text, fill=fill_color, font=font)
+        return Image.alpha_composite(result, layer)
+
+    logo = get_sprite(settings).image
+    x, y = get_position(result.width, result.height, logo.width, logo.height, settings.position)
+    result.paste(logo, (x, y), logo)
+    return result
+
+
+def run_child(strategy: str, kind: str, megapixels: float, logo_path: str | None) -> dict:
+    """Measure one (strategy, kind, size) in this process and return the numbers."""
+    if kind == "text":
+        settings = WatermarkSettings(kind="Text", text=WATERMARK_TEXT, font_size=DEFAULT_FONT_SIZE * 4,
+                                     position=DEFAULT_POSITION)
+    else:
+        settings = WatermarkSettings(kind="Logo", logo_path=logo_path, logo_scale=100, position=DEFAULT_POSITION)
+    get_sprite(settings)   # Render (and cache) the sprite outside of the measurement
+
+    photo = Image.new("RGB", photo_size(megapixels), (90, 120, 150))
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if strategy == "legacy":
+        result = legacy_watermark(photo, settings)
+    else:
+        result = apply_watermark(photo, settings, in_place=True)
+    elapsed = time.perf_counter() - start
+
+    return {'strategy': strategy, 'kind': kind, 'megapixels': megapixels, 'mode': result.mode,
+            'photo_mb': round(photo.width * photo.height * 3 / (1024 * 1024), 1),
+            'extra_peak_mb': round(peak_rss_mb() - baseline, 1), 'ms': round(elapsed * 1000, 1)}
+
+
+def measure(strategy: str, kind: str, megapixels: float, logo_path: str) -> dict:
+    """Run run_child() in a fresh interpreter and return its result."""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', strategy, kind,
+                             str(megapixels), logo_path], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main(argv=None):
+    """Parse arguments, run every measurement in its own process and print a table."""
+    parser = argparse.ArgumentParser(description="Peak memory of legacy vs region watermark compositing.")
+    parser.add_argument('--megapixels', type=float, nargs='+', default=DEFAULT_MEGAPIXELS,
+                        help="Photo sizes to test (default: 12 24 45)")
+    parser.add_argument('--kind', choices=KINDS, nargs='+', default=KINDS, help="Watermark kinds (default: both)")
+    parser.add_argument('--json', help="Also write the raw results to this JSON file")
+    parser.add_argument('--child', nargs=4, metavar=('STRATEGY', 'KIND', 'MP', 'LOGO'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        strategy, kind, megapixels, logo_path = args.child
+        print(json.dumps(run_child(strategy, kind, float(megapixels), logo_path)))
+        return 0
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        logo_path = os.path.join(tmp, "logo.png")
+        make_logo(logo_path)
+
+        print(f"{'kind':<6}{'MP':>6}{'photo MB':>10}  {'strategy':<8}{'extra peak MB':>15}{'ms':>9}")
+        for kind in args.kind:
+            for megapixels in args.megapixels:
+                for strategy in STRATEGIES:
+                    r = measure(strategy, kind, megapixels, logo_path)
+                    results.append(r)
+                    print(f"{kind:<6}{megapixels:>6g}{r['photo_mb']:>10}  {strategy:<8}"
+                          f"{r['extra_peak_mb']:>15}{r['ms']:>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
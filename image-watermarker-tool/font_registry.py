@@ -0,0 +1,219 @@
+"""
+FONT REGISTRY
+-------------
+Finds the fonts installed on the system once, so text watermarks can use any of them
+by family name ("DejaVu Sans", "Arial", ...) without touching the disk on every render.
+
+   - FontRegistry.index(): every font file under the system / user font folders (the
+     folders fontconfig reads on Linux, plus the macOS and Windows ones), with the family
+     and style names FreeType reports. Opening each font is slow (hundreds of files),
+     so the index is cached on disk (FONT_INDEX_PATH) and only rebuilt when a font
+     folder's modification time changes (a font was installed or removed).
+   - FontRegistry.resolve(family): (path, face index) of the family's regular style.
+   - load_font(size, family): FreeTypeFont objects kept in an LRU cache keyed by
+     (path, face index, size): repeated renders pay no font I/O. A family that is not
+     installed falls back to FALLBACK_FAMILIES, then to Pillow's built-in scalable font,
+     so text always has the requested size.
+
+Used by watermark_engine.py (text sprites), main.py (font picker) and the command line
+tools (--font).
+"""
+
+import json
+import os
+import sys
+from functools import lru_cache
+
+from PIL import ImageFont
+
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc", ".otc")
+COLLECTION_EXTENSIONS = (".ttc", ".otc")
+
+# Faces read from one .ttc/.otc collection at most
+MAX_COLLECTION_FACES = 32
+
+# FreeTypeFont objects kept open: a few families × the sizes of the full render and the preview
+FONT_CACHE_SIZE = 32
+
+DEFAULT_FONT_FAMILY = "Arial"
+
+# Tried, in order, when the requested family is not installed (metric-compatible Arial look-alikes first)
+FALLBACK_FAMILIES = ("Arial", "Liberation Sans", "Arimo", "Helvetica", "DejaVu Sans", "Noto Sans")
+
+# Style names of the "normal" face of a family, best first
+REGULAR_STYLES = ("regular", "book", "normal", "roman", "medium")
+
+INDEX_VERSION = 1
+
+
+def user_cache_dir() -> str:
+    """Per-user cache folder of the app (LOCALAPPDATA on Windows, Library/Caches on macOS, XDG elsewhere)."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "image-watermarker")
+
+
+FONT_INDEX_PATH = os.path.join(user_cache_dir(), "fonts.json")
+
+
+def system_font_dirs() -> list:
+    """Folders fonts are installed into on this OS (the ones that exist)."""
+    if sys.platform == "win32":
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        dirs = [os.path.join(windir, "Fonts"),
+                os.path.join(os.environ.get("LOCALAPPDATA", ""), "Microsoft", "Windows", "Fonts")]
+    elif sys.platform == "darwin":
+        dirs = ["/System/Library/Fonts", "/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+    else:
+        # fontconfig's default <dir> entries
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        dirs = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.join(data_home, "fonts"),
+                os.path.expanduser("~/.fonts")]
+    return [d for d in dirs if os.path.isdir(d)]
+
+
+class FontRegistry:
+    """Index of the installed fonts, by family name.
+
+    Args:
+        font_dirs (list[str] | None): Folders to scan (default: system_font_dirs()).
+        cache_path (str | None): JSON index cache (default: FONT_INDEX_PATH; None: no disk cache).
+    """
+
+    def __init__(self, font_dirs=None, cache_path: str | None = FONT_INDEX_PATH):
+        self.font_dirs = system_font_dirs() if font_dirs is None else list(font_dirs)
+        self.cache_path = cache_path
+        self._fonts = None      # [(path, index, family, style)]
+        self._families = None   # lower-case family → [(path, index, style)]
+
+    def index(self) -> list:
+        """[(path, face index, family, style)] of every installed font, from the disk cache when up to date."""
+        if self._fonts is None:
+            signature = self._signature()
+            self._fonts = self._load_cache(signature)
+            if self._fonts is None:
+                self._fonts = self._scan()
+                self._save_cache(signature)
+            self._families = {}
+            for path, index, family, style in self._fonts:
+                self._families.setdefault(family.lower(), []).append((path, index, style))
+        return self._fonts
+
+    def families(self) -> list:
+        """Sorted family names (for a font picker)."""
+        return sorted({family for _, _, family, _ in self.index()}, key=str.lower)
+
+    def resolve(self, family: str):
+        """(path, face index) of family's regular face (or its first one), or None if it is not installed.
+
+        A path to a font file is accepted too.
+        """
+        if family.lower().endswith(FONT_EXTENSIONS) and os.path.isfile(family):
+            return family, 0
+        self.index()
+        faces = self._families.get(family.strip().lower())
+        if not faces:
+            return None
+
+        def rank(face):
+            style = face[2].lower()
+            return REGULAR_STYLES.index(style) if style in REGULAR_STYLES else len(REGULAR_STYLES)
+        path, index, _ = min(faces, key=rank)
+        return path, index
+
+    # ---------------------------- SCANNING ------------------------------- #
+    def _signature(self) -> list:
+        """[(folder, mtime_ns)] of every folder under font_dirs: changes when a font is added or removed."""
+        signature = []
+        for root_dir in self.font_dirs:
+            for root, _, _ in os.walk(root_dir):
+                try:
+                    signature.append([root, os.stat(root).st_mtime_ns])
+                except OSError:
+                    pass
+        return sorted(signature)
+
+    def _scan(self) -> list:
+        """Open every font file under font_dirs and read its family / style names."""
+        fonts = []
+        for root_dir in self.font_dirs:
+            for root, _, files in os.walk(root_dir):
+                for filename in sorted(files):
+                    lower = filename.lower()
+                    if not lower.endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, filename)
+                    faces = MAX_COLLECTION_FACES if lower.endswith(COLLECTION_EXTENSIONS) else 1
+                    for index in range(faces):
+                        try:
+                            family, style = ImageFont.truetype(path, 12, index=index).getname()
+                        except OSError:
+                            break   # Past the last face of a collection, or not a font FreeType reads
+                        if family:
+                            fonts.append((path, index, family, style or "Regular"))
+        return fonts
+
+    def _load_cache(self, signature: list):
+        """The cached index if it was built from the same folders in the same state, else None."""
+        if self.cache_path is None:
+            return None
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cache.get("version") != INDEX_VERSION or cache.get("signature") != signature:
+            return None
+        return [tuple(font) for font in cache["fonts"]]
+
+    def _save_cache(self, signature: list):
+        """Write the index next to a temporary name, then rename it (concurrent processes never read half a file)."""
+        if self.cache_path is None:
+            return
+        temp_path = f"{self.cache_path}.{os.getpid()}.part"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "signature": signature, "fonts": self._fonts}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass   # A read-only cache folder only costs a rescan next time
+
+
+@lru_cache(maxsize=None)
+def get_registry() -> FontRegistry:
+    """The registry of the system fonts, built (or read from the disk cache) on first use."""
+    return FontRegistry()
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _truetype(path: str, index: int, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size, index=index)
+
+
+def load_font(size: int, family: str = DEFAULT_FONT_FAMILY):
+    """family (a name or a font file path) at size pixels, from the LRU cache.
+
+    Falls back to FALLBACK_FAMILIES, then to Pillow's built-in font at the same size.
+    """
+    registry = get_registry()
+    for name in (family,) + FALLBACK_FAMILIES:
+        face = registry.resolve(name)
+        if face is not None:
+            try:
+                return _truetype(*face, size)
+            except OSError:
+                continue   # Uninstalled since the index was built
+    return _default_font(size)
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _default_font(size: int):
+    return ImageFont.load_default(size)
@@ -0,0 +1,568 @@
+"""
+LARGE-IMAGE MODE (STRIP STREAMING)
+----------------------------------
+Gigapixel scans and panoramas do not fit in memory once decoded (a 2 GP RGB image
+is 6 GB before any copy). This module watermarks them file to file, one
+horizontal strip at a time:
+
+    read rows y0..y1 → watermark them if the watermark crosses them → write them → next strip
+
+so peak memory is a few strips (STRIP_BUDGET_BYTES of pixels each), however tall
+the image is.
+
+   - Readers: PNG (8-bit, not interlaced) and TIFF (8-bit, strip-organized,
+     uncompressed / Deflate / PackBits). Headers are parsed here, so Pillow never
+     sees the full size (nor its decompression bomb limit); the pixels of each strip
+     are still decoded by Pillow's C decoders.
+   - Writers: PNG and TIFF (BigTIFF past 4 GB), both written incrementally.
+   - watermark_large_file(src, dst, settings): the whole pipeline, written with
+     atomic_write() like every other save.
+
+Used by main.py (images above LARGE_IMAGE_PIXELS) and batch_watermark.py.
+"""
+
+import os
+import struct
+import zlib
+
+from PIL import Image, ImageChops
+
+from watermark_engine import WatermarkSettings, apply_watermark, atomic_write
+
+# ---------------------------- CONSTANTS ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+# Images with more pixels than this are streamed in strips (when both formats allow it)
+LARGE_IMAGE_PIXELS = 100_000_000
+
+# Decoded pixels held per strip
+STRIP_BUDGET_BYTES = 32 * 1024 * 1024
+
+STREAM_EXTENSIONS = (".png", ".tif", ".tiff")
+
+# Output: PNG data chunk size, uncompressed bytes per TIFF strip
+PNG_IDAT_BYTES = 1024 * 1024
+TIFF_STRIP_BYTES = 256 * 1024
+
+# zlib level of the output. 1 rather than Pillow's 6: several times faster for a few % more size,
+# the right trade-off at a gigapixel.
+DEFLATE_LEVEL = 1
+
+# Uncompressed size above which TIFF output switches to BigTIFF (64-bit offsets)
+BIGTIFF_THRESHOLD = 3_800_000_000
+
+# Compressed/raw bytes read from the input at once
+FILE_READ_BYTES = 1024 * 1024
+
+# Largest piece of a zlib stream inflated at once (a tiny compressed chunk can inflate to gigabytes)
+INFLATE_CHUNK_BYTES = 4 * 1024 * 1024
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color type → (Pillow mode, bytes per pixel) at 8 bits per sample
+_PNG_MODES = {0: ("L", 1), 2: ("RGB", 3), 3: ("P", 1), 4: ("LA", 2), 6: ("RGBA", 4)}
+
+# TIFF SamplesPerPixel → Pillow mode at 8 bits per sample
+_TIFF_MODES = {1: "L", 2: "LA", 3: "RGB", 4: "RGBA"}
+
+# TIFF compression tags: none, Adobe Deflate, old Deflate, PackBits
+_TIFF_RAW, _TIFF_DEFLATE, _TIFF_DEFLATE_OLD, _TIFF_PACKBITS = 1, 8, 32946, 32773
+
+# TIFF field types that hold integers → struct format
+_TIFF_INT_TYPES = {1: "B", 3: "H", 4: "I", 16: "Q"}
+_SHORT, _LONG, _LONG8 = 3, 4, 16
+
+# Tags the reader needs
+(_WIDTH, _LENGTH, _BITS, _COMPRESSION, _PHOTOMETRIC, _STRIP_OFFSETS, _SAMPLES, _ROWS_PER_STRIP,
+ _STRIP_BYTE_COUNTS, _PLANAR, _PREDICTOR, _TILE_WIDTH, _EXTRA_SAMPLES) = (
+    256, 257, 258, 259, 262, 273, 277, 278, 279, 284, 317, 322, 338)
+
+
+# ---------------------------- HELPERS ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+def can_stream(src_path: str, dst_path: str) -> bool:
+    """True if both files are in formats the strip pipeline reads/writes."""
+    return src_path.lower().endswith(STREAM_EXTENSIONS) and dst_path.lower().endswith(STREAM_EXTENSIONS)
+
+
+def should_stream(src_path: str, dst_path: str | None = None) -> bool:
+    """True if src_path is a PNG/TIFF the strip pipeline can read and it has more than LARGE_IMAGE_PIXELS pixels.
+
+    dst_path (when given) must be a PNG/TIFF too.
+    """
+    if not can_stream(src_path, dst_path or src_path):
+        return False
+    try:
+        width, height = open_strip_reader(src_path).size
+    except (OSError, ValueError, struct.error):
+        return False   # Not something we can stream: the normal (full decode) path reports the problem
+    return width * height > LARGE_IMAGE_PIXELS
+
+
+def strip_rows(width: int, mode: str, budget: int = STRIP_BUDGET_BYTES) -> int:
+    """Rows per strip so that one decoded strip stays within budget bytes."""
+    return max(1, budget // (width * len(mode)))
+
+
+def _horizontal_difference(image: Image.Image) -> Image.Image:
+    """Each pixel minus its left neighbor, modulo 256: PNG's "Sub" filter and TIFF's predictor 2."""
+    shifted = Image.new(image.mode, image.size)
+    shifted.paste(image.crop((0, 0, image.width - 1, image.height)), (1, 0))
+    return ImageChops.subtract_modulo(image, shifted)
+
+
+def _decode_filtered(mode: str, width: int, rows: int, data: bytes) -> Image.Image:
+    """Decode rows that each start with a PNG filter byte, with Pillow's PNG ("zip") decoder.
+
+    The decoder wants a zlib stream: level 0 only wraps the bytes (no compression work).
+    """
+    return Image.frombytes(mode, (width, rows), zlib.compress(data, 0), "zip", mode)
+
+
+def _with_filter_byte(data: bytes, stride: int, filter_type: bytes) -> bytes:
+    """Prefix every stride-long row of data with a PNG filter byte."""
+    return b"".join(filter_type + data[i:i + stride] for i in range(0, len(data), stride))
+
+
+def _inflate(chunks):
+    """Inflate a zlib stream split across chunks, never more than INFLATE_CHUNK_BYTES at a time."""
+    inflater = zlib.decompressobj()
+    for chunk in chunks:
+        data = inflater.decompress(chunk, INFLATE_CHUNK_BYTES)
+        yield data
+        while inflater.unconsumed_tail:
+            yield inflater.decompress(inflater.unconsumed_tail, INFLATE_CHUNK_BYTES)
+    yield inflater.flush()
+
+
+# ---------------------------- READERS ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+def open_strip_reader(path: str):
+    """Return a PngStripReader or TiffStripReader for path (headers only are read).
+
+    Raises:
+        ValueError: If the format or its variant (16-bit, interlaced, tiled, LZW...) cannot be streamed.
+        OSError: If the file cannot be read.
+    """
+    if path.lower().endswith(".png"):
+        return PngStripReader(path)
+    if path.lower().endswith((".tif", ".tiff")):
+        return TiffStripReader(path)
+    raise ValueError("Large-image mode reads PNG and TIFF files only")
+
+
+class PngStripReader:
+    """Streams the rows of an 8-bit, non-interlaced PNG.
+
+    Attributes:
+        size: (width, height).
+        mode: Mode of the strips: "RGBA" if the image has transparency, else "RGB".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.palette = self.transparency = None
+        with open(path, "rb") as f:
+            if f.read(8) != PNG_SIGNATURE:
+                raise ValueError(f"'{os.path.basename(path)}' is not a PNG file")
+            for chunk_type, data in self._chunks(f):
+                if chunk_type == b"IHDR":
+                    width, height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", data)
+                elif chunk_type == b"PLTE":
+                    self.palette = data
+                elif chunk_type == b"tRNS":
+                    self.transparency = data
+                elif chunk_type == b"IDAT":
+                    break
+
+        if depth != 8 or color_type not in _PNG_MODES or interlace:
+            raise ValueError("Large-image mode reads 8-bit, non-interlaced PNGs only")
+        self.size = self.width, self.height = width, height
+        self.raw_mode, self.bytes_per_pixel = _PNG_MODES[color_type]
+        has_alpha = self.raw_mode in ("LA", "RGBA") or self.transparency is not None
+        self.mode = "RGBA" if has_alpha else "RGB"
+
+    @staticmethod
+    def _chunks(f, skip_data_of=()):
+        """Yield (type, data) for every chunk; the data of types in skip_data_of is not read (b"" instead)."""
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type in skip_data_of:
+                f.seek(length, os.SEEK_CUR)
+                data = b""
+            else:
+                data = f.read(length)
+            f.seek(4, os.SEEK_CUR)   # CRC
+            yield chunk_type, data
+            if chunk_type == b"IEND":
+                return
+
+    def _idat_data(self, f):
+        """Yield the content of every IDAT chunk."""
+        for chunk_type, data in self._chunks(f, skip_data_of=(b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"iCCP")):
+            if chunk_type == b"IDAT":
+                yield data
+
+    def iter_strips(self, rows: int):
+        """Yield (top, strip) for consecutive strips of at most `rows` rows, in self.mode."""
+        stride = self.width * self.bytes_per_pixel
+        pending = bytearray()
+        previous = bytes(stride)   # Last row of the previous strip, unfiltered (zeros above the image)
+        top = 0
+
+        with open(self.path, "rb") as f:
+            f.seek(8)
+            for data in _inflate(self._idat_data(f)):
+                pending += data
+                while top < self.height:
+                    count = min(rows, self.height - top)
+                    size = count * (stride + 1)
+                    if len(pending) < size:
+                        break
+                    # The rows' "Up/Average/Paeth" filters refer to the row above: give the decoder
+                    # the previous strip's last row first, as an unfiltered (type 0) row.
+                    decoded = _decode_filtered(self.raw_mode, self.width, count + 1,
+                                               b"\x00" + previous + bytes(pending[:size]))
+                    del pending[:size]
+                    previous = decoded.crop((0, count, self.width, count + 1)).tobytes()
+                    yield top, self._to_output_mode(decoded.crop((0, 1, self.width, count + 1)))
+                    top += count
+
+        if top < self.height:
+            raise ValueError(f"'{os.path.basename(self.path)}' is truncated")
+
+    def _to_output_mode(self, strip: Image.Image) -> Image.Image:
+        if self.raw_mode == "P":
+            if self.transparency is not None:
+                # Palette + per-entry alpha (tRNS) → RGBA palette
+                alpha = self.transparency + b"\xff" * (len(self.palette) // 3 - len(self.transparency))
+                rgba = b"".join(self.palette[i * 3:i * 3 + 3] + alpha[i:i + 1] for i in range(len(self.palette) // 3))
+                strip.putpalette(rgba, "RGBA")
+            else:
+                strip.putpalette(self.palette)
+        elif self.transparency is not None and self.raw_mode in ("L", "RGB"):
+            # tRNS holds one 16-bit transparent color key
+            key = struct.unpack(f">{len(self.transparency) // 2}H", self.transparency)
+            strip.info["transparency"] = key[0] if self.raw_mode == "L" else key
+        return strip if strip.mode == self.mode else strip.convert(self.mode)
+
+
+class TiffStripReader:
+    """Streams the strips of an 8-bit, strip-organized TIFF (first page).
+
+    Attributes:
+        size: (width, height).
+        mode: Mode of the strips: "RGBA" if the image has an alpha channel, else "RGB".
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            tags = self._read_ifd(f)
+
+        name = os.path.basename(path)
+        if _TILE_WIDTH in tags:
+            raise ValueError(f"'{name}' is a tiled TIFF: large-image mode reads strip TIFFs only")
+        samples = tags.get(_SAMPLES, (1,))[0]
+        self.compression = tags.get(_COMPRESSION, (_TIFF_RAW,))[0]
+        self.predictor = tags.get(_PREDICTOR, (1,))[0]
+        if (samples not in _TIFF_MODES or set(tags.get(_BITS, (8,))) != {8} or tags.get(_PLANAR, (1,))[0] != 1
+                or tags.get(_PHOTOMETRIC, (1,))[0] not in (1, 2)):
+            raise ValueError(f"'{name}': large-image mode reads 8-bit grayscale/RGB(A) TIFFs only")
+        if self.compression not in (_TIFF_RAW, _TIFF_DEFLATE, _TIFF_DEFLATE_OLD, _TIFF_PACKBITS):
+            raise ValueError(f"'{name}': large-image mode reads uncompressed, Deflate or PackBits TIFFs only")
+        if self.predictor not in (1, 2) or (self.predictor == 2 and self.compression == _TIFF_PACKBITS):
+            raise ValueError(f"'{name}': unsupported TIFF predictor")
+
+        self.size = self.width, self.height = tags[_WIDTH][0], tags[_LENGTH][0]
+        self.raw_mode = _TIFF_MODES[samples]
+        self.mode = "RGBA" if samples in (2, 4) else "RGB"
+        self.rows_per_strip = min(tags.get(_ROWS_PER_STRIP, (self.height,))[0], self.height)
+        self.strip_offsets = tags[_STRIP_OFFSETS]
+        self.strip_byte_counts = tags[_STRIP_BYTE_COUNTS]
+        # Uncompressed and Deflate strips are read piece by piece, whatever their height (many
+        # scanners write the whole image as one strip). A PackBits strip is decoded whole.
+        if (self.compression == _TIFF_PACKBITS
+                and self.rows_per_strip * self.width * len(self.raw_mode) > STRIP_BUDGET_BYTES):
+            raise ValueError(f"'{name}': PackBits strips too large to stream")
+
+    @staticmethod
+    def _read_ifd(f) -> dict:
+        """Parse the integer tags of the first IFD (classic TIFF or BigTIFF, either byte order)."""
+        order = f.read(2)
+        if order not in (b"II", b"MM"):
+            raise ValueError("Not a TIFF file")
+        e = "<" if order == b"II" else ">"
+        magic, = struct.unpack(e + "H", f.read(2))
+        if magic == 42:
+            offset_format, count_format, entry_size = "I", "H", 12
+        elif magic == 43:
+            offset_format, count_format, entry_size = "Q", "Q", 20
+            f.read(4)   # Offset size (8) and padding
+        else:
+            raise ValueError("Not a TIFF file")
+
+        f.seek(struct.unpack(e + offset_format, f.read(struct.calcsize(offset_format)))[0])
+        entries, = struct.unpack(e + count_format, f.read(struct.calcsize(count_format)))
+        tags = {}
+        for _ in range(entries):
+            entry = f.read(entry_size)
+            tag, field_type = struct.unpack(e + "HH", entry[:4])
+            count, = struct.unpack(e + offset_format, entry[4:entry_size // 2 + 2])
+            value = entry[entry_size // 2 + 2:]
+            if field_type not in _TIFF_INT_TYPES:
+                continue
+            item_format = _TIFF_INT_TYPES[field_type]
+            size = struct.calcsize(item_format) * count
+            if size > len(value):   # Stored elsewhere in the file: the field holds its offset
+                position = f.tell()
+                f.seek(struct.unpack(e + offset_format, value)[0])
+                value = f.read(size)
+                f.seek(position)
+            tags[tag] = struct.unpack(f"{e}{count}{item_format}", value[:size])
+        return tags
+
+    def _strip_data(self, f, index: int, rows: int):
+        """Yield the bytes of file strip index (`rows` rows), uncompressed but still predicted, in bounded pieces."""
+        f.seek(self.strip_offsets[index])
+        if self.compression == _TIFF_PACKBITS:
+            data = f.read(self.strip_byte_counts[index])
+            yield Image.frombytes(self.raw_mode, (self.width, rows), data, "packbits", self.raw_mode).tobytes()
+            return
+
+        def read(remaining):
+            while remaining > 0:
+                data = f.read(min(FILE_READ_BYTES, remaining))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+
+        if self.compression == _TIFF_RAW:
+            yield from read(self.strip_byte_counts[index])
+        else:
+            yield from _inflate(read(self.strip_byte_counts[index]))
+
+    def _decode_rows(self, data: bytes, rows: int) -> Image.Image:
+        """Rows of uncompressed strip data → image in self.mode (undoing the predictor)."""
+        if self.predictor == 2:
+            # Horizontal differencing is PNG's "Sub" filter (type 1): let Pillow's PNG decoder undo it
+            stride = self.width * len(self.raw_mode)
+            strip = _decode_filtered(self.raw_mode, self.width, rows, _with_filter_byte(data, stride, b"\x01"))
+        else:
+            strip = Image.frombytes(self.raw_mode, (self.width, rows), data)
+        return strip.convert(self.mode) if strip.mode != self.mode else strip
+
+    def iter_strips(self, rows: int):
+        """Yield (top, strip) for consecutive strips of at most `rows` rows, in self.mode.
+
+        The file's own strips are read in pieces and regrouped, so memory is bounded by `rows`
+        even when the file holds the whole image as a single strip.
+        """
+        stride = self.width * len(self.raw_mode)
+        pending = bytearray()
+        top = 0
+
+        with open(self.path, "rb") as f:
+            for index in range(len(self.strip_offsets)):
+                count = min(self.rows_per_strip, self.height - index * self.rows_per_strip)
+                if count <= 0:
+                    break
+                expected = count * stride
+                for data in self._strip_data(f, index, count):
+                    data = data[:expected]   # Some writers pad the last strip
+                    expected -= len(data)
+                    pending += data
+                    while top < self.height:
+                        out_rows = min(rows, self.height - top)
+                        size = out_rows * stride
+                        if len(pending) < size:
+                            break
+                        yield top, self._decode_rows(bytes(pending[:size]), out_rows)
+                        del pending[:size]
+                        top += out_rows
+                if expected > 0:
+                    break
+
+        if top < self.height:
+            raise ValueError(f"'{os.path.basename(self.path)}' is truncated")
+
+
+# ---------------------------- WRITERS ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+class PngStripWriter:
+    """Writes an RGB/RGBA PNG strip by strip (Sub-filtered rows, one zlib stream over many IDAT chunks)."""
+
+    def __init__(self, f, size: tuple, mode: str, compress_level: int = DEFLATE_LEVEL):
+        self._f = f
+        self._width = size[0]
+        self._bands = len(mode)
+        self._deflater = zlib.compressobj(compress_level)
+        self._buffer = bytearray()
+        f.write(PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", size[0], size[1], 8, 6 if mode == "RGBA" else 2, 0, 0, 0))
+
+    def _chunk(self, chunk_type: bytes, data: bytes):
+        self._f.write(struct.pack(">I", len(data)) + chunk_type)
+        self._f.write(data)
+        self._f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    def write(self, strip: Image.Image):
+        rows = _with_filter_byte(_horizontal_difference(strip).tobytes(), self._width * self._bands, b"\x01")
+        self._buffer += self._deflater.compress(rows)
+        while len(self._buffer) >= PNG_IDAT_BYTES:
+            self._chunk(b"IDAT", bytes(self._buffer[:PNG_IDAT_BYTES]))
+            del self._buffer[:PNG_IDAT_BYTES]
+
+    def close(self):
+        self._buffer += self._deflater.flush()
+        if self._buffer:
+            self._chunk(b"IDAT", bytes(self._buffer))
+        self._chunk(b"IEND", b"")
+
+
+class TiffStripWriter:
+    """Writes an RGB/RGBA TIFF strip by strip (Deflate + predictor 2), the directory (IFD) last.
+
+    The output file must be seekable: the header's pointer to the IFD is patched at close().
+    Images over BIGTIFF_THRESHOLD bytes are written as BigTIFF (64-bit offsets).
+    """
+
+    def __init__(self, f, size: tuple, mode: str, compress_level: int = DEFLATE_LEVEL):
+        self._f = f
+        self._size = size
+        self._mode = mode
+        self._level = compress_level
+        self._big = size[0] * size[1] * len(mode) > BIGTIFF_THRESHOLD
+        self._rows_per_strip = max(1, TIFF_STRIP_BYTES // (size[0] * len(mode)))
+        self._pending = None
+        self._offsets, self._byte_counts = [], []
+        # Header; the IFD offset is a placeholder until close()
+        f.write(b"II+\x00" + struct.pack("<HHQ", 8, 0, 0) if self._big else b"II*\x00" + struct.pack("<I", 0))
+
+    def write(self, strip: Image.Image):
+        top = 0
+        if self._pending is not None:
+            # Complete the rows left over from the previous strip
+            needed = min(self._rows_per_strip - self._pending.height, strip.height)
+            chunk = Image.new(self._mode, (self._size[0], self._pending.height + needed))
+            chunk.paste(self._pending, (0, 0))
+            chunk.paste(strip.crop((0, 0, strip.width, needed)), (0, self._pending.height))
+            self._pending, top = None, needed
+            if chunk.height < self._rows_per_strip:
+                self._pending = chunk
+                return
+            self._write_strip(chunk)
+
+        while strip.height - top >= self._rows_per_strip:
+            self._write_strip(strip.crop((0, top, strip.width, top + self._rows_per_strip)))
+            top += self._rows_per_strip
+        if top < strip.height:
+            self._pending = strip.crop((0, top, strip.width, strip.height))
+
+    def _write_strip(self, chunk: Image.Image):
+        data = zlib.compress(_horizontal_difference(chunk).tobytes(), self._level)
+        self._offsets.append(self._f.tell())
+        self._byte_counts.append(len(data))
+        self._f.write(data)
+
+    def close(self):
+        if self._pending is not None:
+            self._write_strip(self._pending)
+            self._pending = None
+
+        bands = len(self._mode)
+        offset_type = _LONG8 if self._big else _LONG
+        entries = [(_WIDTH, _LONG, [self._size[0]]), (_LENGTH, _LONG, [self._size[1]]), (_BITS, _SHORT, [8] * bands),
+                   (_COMPRESSION, _SHORT, [_TIFF_DEFLATE]), (_PHOTOMETRIC, _SHORT, [2]),
+                   (_STRIP_OFFSETS, offset_type, self._offsets), (_SAMPLES, _SHORT, [bands]),
+                   (_ROWS_PER_STRIP, _LONG, [self._rows_per_strip]),
+                   (_STRIP_BYTE_COUNTS, offset_type, self._byte_counts), (_PLANAR, _SHORT, [1]),
+                   (_PREDICTOR, _SHORT, [2])]
+        if bands == 4:
+            entries.append((_EXTRA_SAMPLES, _SHORT, [2]))   # Unassociated alpha
+
+        offset_format, count_format, inline = ("Q", "Q", 8) if self._big else ("I", "H", 4)
+        # Values too long to fit in their entry go before the IFD; entries point to them
+        fields = []
+        for tag, field_type, values in entries:
+            data = struct.pack(f"<{len(values)}{_TIFF_INT_TYPES[field_type]}", *values)
+            if len(data) > inline:
+                self._align()
+                position = self._f.tell()
+                self._f.write(data)
+                data = struct.pack("<" + offset_format, position)
+            fields.append(struct.pack(f"<HH{offset_format}", tag, field_type, len(values)) + data.ljust(inline, b"\0"))
+
+        self._align()
+        ifd_offset = self._f.tell()
+        self._f.write(struct.pack("<" + count_format, len(fields)) + b"".join(fields))
+        self._f.write(struct.pack("<" + offset_format, 0))   # No next IFD
+        self._f.seek(8 if self._big else 4)
+        self._f.write(struct.pack("<" + offset_format, ifd_offset))
+        self._f.seek(0, os.SEEK_END)
+
+    def _align(self):
+        """TIFF offsets must be even (word aligned)."""
+        if self._f.tell() % 2:
+            self._f.write(b"\0")
+
+
+# ---------------------------- PIPELINE ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+def watermark_large_file(src_path: str, dst_path: str, settings: WatermarkSettings, rows: int | None = None,
+                         progress=None, compress_level: int = DEFLATE_LEVEL):
+    """Watermark a PNG/TIFF into a PNG/TIFF strip by strip, without ever decoding the whole image.
+
+    Args:
+        src_path (str): PNG or TIFF to watermark.
+        dst_path (str): .png, .tif or .tiff output (written atomically; parent folders are created).
+        settings (WatermarkSettings): Watermark to apply, placed on the whole image.
+        rows (int | None): Rows per strip (default: STRIP_BUDGET_BYTES of pixels).
+        progress (Callable[[int, int], None] | None): Called with (rows done, total rows) after each strip.
+            Raising from it (e.g. RenderCancelled) aborts, leaving dst_path untouched.
+        compress_level (int): zlib level of the output, 0 (none, fastest) to 9 (smallest).
+
+    Raises:
+        ValueError: If either format cannot be streamed.
+        OSError: If the image or logo cannot be read, or the result cannot be written.
+    """
+    if not can_stream(src_path, dst_path):
+        raise ValueError("Large-image mode reads and writes PNG and TIFF files only")
+    reader = open_strip_reader(src_path)
+    writer_class = PngStripWriter if dst_path.lower().endswith(".png") else TiffStripWriter
+    rows = rows or strip_rows(reader.width, reader.mode)
+
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    with atomic_write(dst_path) as f:
+        writer = writer_class(f, reader.size, reader.mode, compress_level)
+        for top, strip in reader.iter_strips(rows):
+            # Placement is computed on the whole image; strips the watermark misses are copied through
+            writer.write(apply_watermark(strip, settings, in_place=True, canvas_size=reader.size, top=top))
+            if progress is not None:
+                progress(top + strip.height, reader.height)
+        writer.close()
+
+
+def make_proxy(path: str, max_dim: int, progress=None) -> tuple:
+    """Build a downscaled copy of a large PNG/TIFF strip by strip (for the GUI preview).
+
+    progress is called like watermark_large_file()'s.
+
+    Returns:
+        tuple: (proxy image fitting max_dim × max_dim, full (width, height)).
+    """
+    reader = open_strip_reader(path)
+    ratio = min(1.0, max_dim / max(reader.size))
+    proxy_w, proxy_h = max(1, round(reader.width * ratio)), max(1, round(reader.height * ratio))
+    proxy = Image.new(reader.mode, (proxy_w, proxy_h))
+    for top, strip in reader.iter_strips(strip_rows(reader.width, reader.mode)):
+        # Each strip becomes the proxy rows it covers
+        y0, y1 = round(top * ratio), round((top + strip.height) * ratio)
+        if y1 > y0:
+            proxy.paste(strip.resize((proxy_w, y1 - y0), Image.Resampling.LANCZOS, reducing_gap=3.0), (0, y0))
+        if progress is not None:
+            progress(top + strip.height, reader.height)
+    return proxy, reader.size
@@ -1,6 +1,14 @@
+import queue
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser
-from PIL import Image, ImageDraw, ImageFont, ImageTk
+from PIL import Image, ImageTk
+
+from watermark_engine import (WatermarkSettings, JpegOptions, apply_watermark, load_image, DEFAULT_FONT_SIZE,
+                              DEFAULT_LOGO_SCALE, LAYOUTS, DEFAULT_LAYOUT, DEFAULT_TILE_ANGLE, DEFAULT_TILE_GAP,
+                              DEFAULT_JPEG_QUALITY, DEFAULT_JPEG_SUBSAMPLING, JPEG_SUBSAMPLINGS)
+from render_worker import RenderWorker, RenderJob, RENDER, SAVE, PROXY, PROGRESS, DONE, ERROR, CANCELLED
+from large_image import should_stream
+from font_registry import DEFAULT_FONT_FAMILY, get_registry
 
 
 # ---------------------------- CONSTANTS & GLOBAL STYLE ------------------------------- #
@@ -9,6 +17,9 @@ APP_TITLE       = "Image Watermarker - Add Text or Logo Automatically"
 BG_COLOR        = "#f0f0f0"
 DEFAULT_OPACITY = 55
 DEFAULT_FONT    = ("Arial", 10)
+PREVIEW_MAX_DIM = 480     # px — largest side of the image panels (and of the cached preview proxy)
+PREVIEW_DELAY_MS = 60     # ms of slider/typing silence before the live preview re-renders
+POLL_MS          = 50     # ms between two checks of the background render/save worker
 
 
 class WatermarkApp(tk.Tk):
@@ -31,11 +42,21 @@ class WatermarkApp(tk.Tk):
 
         # State variables (model)
         self.original_image     = None                # PIL Image (RGB)
-        self.watermarked_image  = None                # PIL Image (RGBA) — final result
+        self.large_image_path   = None                # str — PNG/TIFF too large to load, streamed in strips instead
+        self.source_metadata    = None                # ImageMetadata — EXIF / ICC profile / JPEG tables written back on save
+        self.preview_proxy      = None                # PIL Image (RGB) — original scaled to the panel, for live preview
+        self.preview_scale      = 1.0                 # float — preview_proxy size / original size
+        self.preview_job        = None                # str — pending after() id of the debounced preview
+        self.watermarked_image  = None                # PIL Image (RGB) — final (full resolution) result
+        self.render_worker      = RenderWorker()      # background thread for full resolution render + save
+        self.active_job         = None                # RenderJob — latest job submitted to the worker
+        self.poll_job           = None                # str — pending after() id of poll_worker()
         self.logo_path          = None                # str — path to logo file
         self.watermark_color    = (255, 255, 255)     # RGB tuple — default white
 
         self.create_widgets()                         # build UI    <=====
+        self.watch_settings()                         # live preview on every settings change
+        self.protocol("WM_DELETE_WINDOW", self.on_close)   # don't quit half way through a save
 
 
 
@@ -84,6 +105,14 @@ class WatermarkApp(tk.Tk):
         ttk.Button(top_frame, text="💾 Save Watermarked Image", command=self.save_image).grid(
             row=0, column=1, padx=5, sticky="w")
 
+        # - Background job status: progress bar (moves while the worker renders/saves), status text, Cancel.
+        self.progress_bar = ttk.Progressbar(top_frame, mode="indeterminate", length=160)
+        self.progress_bar.grid(row=0, column=2, padx=5, sticky="e")
+        self.status_label = ttk.Label(top_frame, text="", width=28)
+        self.status_label.grid(row=0, column=3, padx=5, sticky="e")
+        self.cancel_button = ttk.Button(top_frame, text="✖ Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_button.grid(row=0, column=4, padx=5, sticky="e")
+
 
                              # 3. Side-by-Side Image Display Area (Original + Preview)
 
@@ -208,11 +237,65 @@ class WatermarkApp(tk.Tk):
 
 
 
-                                        # 4c. Big "Apply Watermark" Button
+                                        # 4c. Layout: Single or Tiled Pattern (shared by Text and Logo)
+
+        # - "Single" places the watermark once, at the chosen position. "Tiled" repeats it, rotated,
+        #   over the whole image (anti-theft pattern); angle and gap only apply to the tiled layout.
+        layout_frame = ttk.Frame(control_frame)
+        layout_frame.grid(row=2, column=0, sticky="ew", pady=(0, 5))
+
+        ttk.Label(layout_frame, text="Layout:").grid(row=0, column=0, sticky="w", padx=(5, 10))
+        self.layout_var = tk.StringVar(value=DEFAULT_LAYOUT)
+        ttk.Combobox(layout_frame, textvariable=self.layout_var, values=LAYOUTS,
+                     state="readonly", width=10).grid(row=0, column=1, sticky="w")
+
+        ttk.Label(layout_frame, text="Tile Angle (°):").grid(row=0, column=2, sticky="w", padx=(20, 10))
+        self.tile_angle_var = tk.IntVar(value=DEFAULT_TILE_ANGLE)
+        ttk.Spinbox(layout_frame, from_=-90, to=90, increment=5, textvariable=self.tile_angle_var, width=6).grid(
+            row=0, column=3, sticky="w")
+
+        ttk.Label(layout_frame, text="Tile Gap (px):").grid(row=0, column=4, sticky="w", padx=(20, 10))
+        self.tile_gap_var = tk.IntVar(value=DEFAULT_TILE_GAP)
+        ttk.Spinbox(layout_frame, from_=0, to=2000, increment=10, textvariable=self.tile_gap_var, width=6).grid(
+            row=0, column=5, sticky="w")
+
+
+
+                                        # 4d. JPEG Output Options (used when saving as .jpg)
+
+        # - Quality / progressive / optimize / chroma subsampling are passed to the JPEG encoder.
+        #   "Keep source quality" reuses the quantization tables of a JPEG original instead of
+        #   the quality value, so the photo is not degraded by a second, different quantization.
+        jpeg_frame = ttk.Frame(control_frame)
+        jpeg_frame.grid(row=3, column=0, sticky="ew", pady=(0, 5))
+
+        ttk.Label(jpeg_frame, text="JPEG Quality:").grid(row=0, column=0, sticky="w", padx=(5, 10))
+        self.jpeg_quality_var = tk.IntVar(value=DEFAULT_JPEG_QUALITY)
+        ttk.Spinbox(jpeg_frame, from_=1, to=100, textvariable=self.jpeg_quality_var, width=5).grid(
+            row=0, column=1, sticky="w")
+
+        ttk.Label(jpeg_frame, text="Subsampling:").grid(row=0, column=2, sticky="w", padx=(20, 10))
+        self.jpeg_subsampling_var = tk.StringVar(value=DEFAULT_JPEG_SUBSAMPLING)
+        ttk.Combobox(jpeg_frame, textvariable=self.jpeg_subsampling_var, values=JPEG_SUBSAMPLINGS,
+                     state="readonly", width=7).grid(row=0, column=3, sticky="w")
+
+        self.jpeg_progressive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(jpeg_frame, text="Progressive", variable=self.jpeg_progressive_var).grid(
+            row=0, column=4, sticky="w", padx=(20, 0))
+        self.jpeg_optimize_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(jpeg_frame, text="Optimize", variable=self.jpeg_optimize_var).grid(
+            row=0, column=5, sticky="w", padx=(10, 0))
+        self.jpeg_keep_qtables_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(jpeg_frame, text="Keep source quality", variable=self.jpeg_keep_qtables_var).grid(
+            row=0, column=6, sticky="w", padx=(10, 0))
+
+
+
+                                        # 4e. Big "Apply Watermark" Button
 
         # - Creates the large "Apply Watermark" button at the bottom of the `control_frame`.
         ttk.Button(control_frame, text="🚀 Apply Watermark", command=self.apply_watermark).grid(
-            row=2, column=0, pady=12, ipady=10, sticky="ew")
+            row=4, column=0, pady=12, ipady=10, sticky="ew")
 
 
 
@@ -224,7 +307,7 @@ class WatermarkApp(tk.Tk):
     def create_text_controls(self):
         """
         Create and grid all widgets specific to text watermark mode:
-        text entry, size, color chooser, opacity slider, position selector
+        text entry, font, size, color chooser, opacity slider, position selector
         """
         frame = self.text_frame # This 'frame' is the container for all text watermark widgets
         frame.columnconfigure(1, weight=1) # Makes the second column (index 1) expandable
@@ -236,18 +319,30 @@ class WatermarkApp(tk.Tk):
         self.text_entry = ttk.Entry(frame, width=45) # Creates the input field
         self.text_entry.grid(row=r, column=1, sticky="ew", pady=6) # Places it, making it stretch horizontally
         self.text_entry.insert(0, "yourwebsite.com") # Sets a default value in the entry box
+        self.text_entry.bind("<KeyRelease>", self.schedule_preview) # Entries have no variable here: live preview on each key
+
+        r += 1          #       <===========================      Move to the next row
+
+        # 2. Font Family Combobox (Dropdown)
+        #    - Lists every font installed on the system (font_registry.py indexes them once and caches the
+        #      index on disk, so this costs a file read, not a scan, after the first start).
+        #    - Not read-only: a family can also be typed. One that is not installed falls back to Arial or a look-alike.
+        ttk.Label(frame, text="Font:").grid(row=r, column=0, sticky="w", pady=6, padx=(5, 10))
+        self.font_family_var = tk.StringVar(value=DEFAULT_FONT_FAMILY)
+        ttk.Combobox(frame, textvariable=self.font_family_var, values=get_registry().families(), width=28).grid(
+            row=r, column=1, sticky="w", pady=6)
 
         r += 1          #       <===========================      Move to the next row
 
-        # 2. Font Size Spinbox
+        # 3. Font Size Spinbox
         ttk.Label(frame, text="Font Size:").grid(row=r, column=0, sticky="w", pady=6, padx=(5, 10))
-        self.font_size_var = tk.IntVar(value=48) # Tkinter variable detects the font size change instantly and  update the text on screen
+        self.font_size_var = tk.IntVar(value=DEFAULT_FONT_SIZE) # Tkinter variable detects the font size change instantly and  update the text on screen
         ttk.Spinbox(frame, from_=12, to=300, textvariable=self.font_size_var, width=10).grid(
             row=r, column=1, sticky="w", pady=6) # Creates a spinbox (number input with up/down arrows)
 
         r += 1          #       <===========================      Move to the next row
 
-        # 3. Color Chooser Button and Swatch
+        # 4. Color Chooser Button and Swatch
         ttk.Label(frame, text="Color:").grid(row=r, column=0, sticky="w", pady=6, padx=(5, 10))
         ttk.Button(frame, text="🎨 Choose Color", command=self.choose_color).grid(
             row=r, column=1, sticky="w", pady=6) # Button to open the color picker dialog
@@ -256,7 +351,7 @@ class WatermarkApp(tk.Tk):
 
         r += 1          #       <===========================      Move to the next row
 
-        # 4. Opacity Slider
+        # 5. Opacity Slider
         ttk.Label(frame, text="Opacity (%):").grid(row=r, column=0, sticky="w", pady=6, padx=(5, 10))
         self.opacity_var = tk.IntVar(value=DEFAULT_OPACITY) # DoubleVar Tkinter ControlVariable (communication protocol) for opacity (0.0 to 100.0) floating-point numbers
         ttk.Scale(frame, from_=0, to=100, variable=self.opacity_var, orient="horizontal").grid(
@@ -265,7 +360,7 @@ class WatermarkApp(tk.Tk):
 
         r += 1          #       <===========================      Move to the next row
 
-        # 5. Position Combobox (Dropdown)
+        # 6. Position Combobox (Dropdown)
         ttk.Label(frame, text="Position:").grid(row=r, column=0, sticky="w", pady=6, padx=(5, 10))
         self.position_var = tk.StringVar(value="Bottom Right") # Tkinter ControlVariable (communication protocol) for selected position,treats everything as text
         positions = ["Top Left", "Top Right", "Bottom Left", "Bottom Right", "Center"] # List of possible positions
@@ -307,7 +402,7 @@ class WatermarkApp(tk.Tk):
         # Label "Scale (% of original):"
         ttk.Label(frame, text="Scale (% of original):").grid(row=r, column=0, sticky="w", pady=6, padx=(5, 10))
         # Tkinter integer variable to hold the logo's scale percentage. Default value is 28%.
-        self.logo_scale_var = tk.IntVar(value=28)
+        self.logo_scale_var = tk.IntVar(value=DEFAULT_LOGO_SCALE)
         # Spinbox (numerical input with up/down arrows) allowing users to select a scale from 5% to 80%.
         ttk.Spinbox(frame, from_=5, to=80, textvariable=self.logo_scale_var, width=10).grid(
             row=r, column=1, sticky="w", pady=6)
@@ -364,6 +459,56 @@ class WatermarkApp(tk.Tk):
         else:
             self.text_frame.grid(sticky="nsew")           # show text controls
 
+    # ---------------------------- LIVE PREVIEW ------------------------------- #
+    # ------------------------------------------------------------------------------------ #
+    def watch_settings(self):
+        """
+        Re-render the preview whenever a setting changes: the Tk variables behind the sliders,
+        spinboxes, position/layout dropdowns and type radio buttons all call schedule_preview() on write.
+        (Text typing, color and logo changes call it directly.)
+        """
+        for var in (self.opacity_var, self.font_size_var, self.font_family_var, self.logo_scale_var, self.position_var,
+                    self.watermark_type, self.layout_var, self.tile_angle_var, self.tile_gap_var):
+            var.trace_add("write", self.schedule_preview)
+
+    def schedule_preview(self, *_):
+        """
+        Debounce: a slider drag writes its variable dozens of times per second, so instead of
+        rendering on every write, (re)start a short timer with after() and only render once the
+        settings have stopped changing for PREVIEW_DELAY_MS.
+        Any earlier full-resolution result is now out of date and is dropped (a render still
+        running in the background is cancelled; a save is left to finish).
+        """
+        self.watermarked_image = None
+        self.render_worker.cancel_renders()
+        if self.preview_job is not None:
+            self.after_cancel(self.preview_job)
+        self.preview_job = self.after(PREVIEW_DELAY_MS, self.render_preview)
+
+    def render_preview(self):
+        """
+        Watermark the cached proxy (the original already scaled to the panel) instead of the
+        full-resolution image. The engine draws the text/logo at the proxy's scale, so each
+        render touches a few hundred thousand pixels whatever the size of the photo.
+        The full-resolution render is deferred to "Apply Watermark" / "Save".
+        """
+        self.preview_job = None
+        if self.preview_proxy is None:
+            return
+
+        try:
+            settings = self.current_settings()
+        except (ValueError, tk.TclError):
+            # Incomplete settings (empty text, no logo yet, a spinbox being edited): show the photo as is.
+            self.display_image(self.preview_proxy, self.preview_label)
+            return
+
+        try:
+            preview = apply_watermark(self.preview_proxy, settings, scale=self.preview_scale)
+        except OSError:
+            return   # Unreadable logo: reported by "Apply Watermark"
+        self.display_image(preview, self.preview_label)
+
     # ---------------------------- IMAGE LOADING ------------------------------- #
     # ------------------------------------------------------------------------------------ #
     def upload_main_image(self):
@@ -381,21 +526,53 @@ class WatermarkApp(tk.Tk):
         if not path:
             return  # If no file was selected, simply exit the function.
 
-        # 3. Attempt to process the selected image.
+        # 3. Very large PNG/TIFF (hundreds of megapixels) would not fit in memory once decoded:
+        #    keep only its path, build the preview proxy on the worker, strip by strip (large_image.py),
+        #    and watermark it strip by strip when it is saved.
+        try:
+            stream = should_stream(path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Cannot open image:\n{e}")
+            return
+        if stream:
+            self.original_image = None
+            self.source_metadata = None
+            self.large_image_path = path
+            self.preview_proxy = None
+            self.watermarked_image = None
+            self.original_label.config(image="", text="Loading large image…")
+            self.preview_label.config(image="", text="Large image: the watermark is applied\nstrip by strip when you save")
+            self.submit_job(RenderJob(PROXY, path, max_dim=PREVIEW_MAX_DIM))
+            return
+        self.large_image_path = None
+
+        # 3b. Attempt to process the selected image.
         try:
             # 4. Open the image using Pillow (PIL) and convert it to RGB.           <========
-            #    - Image.open(path): Loads the image from the specified file path (str), and
-            #               returns an instance of the Image.Image class (often just referred to as a "Pillow Image object".
+            #    - load_image(path): Loads the image from the specified file path (str), turned upright
+            #               according to its EXIF orientation (phones store portrait photos sideways), and
+            #               returns it with its metadata (EXIF, ICC color profile, JPEG quantization tables),
+            #               which save_image() writes back into the watermarked file.
             #    - .convert("RGB"): Ensures the image is in RGB format (Red, Green, Blue).
             #      This is important because some image formats (like PNG) might have an alpha channel (RGBA),
             #      and working with a consistent format simplifies subsequent processing.
-            self.original_image = Image.open(path).convert("RGB")
+            image, self.source_metadata = load_image(path)
+            with image:
+                self.original_image = image.convert("RGB")
+
+            # 4b. Build the preview proxy once: the original scaled down to the panel size.
+            #    - Every live preview re-renders on this small image, never on the full resolution one.
+            #    - reducing_gap: shrinks by a whole factor first (fast), then finishes with LANCZOS (sharp).
+            proxy_size = self.proxy_size(self.original_image.size)
+            self.preview_proxy = self.original_image.resize(proxy_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            self.preview_scale = proxy_size[0] / self.original_image.width
 
             # 5. Display the newly loaded image in the 'Original Image' panel.
             #    - self.display_image() is a helper function that takes a Pillow image and
             #      a Tkinter Label widget, resizes the image appropriately, and updates the label to show it.
             #    - self.original_label is the Tkinter Label widget where the original image should be shown on the Create_Widget Function.
-            self.display_image(self.original_image, self.original_label)
+            #    - The proxy is shown: resizing the full image again for display would be slow on 50 MP photos.
+            self.display_image(self.preview_proxy, self.original_label)
 
             # 6. Clear the preview panel to indicate a fresh start.
             #    - self.preview_label.config(image="", text="..."): This updates the preview label.
@@ -403,10 +580,10 @@ class WatermarkApp(tk.Tk):
             #      reappears, prompting the user to apply a watermark.
             self.preview_label.config(image="", text="Preview appears here\nafter you click 'Apply Watermark'")
 
-            # 7. Reset the watermarked_image variable.
+            # 7. Reset the watermarked_image variable and draw the live preview of the current settings.
             #    - This ensures that if a user loads a new original image, any previous
             #      watermarked result is cleared from the application's memory until a new watermark is applied.
-            self.watermarked_image = None
+            self.schedule_preview()
 
         # 8. Handle any errors that might occur during image loading or processing.
         except Exception as e:
@@ -458,6 +635,8 @@ class WatermarkApp(tk.Tk):
             #    - self.display_small_logo(logo): Calls a helper function to resize and
             #      display this `logo` image within the `self.logo_preview_label` widget in the UI.
             self.display_small_logo(logo)
+            #    - Show the new logo on the live preview.
+            self.schedule_preview()
         except:
             # 6. Gracefully handle any errors during logo loading.
             #    - This 'except' block catches any Exception that might occur during `Image.open()`
@@ -471,34 +650,41 @@ class WatermarkApp(tk.Tk):
 
     # ---------------------------- IMAGE DISPLAY HELPERS ------------------------------- #
     # ------------------------------------------------------------------------------------ #
-    def display_image(self, pil_img, label_widget, max_dim=480):
+    @staticmethod
+    def proxy_size(size, max_dim=PREVIEW_MAX_DIM):
+        """
+        (w, h) of an image of `size` scaled down to fit max_dim × max_dim, keeping its aspect ratio
+        (the size thumbnail() would produce; never upscaled).
+        """
+        w, h = size
+        ratio = min(1.0, max_dim / max(w, h))
+        return max(1, round(w * ratio)), max(1, round(h * ratio))
+
+    def display_image(self, pil_img, label_widget, max_dim=PREVIEW_MAX_DIM):
         """
         Resize PIL image to fit label (max dimension), convert to PhotoImage
         and update the label. Used for both original and preview.
         """
-        # 1. Create a copy of the original Pillow image.
-        copy = pil_img.copy()
-
-        # 2. Resize the image for display.
-        #    - copy.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS):
-        #      - `thumbnail()` is a Pillow method that resizes the image *in place* to fit within
-        #        the given dimensions while maintaining its aspect ratio. It won't distort the image.
-        #      - `(max_dim, max_dim)`: The image will be scaled down so that its largest dimension
-        #        (either width or height) is no more than `max_dim` (defaulting to 480 pixels in this case),
-        #        and the other dimension is scaled proportionally.
-        #      - `Image.Resampling.LANCZOS`: This specifies the resampling filter to use during resizing.
+        # 1. Resize the image for display, straight into a new (small) image.
+        #    - self.proxy_size(): the size `thumbnail()` would give, i.e. the image scaled down so that its
+        #      largest dimension (width or height) is no more than `max_dim` (480 pixels by default),
+        #      and the other dimension is scaled proportionally. It won't distort the image.
+        #    - `resize()` returns a new image, so the original is untouched without copying it first
+        #      (a full copy of a 50 MP photo would cost more than the resize itself).
+        #    - `Image.Resampling.LANCZOS`: This specifies the resampling filter to use during resizing.
         #        LANCZOS (also known as sinc interpolation) is a high-quality filter often used for
         #        downsampling, producing sharp-looking scaled images.
-        copy.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+        #    - `reducing_gap=3.0`: shrink by a whole factor first (fast), then finish with LANCZOS.
+        copy = pil_img.resize(self.proxy_size(pil_img.size, max_dim), Image.Resampling.LANCZOS, reducing_gap=3.0)
 
-        # 3. Convert the Pillow image to a Tkinter PhotoImage.
+        # 2. Convert the Pillow image to a Tkinter PhotoImage.
         #    - Tkinter's `tk.Label` widgets (and other display widgets) cannot directly display
         #      Pillow Image objects. They require their own specific image format, `PhotoImage`.
         #    - ImageTk.PhotoImage(copy): This function from the `PIL.ImageTk` module performs
         #      that conversion, creating a `PhotoImage` object from the (now resized) Pillow image.
         photo = ImageTk.PhotoImage(copy)
 
-        # 4. Update the target Tkinter Label widget.
+        # 3. Update the target Tkinter Label widget.
         #    - label_widget.config(image=photo, text=""):
         #      - `label_widget` is the specific `tk.Label` (either `self.original_label` or `self.preview_label`)
         #        that you want to update.
@@ -508,7 +694,7 @@ class WatermarkApp(tk.Tk):
         #        or "Preview appears here..."), ensuring only the image is shown.
         label_widget.config(image=photo, text="")
 
-        # 5. Prevent the PhotoImage from being garbage collected.
+        # 4. Prevent the PhotoImage from being garbage collected.
         #    - label_widget.image = photo: This is a crucial line in Tkinter when displaying images.
         #      If you don't keep a strong reference to the `PhotoImage` object (like by attaching it
         #      as an attribute directly to the widget that displays it), Python's garbage collector
@@ -600,6 +786,9 @@ class WatermarkApp(tk.Tk):
             #       or standard color names.
             self.color_swatch.config(bg=color[1])
 
+            # 5. Show the new color on the live preview.
+            self.schedule_preview()
+
 
 
 
@@ -609,202 +798,202 @@ class WatermarkApp(tk.Tk):
 
 
 
-    # ---------------------------- POSITION CALCULATION (shared by text & logo) ------------------------------- #
+    # ---------------------------- MAIN WATERMARK PROCESSING LOGIC ------------------------------- #
     # ------------------------------------------------------------------------------------ #
 
-    def get_position(self, img_w, img_h, wm_w, wm_h, pos_name):
+    def current_settings(self):
         """
-        Return (x, y) coordinates for placing watermark based on chosen position name.
-        Used by both text and logo watermark application.
-
-        Parameters:
-        img_w: width of the main (original) image
-        img_h: height of the main (original) image
-        wm_w: width of the watermark (either text or logo)
-        wm_h: height of the watermark (either text or logo)
-        pos_name: the name of the desired position (e.g., "Top Left", "Center")
+        Collect the widget values into a WatermarkSettings object (watermark_engine.py).
+        Raises ValueError when the settings cannot produce a watermark (e.g. empty text).
         """
-
-
-        # 1. Define a margin for spacing.
-        #    - `margin = 35`: This constant determines how far the watermark will be placed
-        #      from the edges of the main image. A value of 35 pixels is chosen here for visual spacing.
-        margin = 35
-
-        # 2. Calculate (x, y) coordinates based on the requested position (`pos_name`).
-        #    - Tkinter and Pillow's coordinate systems typically start with (0,0) at the top-left corner.
-        #    - `x` increases to the right, `y` increases downwards.
-
-        if pos_name == "Top Left":
-            # The top-left corner of the watermark is placed `margin` pixels from the
-            # top and `margin` pixels from the left edge of the main image.
-            return margin, margin
-
-        elif pos_name == "Top Right":
-            # x-coordinate: `img_w` (total width) - `wm_w` (watermark width) - `margin`
-            # This places the right edge of the watermark `margin` pixels from the right edge of the image.
-            # y-coordinate: `margin` (from the top).
-            return img_w - wm_w - margin, margin
-
-        elif pos_name == "Bottom Left":
-            # x-coordinate: `margin` (from the left).
-            # y-coordinate: `img_h` (total height) - `wm_h` (watermark height) - `margin`
-            # This places the bottom edge of the watermark `margin` pixels from the bottom edge of the image.
-            return margin, img_h - wm_h - margin
-
-        elif pos_name == "Bottom Right":
-            # x-coordinate: `img_w` - `wm_w` - `margin` (from the right).
-            # y-coordinate: `img_h` - `wm_h` - `margin` (from the bottom).
-            return img_w - wm_w - margin, img_h - wm_h - margin
-
-        else:  # Center
-            # x-coordinate: `(img_w - wm_w) // 2`
-            # This calculates the horizontal center by taking the total remaining space
-            # (`img_w - wm_w`) and dividing it by 2. The `//` ensures integer division for pixel coordinates.
-            # y-coordinate: `(img_h - wm_h) // 2`
-            # This calculates the vertical center similarly.
-            return (img_w - wm_w) // 2, (img_h - wm_h) // 2
-
-
-
-    # ---------------------------- MAIN WATERMARK PROCESSING LOGIC ------------------------------- #
-    # ------------------------------------------------------------------------------------ #
+        return WatermarkSettings(
+            kind=self.watermark_type.get(),
+            text=self.text_entry.get().strip(),
+            font_size=self.font_size_var.get(),
+            font_family=self.font_family_var.get(),
+            color=self.watermark_color,
+            opacity=self.opacity_var.get(),
+            position=self.position_var.get(),
+            logo_path=self.logo_path,
+            logo_scale=self.logo_scale_var.get(),
+            layout=self.layout_var.get(),
+            tile_angle=self.tile_angle_var.get(),
+            tile_gap=self.tile_gap_var.get(),
+        )
 
     def apply_watermark(self):
         """
         Main processing method: composites text or logo watermark onto copy of original image.
-        Stores result and updates preview. Handles both modes with proper alpha blending.
+        Stores result and updates preview.
          **Process Flow:**
         1. **Initial Checks**: Verifies that a main image has been uploaded. If not, it warns the user and returns.
-        2. **Working Copy**: Creates a full-resolution RGBA copy of the `self.original_image`. This copy serves as the canvas for the watermark, ensuring transparency can be handled correctly and the original image remains untouched.
-        3. **Watermark Type Branching**:
-            * **If "Text" Watermark is selected**:
-                * Retrieves text, font size, color, opacity, and position settings from the UI.
-                * Loads the chosen font (with fallbacks if a specific font isn't found).
-                * Creates a separate, transparent RGBA layer of the same size as the main image.
-                * Draws the text onto this transparent layer, applying the specified color and opacity.
-                * Calculates the (x, y) placement coordinates for the text using `self.get_position()`.
-                * Blends this text layer onto the working image copy using `Image.alpha_composite()`.
-            * **If "Logo" Watermark is selected**:
-                * Verifies that a logo file has been uploaded.
-                * Opens the logo file and converts it to RGBA.
-                * Scales the logo based on user input, maintaining aspect ratio.
-                * Adjusts the logo's overall opacity by modifying its alpha channel.
-                * Calculates the (x, y) placement coordinates for the logo using `self.get_position()`.
-                * Pastes the modified logo onto the working image copy, using the logo's own alpha channel for proper blending (`result.paste(logo,..., logo)`).
-        4. **Finalization**: Stores the fully watermarked image in `self.watermarked_image` and updates the UI by calling `self.display_image()` to show the result in the preview panel.
+        2. **Settings**: Reads every widget into one WatermarkSettings object (text, font size, color,
+           opacity, position, logo path and scale, layout). Invalid settings (no text, no logo) are reported.
+        3. **Compositing**: watermark_engine.apply_watermark() does the actual work, the same code the
+           batch command line tool (batch_watermark.py) runs on whole folders. It runs on the
+           background worker (render_worker.py), so the window stays responsive.
+        4. **Finalization**: poll_worker() stores the fully watermarked image in `self.watermarked_image` and updates the UI by calling `self.display_image()` to show the result in the preview panel.
+
+        The live preview (render_preview) only ever works on the small proxy; this is the
+        full-resolution render (save_image() renders too, when the settings changed since).
         """
         # 1. Initial Checks & Setup
         # ----------------------------------------------------------------------
         # Ensure a main image has been uploaded before trying to apply a watermark.
-        if self.original_image is None:
+        if self.original_image is None and self.large_image_path is None:
             messagebox.showwarning("No Image", "Please upload a main image first!")
             return
 
-        # Create a working copy of the original image, converting it to RGBA.
-        # RGBA (Red, Green, Blue, Alpha) is essential because the alpha channel allows for TRANSPARENCY.
-        result = self.original_image.copy().convert("RGBA")
+        # A large image is never rendered whole: the live preview is all there is until it is saved.
+        if self.large_image_path is not None:
+            messagebox.showinfo("Large Image", "This image is too large to render in memory.\n"
+                                "The watermark is applied strip by strip when you save it (PNG or TIFF).")
+            return
 
-        # 2. Text Watermark Mode
+        # 2. Settings from the UI
         # ----------------------------------------------------------------------
-        if self.watermark_type.get() == "Text":
-            # Get the text the user entered and remove leading/trailing whitespace.
-            text = self.text_entry.get().strip()
-            # If no text was entered, show a warning and stop.
-            if not text:
-                messagebox.showwarning("Missing Text", "Please enter watermark text!")
-                return
-
-            # Retrieve text watermark settings from UI variables.
-            font_size = self.font_size_var.get()
-            opacity = self.opacity_var.get() / 100.0 # Convert percentage to a 0.0-1.0 scale
-            alpha = int(255 * opacity) # Convert opacity to an 8-bit alpha value (0-255)
-            # Combine the chosen color (RGB tuple) with the calculated alpha to get RGBA.
-            fill_color = self.watermark_color + (alpha,) # e.g., (255, 255, 255) + (140,) -> (255, 255, 255, 140)
+        settings = self.checked_settings()
+        if settings is None:
+            return
 
-            # Load the font.
-            # It tries to load "arial.ttf" directly, then from a common Windows font path,
-            # and finally falls back to Pillow's default font if neither is found.
-            try:
-                font = ImageFont.truetype("arial.ttf", font_size)
-            except:
-                try:
-                    font = ImageFont.truetype(r"C:\Windows\Fonts\arial.ttf", font_size)
-                except:
-                    font = ImageFont.load_default()
-
-            # Create a transparent layer to draw the text on.
-            # Image.new(), Pillow creates a rectangular block of memory, in this case a temporary,
-            #   transparent image of the same size as the main image.
-            layer = Image.new("RGBA", result.size, (0,0,0,0))
-            # Get a drawing context for this transparent layer with the ImageDraw Class module from Pillow.
-            draw = ImageDraw.Draw(layer)
-
-            # Measure the size of the text *before* drawing it.
-            # This is needed to calculate its position accurately because some fonts have extra space or "tails" that hang below the line.
-            # draw.textbbox() returns four numbers in this specific order:
-            #               [0] Left, [1] Top, [2] Right, [3] Bottom.
-            bbox = draw.textbbox((0, 0), text, font=font)
-            text_w = bbox[2] - bbox[0] # Width of the text
-            text_h = bbox[3] - bbox[1] # Height of the text
-
-            # Calculate the (x, y) position for the text watermark using the helper function previously created.
-            x, y = self.get_position(img_w= result.width, img_h=result.height, wm_w= text_w, wm_h= text_h, pos_name= self.position_var.get())
-            # Actually Draw-ing the text onto the transparent layer with the calculated position, text, font, and RGBA color.
-            draw.text((x, y), text, fill=fill_color, font=font)
-
-            # Composite (overlay) the transparent text ("stencil") layer onto the main image.
-            # Image.alpha_composite() blends the two RGBA images based on their alpha channels.
-            result = Image.alpha_composite(result, layer)
-
-        # 3. Logo Watermark Mode
+        # 3. Compositing (headless engine, on the background worker)
         # ----------------------------------------------------------------------
-        else: # Logo mode
-            # Ensure a logo file has been selected.
-            if not self.logo_path:
-                messagebox.showwarning("No Logo", "Please upload a logo first!")
-                return
+        # A render still running for older settings is cancelled: only the latest settings get rendered.
+        self.submit_job(RenderJob(RENDER, self.original_image, settings))
+
+    def current_jpeg_options(self):
+        """
+        JpegOptions from the output widgets. Raises ValueError / TclError like current_settings().
+        """
+        return JpegOptions(
+            quality=self.jpeg_quality_var.get(),
+            progressive=self.jpeg_progressive_var.get(),
+            optimize=self.jpeg_optimize_var.get(),
+            subsampling=self.jpeg_subsampling_var.get(),
+            keep_qtables=self.jpeg_keep_qtables_var.get(),
+        )
+
+    def checked_settings(self):
+        """
+        current_settings(), or None after telling the user what is missing.
+        """
+        try:
+            return self.current_settings()
+        except tk.TclError:
+            messagebox.showwarning("Missing Settings", "Font size, scale, tile angle and gap must be whole numbers!")
+        except ValueError as e:
+            messagebox.showwarning("Missing Settings", str(e))
+        return None
+
+
+    def settings_unchanged(self, settings):
+        """
+        True if the widgets still describe `settings` (a finished job's result is not out of date).
+        """
+        try:
+            return self.current_settings() == settings
+        except (ValueError, tk.TclError):
+            return False
+
+
+    # ---------------------------- BACKGROUND JOBS (RENDER / SAVE) ------------------------------- #
+    # ------------------------------------------------------------------------------------ #
+
+    def submit_job(self, job):
+        """
+        Hand a full-resolution render or save to the worker thread and start polling for its result.
+        """
+        self.active_job = job
+        self.render_worker.submit(job)
+        self.progress_bar.start(15)
+        self.cancel_button.config(state="normal")
+        if self.poll_job is None:
+            self.poll_job = self.after(POLL_MS, self.poll_worker)
+
+    def cancel_job(self):
+        """
+        "Cancel" button: stop the running render/save (a cancelled save leaves no file behind).
+        """
+        self.render_worker.cancel()
+        self.status_label.config(text="Cancelling…")
 
+    def poll_worker(self):
+        """
+        Runs every POLL_MS on the main thread (Tk widgets must not be touched from the worker thread):
+        handle the worker's messages, then poll again while it still has work.
+        """
+        self.poll_job = None
+        while True:
             try:
-                # Open the selected logo image, converting it to RGBA to ensure transparency support.
-                logo = Image.open(self.logo_path).convert("RGBA")
-
-                # Scale the logo based on user input on tk.IntVar field.
-                scale = self.logo_scale_var.get() / 100.0
-                # Calculate new width and height, ensuring a minimum size of 20 pixels to avoid errors with tiny images.
-                new_w = max(20, int(logo.width * scale))
-                new_h = max(20, int(logo.height * scale))
-                # Resize the logo using LANCZOS for high quality.
-                logo = logo.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
-                # Adjust the logo's opacity.
-                opacity = self.opacity_var.get() / 100.0
-                # Get the alpha channel or a grayscale image where 255 is fully visible and 0 is fully transparent of the resized logo.
-                alpha = logo.getchannel("A")
-                # Apply the user-defined opacity to the logo's alpha channel.
-                # `point()` applies a function to each pixel in the channel.
-                alpha = alpha.point(lambda p: int(p * opacity))
-                # Put the modified alpha channel back into the logo image.
-                logo.putalpha(alpha)
-
-                # Calculate the (x, y) position for the logo watermark.
-                x, y = self.get_position(img_w= result.width, img_h= result.height, wm_w= new_w, wm_h= new_h, pos_name= self.position_var.get())
-                # Paste the logo onto the main image.
-                # The last `logo` argument acts as a mask, ensuring correct blending using the logo's alpha channel.
-                # And the first "logo" provides the RGB color
-                result.paste(logo, (x, y), logo)
-
-            except Exception as e:
+                job, status, payload = self.render_worker.messages.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_job_message(job, status, payload)
+
+        if self.render_worker.busy or not self.render_worker.messages.empty():
+            self.poll_job = self.after(POLL_MS, self.poll_worker)
+        else:
+            self.progress_bar.stop()
+            self.cancel_button.config(state="disabled")
+
+    def handle_job_message(self, job, status, payload):
+        """
+        Update the UI for one worker message. Renders superseded by a newer job are ignored;
+        saves are always reported (the user is waiting for that file).
+        """
+        latest = job is self.active_job
+        if not latest and job.kind == RENDER:
+            return
+        if job.kind == PROXY and job.source != self.large_image_path:
+            return   # Another image was opened meanwhile
+
+        if status == PROGRESS:
+            self.status_label.config(text=payload)
+
+        elif status == DONE and job.kind == PROXY:
+            # The large image's preview proxy, built strip by strip: from now on it behaves like any other.
+            self.preview_proxy, full_size = payload
+            self.preview_scale = self.preview_proxy.width / full_size[0]
+            self.display_image(self.preview_proxy, self.original_label)
+            self.status_label.config(text=f"Large image {full_size[0]}×{full_size[1]}: streamed on save")
+            self.schedule_preview()
+
+        elif status == DONE:
+            if payload is not None and latest and self.settings_unchanged(job.settings):
+                # Store the fully watermarked image and display it (downscaled to the panel once more).
+                self.watermarked_image = payload
+                self.display_image(payload, self.preview_label)
+            if job.kind == SAVE:
+                self.status_label.config(text="Saved ✓")
+                messagebox.showinfo("Saved!", f"Watermarked image saved!\n\n{job.path}")
+            else:
+                self.status_label.config(text="Full resolution ready ✓")
+
+        elif status == ERROR:
+            self.status_label.config(text="Failed")
+            if job.kind == SAVE:
+                messagebox.showerror("Save Error", str(payload))
+            elif job.kind == PROXY:
+                self.original_label.config(text="")
+                messagebox.showerror("Error", f"Cannot open image:\n{payload}")
+            else:
                 # Handle any errors during logo processing (e.g., corrupted logo file).
-                messagebox.showerror("Logo Error", f"Could not process logo:\n{e}")
-                return
+                messagebox.showerror("Logo Error", f"Could not process logo:\n{payload}")
 
-        # 4. Final Steps
-        # ----------------------------------------------------------------------
-        # Store the fully watermarked image in an instance variable.
-        self.watermarked_image = result
-        # Display this watermarked image in the preview panel.
-        self.display_image(result, self.preview_label)
+        elif status == CANCELLED and (latest or job.kind == SAVE):
+            self.status_label.config(text="Cancelled")
+
+    def on_close(self):
+        """
+        Window close button: a save still running would leave the destination untouched (the engine
+        writes to a temp file first), but the user would lose it, so ask first.
+        """
+        if self.render_worker.busy:
+            if not messagebox.askyesno("Still working", "A render or save is still running.\nCancel it and quit?"):
+                return
+            self.render_worker.cancel()
+            self.render_worker.join(timeout=5)
+        self.destroy()
 
 
 
@@ -814,15 +1003,26 @@ class WatermarkApp(tk.Tk):
 
     def save_image(self):
         """
-        Open save-as dialog, convert to RGB if JPEG selected, save file with PIL,
-        and show success/error message.
+        Open save-as dialog, then render (if needed) and save the file on the background worker;
+        poll_worker() shows the success/error message.
         """
         # 1. Initial Check: Ensure there's an image to save.
-        #    - `self.watermarked_image` will be `None` if `apply_watermark()` hasn't been called yet
-        #      or if it failed.
+        #    - `self.watermarked_image` is `None` until the full resolution image has been rendered for the
+        #      current settings (the live preview only renders the small proxy). Render it now if needed.
         #    - If there's nothing to save, a warning message box is shown to the user, and the function exits.
-        if self.watermarked_image is None:
-            messagebox.showwarning("Nothing to save", "Apply a watermark first!")
+        if self.original_image is None and self.large_image_path is None:
+            messagebox.showwarning("Nothing to save", "Please upload a main image first!")
+            return
+        settings = self.checked_settings()
+        if settings is None:
+            return
+        try:
+            jpeg = self.current_jpeg_options()
+        except tk.TclError:
+            messagebox.showwarning("JPEG Options", "JPEG quality must be a whole number!")
+            return
+        except ValueError as e:
+            messagebox.showwarning("JPEG Options", str(e))
             return
 
         # 2. Open "Save As" file dialog.
@@ -832,10 +1032,12 @@ class WatermarkApp(tk.Tk):
         #      it will automatically append ".png".
         #    - `filetypes=[...]`: This list of tuples defines the file format options presented to the user
         #      in the dialog's "Save as type" dropdown.
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".png",
-            filetypes=[("PNG Image", "*.png"), ("JPEG Image", "*.jpg *.jpeg"), ("All files", "*.*")]
-        )
+        #    - A large image can only be written by the strip writers: PNG or TIFF.
+        if self.large_image_path is not None:
+            filetypes = [("PNG Image", "*.png"), ("TIFF Image", "*.tif *.tiff")]
+        else:
+            filetypes = [("PNG Image", "*.png"), ("JPEG Image", "*.jpg *.jpeg"), ("All files", "*.*")]
+        file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=filetypes)
 
         # 3. Check if the user cancelled the dialog.
         #    - If `file_path` is an empty string, it means the user closed the dialog without selecting a file
@@ -843,35 +1045,23 @@ class WatermarkApp(tk.Tk):
         if not file_path:
             return
 
-        # 4. Attempt to save the image.
-        try:
-            #    - `to_save = self.watermarked_image`: A reference to the watermarked image (a Pillow Image object)
-            #      is stored in a local variable. This image is currently in "RGBA" mode because watermarks
-            #      involve transparency.
-            to_save = self.watermarked_image
-
-            # 5. Handle JPEG format limitations.
-            #    - `if file_path.lower().endswith((".jpg", ".jpeg")):`: Checks if the user chose to save the
-            #      file with a .jpg or .jpeg extension (case-insensitive).
-            #    - `to_save = to_save.convert("RGB")`: The JPEG image format
-            #      does not support transparency (alpha channel)
-            if file_path.lower().endswith((".jpg", ".jpeg")):
-                to_save = to_save.convert("RGB")
-
-            # 6. Save the image file.
-            #    - `to_save.save(file_path)`: This Pillow method writes the image data to the specified file path
-            #      on the user's system, in the format inferred from the file extension.
-            to_save.save(file_path)
-
-            # 7. Show success message.
-            #    - If saving is successful, a message box informs the user and shows the full path to the saved file.
-            messagebox.showinfo("Saved!", f"Watermarked image saved!\n\n{file_path}")
-
-        # 8. Handle any errors during saving.
-        except Exception as e:
-            #    - If any error occurs during the saving process (e.g., permissions issue, disk full),
-            #      an error message box is displayed with the details of the exception.
-            messagebox.showerror("Save Error", str(e))
+        # 4. Save on the background worker.
+        #    - The worker renders the full resolution image first if `self.watermarked_image` is out of date,
+        #      then encodes it. PNG/TIFF encoding of a large photo takes seconds: off the main thread, the
+        #      window keeps responding, shows the progress, and "Cancel" works.
+        #    - save_watermarked() (watermark_engine.py) writes the image in the format inferred from
+        #      the file extension, to a temporary file that is renamed over `file_path` only once complete.
+        #      JPEG does not support transparency (alpha channel), so an RGBA image would be converted
+        #      to RGB first for .jpg/.jpeg.
+        #    - The original's EXIF and color profile are kept, and .jpg files use the JPEG options above.
+        #    - poll_worker() shows the success message, or an error message box with the details of the
+        #      exception (e.g., permissions issue, disk full).
+        #    - A large image is read, watermarked and written one strip at a time (large_image.py).
+        if self.large_image_path is not None:
+            self.submit_job(RenderJob(SAVE, self.large_image_path, settings, path=file_path))
+        else:
+            self.submit_job(RenderJob(SAVE, self.original_image, settings, path=file_path,
+                                      image=self.watermarked_image, metadata=self.source_metadata, jpeg=jpeg))
 
 
 
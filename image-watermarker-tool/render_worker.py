@@ -0,0 +1,214 @@
+"""
+BACKGROUND RENDERING
+--------------------
+Runs the full-resolution watermark render and the save (encoding) on a worker
+thread, so the Tk window never freezes on a 50 MP PNG/TIFF.
+
+   - RenderJob: one request, "render" (watermark the original), "save"
+     (render if needed, then encode to a file) or "proxy" (build the preview of a
+     large image). When the source is a file path instead of an image, the image
+     is too large for memory: saves stream it strip by strip (large_image.py).
+   - RenderWorker: one daemon thread, a single pending slot for renders/proxies and
+     a queue for saves. Submitting a render or proxy replaces the one still waiting
+     in the slot, and any submit cancels a running render: only the latest settings
+     get rendered. Saves are never coalesced: each waits its turn and runs before the
+     job in the slot. Saves are only cancelled by cancel().
+   - Results come back through a queue (RenderWorker.messages) that the GUI
+     empties with after() polling: Tk widgets must only be touched from the
+     main thread.
+
+A thread is enough (no process pool): Pillow releases the GIL while it resizes,
+composites and encodes, and the 150+ MB images would be expensive to pickle.
+"""
+
+import itertools
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+
+from PIL import Image
+
+from watermark_engine import (WatermarkSettings, ImageMetadata, JpegOptions, RenderCancelled, apply_watermark,
+                              save_watermarked)
+from large_image import watermark_large_file, make_proxy
+
+RENDER, SAVE, PROXY = "render", "save", "proxy"
+
+# Message statuses posted to RenderWorker.messages
+PROGRESS, DONE, ERROR, CANCELLED = "progress", "done", "error", "cancelled"
+
+# Encoded bytes between two "Saving… N MB" progress messages
+PROGRESS_STEP_BYTES = 1024 * 1024
+
+_job_ids = itertools.count(1)
+
+
+@dataclass(eq=False)
+class RenderJob:
+    """One request for the worker.
+
+    Attributes:
+        kind: RENDER, SAVE or PROXY.
+        source: Full-resolution original (only read, never modified), or the path of a large
+            PNG/TIFF that is never loaded whole (SAVE, PROXY).
+        settings: Watermark to apply (RENDER, SAVE).
+        path: Destination file (SAVE).
+        image: Already watermarked image to save as is (SAVE, skips the render).
+        max_dim: Largest side of the preview (PROXY).
+        metadata: Source EXIF / ICC profile / JPEG tables to keep (SAVE).
+        jpeg: JPEG encoding options (SAVE to .jpg).
+        job_id: Increasing number, for display and debugging.
+    """
+    kind: str
+    source: Image.Image | str
+    settings: WatermarkSettings | None = None
+    path: str | None = None
+    image: Image.Image | None = None
+    max_dim: int | None = None
+    metadata: ImageMetadata | None = None
+    jpeg: JpegOptions | None = None
+    job_id: int = field(default_factory=lambda: next(_job_ids))
+
+
+class RenderWorker:
+    """Single background thread that renders/saves the latest submitted RenderJob.
+
+    Messages are (job, status, payload) tuples:
+        PROGRESS → status text                DONE → watermarked image (None for large-image saves;
+        ERROR → the exception                        (proxy, full size) for PROXY)
+        CANCELLED → None
+    """
+
+    def __init__(self):
+        self.messages = queue.Queue()
+        self._cond = threading.Condition()
+        self._cancel = threading.Event()
+        self._pending = None      # Latest RENDER/PROXY waiting to run
+        self._saves = deque()     # SAVE jobs waiting to run, oldest first
+        self._running = None
+        self._thread = threading.Thread(target=self._run, name="render-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """True while a job is running or waiting."""
+        with self._cond:
+            return self._pending is not None or bool(self._saves) or self._running is not None
+
+    def submit(self, job: RenderJob):
+        """Queue job; a running render is cancelled (it is out of date).
+
+        A SAVE joins the queue of waiting saves. A RENDER or PROXY replaces the one waiting in
+        the slot, which is reported CANCELLED; waiting saves are kept and run first.
+        """
+        with self._cond:
+            if job.kind == SAVE:
+                self._saves.append(job)
+            else:
+                if self._pending is not None:
+                    self.messages.put((self._pending, CANCELLED, None))   # Coalesced away, never started
+                self._pending = job
+            if self._running is not None and self._running.kind == RENDER:
+                self._cancel.set()
+            self._cond.notify()
+
+    def cancel(self):
+        """Drop the waiting jobs and stop the running one at its next checkpoint."""
+        with self._cond:
+            while self._saves:
+                self.messages.put((self._saves.popleft(), CANCELLED, None))
+            if self._pending is not None:
+                self.messages.put((self._pending, CANCELLED, None))
+                self._pending = None
+            if self._running is not None:
+                self._cancel.set()
+
+    def cancel_renders(self):
+        """Drop the waiting render and stop the running job at its next checkpoint if it is a render.
+
+        Waiting and running saves (and proxies) are left alone: only renders go out of date
+        when the settings change.
+        """
+        with self._cond:
+            if self._pending is not None and self._pending.kind == RENDER:
+                self.messages.put((self._pending, CANCELLED, None))
+                self._pending = None
+            if self._running is not None and self._running.kind == RENDER:
+                self._cancel.set()
+
+    def join(self, timeout: float | None = None):
+        """Wait (up to timeout seconds) until no job is running or waiting."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending is None and not self._saves and self._running is None,
+                                timeout)
+
+    # ---------------------------- WORKER THREAD ------------------------------- #
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._saves)
+                if self._saves:
+                    job = self._saves.popleft()
+                else:
+                    job, self._pending = self._pending, None
+                self._running = job
+                self._cancel.clear()
+
+            try:
+                self.messages.put((job, DONE, self._execute(job)))
+            except RenderCancelled:
+                self.messages.put((job, CANCELLED, None))
+            except Exception as e:
+                self.messages.put((job, ERROR, e))
+            finally:
+                with self._cond:
+                    self._running = None
+                    self._cond.notify_all()
+
+    def _check_cancelled(self):
+        if self._cancel.is_set():
+            raise RenderCancelled()
+
+    def _execute(self, job: RenderJob):
+        """Render (unless job.image is given) and, for SAVE jobs, encode. Returns the watermarked image."""
+        if isinstance(job.source, str):
+            return self._execute_large(job)
+
+        image = job.image
+        if image is None:
+            self.messages.put((job, PROGRESS, "Rendering full resolution…"))
+            self._check_cancelled()
+            image = apply_watermark(job.source, job.settings)
+            self._check_cancelled()
+        if job.kind == RENDER:
+            return image
+
+        written = reported = 0
+
+        def on_write(size):
+            # Runs for every encoded chunk: the cancel checkpoint inside a long encode
+            nonlocal written, reported
+            self._check_cancelled()
+            written += size
+            if written - reported >= PROGRESS_STEP_BYTES:
+                reported = written
+                self.messages.put((job, PROGRESS, f"Saving… {written / (1024 * 1024):.1f} MB"))
+
+        self.messages.put((job, PROGRESS, "Saving…"))
+        save_watermarked(image, job.path, progress=on_write, metadata=job.metadata, jpeg=job.jpeg)
+        return image
+
+    def _execute_large(self, job: RenderJob):
+        """PROXY or SAVE of an image streamed from its file, one strip at a time."""
+        verb = "Loading" if job.kind == PROXY else "Saving"
+
+        def on_strip(rows_done, rows_total):
+            self._check_cancelled()
+            self.messages.put((job, PROGRESS, f"{verb}… {rows_done * 100 // rows_total} %"))
+
+        self.messages.put((job, PROGRESS, f"{verb}…"))
+        if job.kind == PROXY:
+            return make_proxy(job.source, job.max_dim, progress=on_strip)
+        watermark_large_file(job.source, job.path, job.settings, progress=on_strip)
+        return None
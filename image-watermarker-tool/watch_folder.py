@@ -0,0 +1,475 @@
+"""
+WATCH-FOLDER DAEMON
+-------------------
+Drop-folder automation: photographers save into a hot folder, watermarked copies
+appear in an output folder (same tree), until the daemon is stopped (Ctrl+C / SIGTERM).
+
+    python watch_folder.py hot/ -o watermarked/ --text "© studio" --tiled
+    python watch_folder.py hot/ -o watermarked/ --logo logo.png --workers 4 --settle 5 --polling
+
+   - Watching: inotify (Linux, through ctypes, no extra package) reports the files that
+     were created, closed after writing or moved in. Elsewhere, or when inotify runs out of
+     watches, the folder is re-scanned every --poll-interval seconds instead.
+   - Debounce: a file is only processed once its size and modification time have not
+     changed for --settle seconds, so a photo still being copied (or uploaded over SMB,
+     which writes in bursts) is not read half written. Hidden and temporary files
+     (".name", "*.part", "*.tmp", "~name") are ignored.
+   - Processing: ready files go to a process pool (batch_watermark.watermark_one, so the
+     large-image and JPEG/EXIF handling are the same as the batch tool's), with at most
+     IN_FLIGHT_PER_WORKER files per worker submitted at once.
+   - State: every finished file is recorded as relative path → size, mtime and a hash
+     of the watermark settings, in a JSON state file (written atomically). On restart,
+     files already processed with the same settings are skipped; a file that changed,
+     or any file after the settings changed, is processed again. Failed files are
+     recorded too, so they are retried when they change, not on every scan.
+   - Metrics: every --metrics-interval seconds, throughput (files/s), failures and the
+     queue depth (settling, ready, in flight) are logged.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import logging
+import os
+import select
+import signal
+import struct
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from batch_watermark import (IMAGE_EXTENSIONS, DEFAULT_WORKERS, IN_FLIGHT_PER_WORKER, watermark_one,
+                             add_watermark_arguments, settings_from_args, check_output_dir)
+from watermark_engine import WatermarkSettings, JpegOptions, atomic_write
+
+log = logging.getLogger("watch_folder")
+
+# Seconds a file must stay unchanged (size + mtime) before it is processed
+DEFAULT_SETTLE_SECONDS = 2.0
+
+# Seconds between two full scans when polling
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Seconds between two metrics log lines
+DEFAULT_METRICS_INTERVAL = 60.0
+
+# Main loop tick: how often settling files are re-checked and finished jobs collected
+TICK_SECONDS = 0.25
+
+# The state file is rewritten at most this often (and once more on exit)
+STATE_SAVE_SECONDS = 5.0
+
+STATE_FILENAME = ".watermark-state.json"
+STATE_VERSION = 1
+
+# Names that are still being written by some tool (browsers, rsync, office suites) or are not photos
+TEMP_SUFFIXES = (".part", ".tmp", ".crdownload", ".download")
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT_HEADER = struct.Struct("iIII")   # wd, mask, cookie, len (then len bytes of NUL-padded name)
+
+
+def is_candidate(filename: str) -> bool:
+    """True for image files that are not hidden or temporary."""
+    lower = filename.lower()
+    return (lower.endswith(IMAGE_EXTENSIONS) and not filename.startswith((".", "~"))
+            and not lower.endswith(TEMP_SUFFIXES))
+
+
+def scan(directory: str):
+    """Yield the absolute path of every candidate image under directory."""
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for filename in files:
+            if is_candidate(filename):
+                yield os.path.join(root, filename)
+
+
+def settings_hash(settings: WatermarkSettings, jpeg: JpegOptions) -> str:
+    """Stable digest of everything that changes the output (hash() of a str is salted per process).
+
+    The logo's modification time is included: replacing the logo file re-processes the folder.
+    """
+    logo_mtime = None
+    if settings.logo_path:
+        try:
+            logo_mtime = os.stat(settings.logo_path).st_mtime_ns
+        except OSError:
+            pass
+    return hashlib.sha256(repr((settings, jpeg, logo_mtime)).encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------- WATCHERS ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+class PollingWatcher:
+    """Portable watcher: a full scan every interval seconds."""
+
+    name = "polling"
+
+    def __init__(self, directory: str, interval: float = DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._next_scan = 0.0
+
+    def changes(self, timeout: float) -> list:
+        """Wait up to timeout seconds; return the paths that may have changed (every file, on a scan)."""
+        now = time.monotonic()
+        if now < self._next_scan:
+            time.sleep(min(timeout, self._next_scan - now))
+            return []
+        self._next_scan = now + self.interval
+        return list(scan(self.directory))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux watcher: inotify watches on the folder and every subfolder, read through ctypes.
+
+    Raises:
+        OSError: If inotify is not available or the watch limit (fs.inotify.max_user_watches) is reached.
+    """
+
+    name = "inotify"
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directory = directory
+        self._dirs = {}   # watch descriptor → directory
+        try:
+            self._rescan = list(self._watch_tree(directory))
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, directory: str):
+        """Watch directory and its subfolders; yield the files already in them.
+
+        Files can land in a new subfolder before its watch exists: they are found by this scan.
+        """
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, f"inotify_add_watch failed for '{root}': {os.strerror(errno)}")
+            self._dirs[wd] = root
+            yield from (os.path.join(root, f) for f in files if is_candidate(f))
+
+    def changes(self, timeout: float) -> list:
+        """Wait up to timeout seconds for events; return the paths they concern."""
+        if self._rescan is not None:
+            paths, self._rescan = self._rescan, None
+            return paths
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                log.warning("inotify queue overflowed, rescanning %s", self.directory)
+                return list(scan(self.directory))
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)   # Folder deleted or moved away
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name or name.startswith("."):
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                try:
+                    paths.extend(self._watch_tree(path))   # New (or moved in) subfolder
+                except OSError as e:
+                    log.warning("Not watching %s: %s", path, e)
+            elif is_candidate(name):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(directory: str, polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """InotifyWatcher when possible, else PollingWatcher."""
+    if not polling:
+        try:
+            return InotifyWatcher(directory)
+        except OSError as e:
+            log.warning("inotify unavailable (%s), falling back to polling every %gs", e, poll_interval)
+    return PollingWatcher(directory, poll_interval)
+
+
+# ---------------------------- STATE FILE ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+def load_state(path: str) -> dict:
+    """relative path → {'size', 'mtime_ns', 'settings'[, 'error']} from the state file ({} if absent or unreadable)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable state file %s (%s): every file will be processed", path, e)
+        return {}
+    if state.get("version") != STATE_VERSION:
+        return {}
+    return state.get("files", {})
+
+
+def save_state(path: str, files: dict):
+    """Write the state file atomically: a crash mid-write keeps the previous one."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with atomic_write(path) as raw:
+        raw.write(json.dumps({"version": STATE_VERSION, "files": files}, indent=1).encode("utf-8"))
+
+
+# ---------------------------- DAEMON ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+class WatchDaemon:
+    """Debounces the watcher's paths, feeds ready files to the pool and records the results.
+
+    Args:
+        directory (str): Hot folder.
+        output_dir (str): Root of the mirrored output tree.
+        settings (WatermarkSettings): Watermark applied to every image.
+        jpeg (JpegOptions): Encoding of JPEG outputs.
+        executor (concurrent.futures.Executor): Pool that runs watermark_one().
+        watcher: InotifyWatcher or PollingWatcher on directory.
+        state_path (str): JSON state file.
+        settle (float): Seconds a file must stay unchanged before it is processed.
+        metrics_interval (float): Seconds between two metrics log lines.
+    """
+
+    def __init__(self, directory: str, output_dir: str, settings: WatermarkSettings, jpeg: JpegOptions, executor,
+                 watcher, state_path: str, settle: float = DEFAULT_SETTLE_SECONDS,
+                 metrics_interval: float = DEFAULT_METRICS_INTERVAL):
+        self.directory = directory
+        self.output_dir = output_dir
+        self.settings = settings
+        self.jpeg = jpeg
+        self.executor = executor
+        self.watcher = watcher
+        self.state_path = state_path
+        self.settle = settle
+        self.metrics_interval = metrics_interval
+        self.max_in_flight = IN_FLIGHT_PER_WORKER * getattr(executor, '_max_workers', DEFAULT_WORKERS)
+
+        self.settings_hash = settings_hash(settings, jpeg)
+        self.files = load_state(state_path)
+        self.settling = {}     # path → (size, mtime_ns, monotonic time of the last change)
+        self.ready = deque()   # (path, size, mtime_ns)
+        self.in_flight = {}    # future → (path, size, mtime_ns)
+        self.queued = set()    # paths in ready or in_flight
+        self.stopping = False
+
+        self._state_dirty = False
+        self._state_saved_at = time.monotonic()
+        self._metrics_at = time.monotonic()
+        self._interval_done = self._interval_failed = 0
+        self.total_done = self.total_failed = 0
+
+    def stop(self, *_):
+        """Signal handler: finish the files in flight, save the state and return from run()."""
+        self.stopping = True
+
+    def run(self):
+        """Watch until stop() is called (SIGINT / SIGTERM)."""
+        log.info("Watching %s → %s (%s, settle %gs, %d known files)", self.directory, self.output_dir,
+                 self.watcher.name, self.settle, len(self.files))
+        try:
+            while not self.stopping:
+                for path in self.watcher.changes(TICK_SECONDS):
+                    self.notice(path)
+                self.check_settling()
+                self.submit_ready()
+                self.collect(timeout=0)
+                self.maybe_save_state()
+                self.maybe_log_metrics()
+        finally:
+            log.info("Stopping: waiting for %d files in flight", len(self.in_flight))
+            while self.in_flight:
+                self.collect(timeout=None)
+            self.watcher.close()
+            self.save_state()
+            self.log_metrics()
+
+    def relative(self, path: str) -> str:
+        """State-file key of path (relative to the hot folder, '/' separators on every OS)."""
+        return os.path.relpath(path, self.directory).replace(os.sep, "/")
+
+    def is_done(self, path: str, size: int, mtime_ns: int) -> bool:
+        """True if this exact version of path was already processed (or failed) with the current settings."""
+        entry = self.files.get(self.relative(path))
+        return (entry is not None and entry['size'] == size and entry['mtime_ns'] == mtime_ns
+                and entry['settings'] == self.settings_hash)
+
+    def notice(self, path: str):
+        """Start (or restart) the settle timer of a file the watcher reported."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.settling.pop(path, None)   # Deleted or moved away again
+            return
+        if self.is_done(path, st.st_size, st.st_mtime_ns):
+            return
+        if path in self.queued:
+            return   # Picked up again once its current job is done, if it changed meanwhile
+        previous = self.settling.get(path)
+        if previous is None or previous[:2] != (st.st_size, st.st_mtime_ns):
+            self.settling[path] = (st.st_size, st.st_mtime_ns, time.monotonic())
+
+    def check_settling(self):
+        """Move the files that stopped changing for `settle` seconds to the ready queue."""
+        now = time.monotonic()
+        for path, (size, mtime_ns, changed_at) in list(self.settling.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.settling[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                self.settling[path] = (st.st_size, st.st_mtime_ns, now)   # Still being written
+            elif st.st_size > 0 and now - changed_at >= self.settle:
+                del self.settling[path]
+                self.ready.append((path, size, mtime_ns))
+                self.queued.add(path)
+
+    def submit_ready(self):
+        """Top the pool up to max_in_flight from the ready queue."""
+        while self.ready and len(self.in_flight) < self.max_in_flight:
+            path, size, mtime_ns = self.ready.popleft()
+            name = self.relative(path)
+            dst_path = os.path.join(self.output_dir, name)
+            future = self.executor.submit(watermark_one, name, path, dst_path, self.settings, self.jpeg)
+            self.in_flight[future] = (path, size, mtime_ns)
+
+    def collect(self, timeout: float | None):
+        """Record the jobs that finished (waiting up to timeout seconds for one, None = forever)."""
+        if not self.in_flight:
+            return
+        done, _ = wait(self.in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, size, mtime_ns = self.in_flight.pop(future)
+            self.queued.discard(path)
+            result = future.result()
+            entry = {'size': size, 'mtime_ns': mtime_ns, 'settings': self.settings_hash}
+            if 'error' in result:
+                entry['error'] = result['error']
+                self._interval_failed += 1
+                log.error("❌ %s: %s", result['name'], result['error'])
+            else:
+                self._interval_done += 1
+                log.info("✅ %s", result['name'])
+            self.files[self.relative(path)] = entry
+            self._state_dirty = True
+            self.notice(path)   # Changed again while it was being processed?
+
+    def save_state(self):
+        if not self._state_dirty:
+            return
+        try:
+            save_state(self.state_path, self.files)
+        except OSError as e:
+            log.error("Cannot write state file %s: %s", self.state_path, e)
+            return
+        self._state_dirty = False
+        self._state_saved_at = time.monotonic()
+
+    def maybe_save_state(self):
+        if time.monotonic() - self._state_saved_at >= STATE_SAVE_SECONDS:
+            self.save_state()
+
+    def maybe_log_metrics(self):
+        if time.monotonic() - self._metrics_at >= self.metrics_interval:
+            self.log_metrics()
+
+    def log_metrics(self):
+        """One line: throughput since the last line, failures and queue depth."""
+        now = time.monotonic()
+        elapsed = max(now - self._metrics_at, 1e-9)
+        self.total_done += self._interval_done
+        self.total_failed += self._interval_failed
+        log.info("metrics: %.2f files/s (%d done, %d failed in %.0fs) | queue: %d settling, %d ready, %d in flight | "
+                 "total: %d done, %d failed", self._interval_done / elapsed, self._interval_done,
+                 self._interval_failed, elapsed, len(self.settling), len(self.ready), len(self.in_flight),
+                 self.total_done, self.total_failed)
+        self._interval_done = self._interval_failed = 0
+        self._metrics_at = now
+
+
+def _ignore_sigint():
+    """Pool initializer: Ctrl+C reaches the whole process group, but only the daemon should react
+    (it lets the workers finish their files)."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def main(argv=None):
+    """Parse arguments and watch the hot folder until interrupted."""
+    parser = argparse.ArgumentParser(description="Watermark every image saved into a hot folder.")
+    parser.add_argument('directory', help="Hot folder to watch (recursively)")
+    parser.add_argument('-o', '--output', required=True, help="Output folder (the tree is mirrored into it)")
+    add_watermark_arguments(parser)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Worker processes (default: CPU count)")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="Seconds a file must stay unchanged before it is processed (default: 2)")
+    parser.add_argument('--polling', action='store_true', help="Scan the folder periodically instead of inotify")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Seconds between two scans when polling (default: 2)")
+    parser.add_argument('--state', help=f"State file (default: OUTPUT/{STATE_FILENAME})")
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_METRICS_INTERVAL,
+                        help="Seconds between two metrics lines (default: 60)")
+    args = parser.parse_args(argv)
+
+    settings, jpeg = settings_from_args(parser, args)
+    check_output_dir(parser, args.directory, args.output)
+    if not os.path.isdir(args.directory):
+        parser.error(f"'{args.directory}' is not a folder")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    state_path = args.state or os.path.join(args.output, STATE_FILENAME)
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_ignore_sigint) as executor:
+        watcher = make_watcher(args.directory, args.polling, args.poll_interval)
+        daemon = WatchDaemon(args.directory, args.output, settings, jpeg, executor, watcher, state_path,
+                             settle=args.settle, metrics_interval=args.metrics_interval)
+        signal.signal(signal.SIGINT, daemon.stop)
+        signal.signal(signal.SIGTERM, daemon.stop)
+        daemon.run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,594 @@
+"""
+HEADLESS WATERMARK ENGINE
+-------------------------
+The compositing logic of the Image Watermarker, without any Tkinter.
+
+   - WatermarkSettings: one immutable (frozen) object that describes the whole
+     watermark: text or logo, opacity, position, font family / size / color or logo scale.
+     Being frozen and hashable, it can be sent to worker processes and used as a
+     cache key.
+   - get_sprite(settings): the watermark rendered once at its own size (not the
+     image's), kept in an LRU cache. A batch with one set of settings renders
+     the text or resizes the logo once per process, not once per image.
+   - apply_watermark(image, settings): returns a watermarked copy of a Pillow image
+     (or blends in place), compositing the sprite onto the region it covers only and
+     keeping RGB photos in RGB: no full-frame RGBA copy is made.
+   - layout="Tiled": the anti-theft pattern. The sprite is rotated once into a
+     tile, one band of tiles is filled by doubling pastes, and the band is blended
+     row after row: every pixel is composited once, however dense the pattern.
+   - apply_watermark(proxy, settings, scale=...): the same watermark on a downscaled
+     proxy of the photo (live GUI preview): the sprite is drawn at the proxy's scale,
+     so the preview costs the same whether the photo has 2 or 50 megapixels.
+   - load_image(path): opens a photo upright (EXIF orientation applied) and returns
+     the ImageMetadata (EXIF, ICC profile, JPEG quantization tables) to write back.
+   - save_watermarked(image, path): atomic save (atomic_write: temp file + rename), with an optional
+     progress callback that can also abort the encode (GUI background saves). Keeps the
+     source's metadata, and encodes JPEG with JpegOptions (quality, progressive, optimize,
+     chroma subsampling, or the source's own quantization tables).
+   - watermark_file(src, dst, settings): open → watermark → save, for batch tools.
+
+Used by main.py (the GUI builds a WatermarkSettings from its widgets) and by
+batch_watermark.py (the command line tool).
+"""
+
+import os
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageOps, JpegImagePlugin
+
+from font_registry import DEFAULT_FONT_FAMILY, load_font
+
+# ---------------------------- CONSTANTS ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+WATERMARK_KINDS = ("Text", "Logo")
+POSITIONS = ("Top Left", "Top Right", "Bottom Left", "Bottom Right", "Center")
+LAYOUTS = ("Single", "Tiled")
+
+DEFAULT_OPACITY = 55            # %
+DEFAULT_FONT_SIZE = 48          # px
+DEFAULT_LOGO_SCALE = 28         # % of the logo's own size
+DEFAULT_POSITION = "Bottom Right"
+DEFAULT_COLOR = (255, 255, 255)
+DEFAULT_LAYOUT = "Single"
+DEFAULT_TILE_ANGLE = 30         # degrees, counter-clockwise
+DEFAULT_TILE_GAP = 150          # px between two tiles
+
+# Distance (px) between the watermark and the image edges
+MARGIN = 35
+
+# Smallest logo side after scaling, avoids errors with tiny images
+MIN_LOGO_SIZE = 20
+
+# Rendered watermark sprites kept per process (one per distinct text/logo settings and scale)
+SPRITE_CACHE_SIZE = 32
+
+# Decoded logo files kept per process (resizing for a new scale/opacity skips the decode)
+LOGO_CACHE_SIZE = 4
+
+# Formats without an alpha channel: RGBA results are flattened to RGB before saving
+OPAQUE_EXTENSIONS = (".jpg", ".jpeg", ".bmp")
+
+# JPEG output. Pillow's default quality (75) shows blocking on skies and gradients.
+DEFAULT_JPEG_QUALITY = 90
+JPEG_SUBSAMPLINGS = ("4:4:4", "4:2:2", "4:2:0")
+DEFAULT_JPEG_SUBSAMPLING = "4:2:0"
+
+# Formats that store an EXIF block / an ICC profile that Pillow can write back
+EXIF_FORMATS = ("JPEG", "PNG", "WEBP")
+ICC_FORMATS = ("JPEG", "PNG", "WEBP", "TIFF")
+
+
+class RenderCancelled(Exception):
+    """Raised (e.g. from a save progress callback) to abandon a render or save half way."""
+
+
+@dataclass(frozen=True)
+class WatermarkSettings:
+    """Everything needed to watermark an image, independent of any widget.
+
+    Attributes:
+        kind: "Text" or "Logo".
+        text: Watermark text (Text mode).
+        font_size: Font size in pixels (Text mode).
+        font_family: Installed font family name or font file path (Text mode, see font_registry.py).
+        color: RGB tuple of the text (Text mode).
+        opacity: 0-100 %, applied to the text color or the logo's alpha channel.
+        position: One of POSITIONS (Single layout).
+        logo_path: Path of the logo file (Logo mode).
+        logo_scale: Logo size in % of the logo file's own size (Logo mode).
+        layout: "Single" (once, at position) or "Tiled" (repeated over the whole image).
+        tile_angle: Rotation of each tile in degrees, -90 to 90 (Tiled layout).
+        tile_gap: Space in pixels between tiles (Tiled layout).
+    """
+    kind: str = "Text"
+    text: str = ""
+    font_size: int = DEFAULT_FONT_SIZE
+    font_family: str = DEFAULT_FONT_FAMILY
+    color: tuple = DEFAULT_COLOR
+    opacity: int = DEFAULT_OPACITY
+    position: str = DEFAULT_POSITION
+    logo_path: str | None = None
+    logo_scale: int = DEFAULT_LOGO_SCALE
+    layout: str = DEFAULT_LAYOUT
+    tile_angle: int = DEFAULT_TILE_ANGLE
+    tile_gap: int = DEFAULT_TILE_GAP
+
+    def __post_init__(self):
+        """Reject settings that cannot produce a watermark (raises ValueError)."""
+        if self.kind not in WATERMARK_KINDS:
+            raise ValueError(f"Unknown watermark type '{self.kind}'. Choose one of: {', '.join(WATERMARK_KINDS)}")
+        if self.position not in POSITIONS:
+            raise ValueError(f"Unknown position '{self.position}'. Choose one of: {', '.join(POSITIONS)}")
+        if not 0 <= self.opacity <= 100:
+            raise ValueError("Opacity must be between 0 and 100")
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout '{self.layout}'. Choose one of: {', '.join(LAYOUTS)}")
+        if not -90 <= self.tile_angle <= 90:
+            raise ValueError("Tile angle must be between -90 and 90 degrees")
+        if self.tile_gap < 0:
+            raise ValueError("Tile gap cannot be negative")
+        if self.kind == "Text" and not self.text.strip():
+            raise ValueError("Please enter watermark text!")
+        if self.kind == "Logo" and not self.logo_path:
+            raise ValueError("Please upload a logo first!")
+
+
+@dataclass(frozen=True)
+class JpegOptions:
+    """How JPEG files are encoded.
+
+    Attributes:
+        quality: 1-100. Ignored when keep_qtables uses the source's tables.
+        progressive: Progressive scans (smaller for large photos, slower to encode).
+        optimize: Optimized Huffman tables (a few % smaller, extra pass over the data).
+        subsampling: Chroma subsampling, one of JPEG_SUBSAMPLINGS.
+        keep_qtables: Reuse the quantization tables (and subsampling) of a JPEG source, so
+            the output keeps the source's quality instead of being quantized a second time.
+    """
+    quality: int = DEFAULT_JPEG_QUALITY
+    progressive: bool = False
+    optimize: bool = False
+    subsampling: str = DEFAULT_JPEG_SUBSAMPLING
+    keep_qtables: bool = False
+
+    def __post_init__(self):
+        """Reject options libjpeg cannot encode (raises ValueError)."""
+        if not 1 <= self.quality <= 100:
+            raise ValueError("JPEG quality must be between 1 and 100")
+        if self.subsampling not in JPEG_SUBSAMPLINGS:
+            raise ValueError(f"Unknown subsampling '{self.subsampling}'. Choose one of: {', '.join(JPEG_SUBSAMPLINGS)}")
+
+    def save_options(self, mode: str, metadata=None) -> dict:
+        """Image.save() keyword arguments for an image of this mode, taken from a source with this metadata."""
+        options = {'quality': self.quality, 'progressive': self.progressive, 'optimize': self.optimize,
+                   'subsampling': self.subsampling}
+        tables_needed = 1 if mode == "L" else 2   # Luma, then chroma
+        if self.keep_qtables and metadata is not None and len(metadata.qtables or ()) >= tables_needed:
+            # Pillow scales explicit tables by `quality`: leave it out to get the source's tables as they are.
+            del options['quality']
+            options['qtables'] = [list(table) for table in metadata.qtables[:tables_needed]]
+            if metadata.subsampling is not None:
+                options['subsampling'] = metadata.subsampling   # The tables were tuned for it
+        return options
+
+
+@dataclass(frozen=True)
+class ImageMetadata:
+    """What a source file carries besides its pixels, written back by save_watermarked().
+
+    Attributes:
+        exif: Raw EXIF block, orientation tag removed (the pixels are already upright).
+        icc_profile: Embedded ICC color profile.
+        qtables: Quantization tables of a JPEG source (tuples of 64 values, luma first).
+        subsampling: Chroma subsampling of a JPEG source, one of JPEG_SUBSAMPLINGS.
+    """
+    exif: bytes | None = None
+    icc_profile: bytes | None = None
+    qtables: tuple | None = None
+    subsampling: str | None = None
+
+
+@dataclass(frozen=True, eq=False)
+class WatermarkSprite:
+    """A rendered watermark, ready to be composited onto any image.
+
+    Compared and hashed by identity: get_sprite() hands out one object per cached render,
+    which makes it a cheap cache key for the tiles built from it.
+
+    Attributes:
+        image: RGBA image holding only the watermark (shared by the cache: never modify it).
+        box_size: (w, h) used for placement: the text's bounding box, or the logo size.
+        offset: Where the placement box starts inside `image` (text fonts can draw left/above their origin).
+    """
+    image: Image.Image
+    box_size: tuple
+    offset: tuple = (0, 0)
+
+
+# ---------------------------- HELPERS ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+def get_position(img_w: int, img_h: int, wm_w: int, wm_h: int, pos_name: str, margin: int = MARGIN) -> tuple:
+    """
+    Return (x, y) coordinates for placing watermark based on chosen position name.
+    Used by both text and logo watermark application.
+
+    Parameters:
+    img_w: width of the main (original) image
+    img_h: height of the main (original) image
+    wm_w: width of the watermark (either text or logo)
+    wm_h: height of the watermark (either text or logo)
+    pos_name: the name of the desired position (e.g., "Top Left", "Center")
+    margin: distance from the image edges (MARGIN, scaled down for previews)
+    """
+    # Pillow's coordinate system starts with (0,0) at the top-left corner:
+    # x increases to the right, y increases downwards.
+    if pos_name == "Top Left":
+        return margin, margin
+
+    elif pos_name == "Top Right":
+        # The right edge of the watermark sits margin pixels from the right edge of the image.
+        return img_w - wm_w - margin, margin
+
+    elif pos_name == "Bottom Left":
+        # The bottom edge of the watermark sits margin pixels from the bottom edge of the image.
+        return margin, img_h - wm_h - margin
+
+    elif pos_name == "Bottom Right":
+        return img_w - wm_w - margin, img_h - wm_h - margin
+
+    else:  # Center
+        # Half of the remaining space on each side; // keeps integer pixel coordinates.
+        return (img_w - wm_w) // 2, (img_h - wm_h) // 2
+
+
+# ---------------------------- SPRITES (CACHED RENDERING) ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+def get_sprite(settings: WatermarkSettings, scale: float = 1.0) -> WatermarkSprite:
+    """Return the rendered watermark for these settings, from the LRU cache when possible.
+
+    Logo sprites are keyed on the logo file's modification time too, so editing the
+    logo on disk invalidates its sprite.
+
+    Args:
+        settings (WatermarkSettings): What to draw.
+        scale (float): Size of the target image relative to the full-resolution photo
+            (1.0 for the photo itself, e.g. 0.05 for a preview proxy).
+
+    Raises:
+        OSError: If the logo file cannot be opened.
+    """
+    if settings.kind == "Text":
+        return _render_text_sprite(settings.text, settings.font_size, tuple(settings.color), settings.opacity, scale,
+                                   settings.font_family)
+    mtime_ns = os.stat(settings.logo_path).st_mtime_ns
+    return _render_logo_sprite(settings.logo_path, mtime_ns, settings.logo_scale, settings.opacity, scale)
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def _render_text_sprite(text: str, font_size: int, color: tuple, opacity: int, scale: float = 1.0,
+                        font_family: str = DEFAULT_FONT_FAMILY) -> WatermarkSprite:
+    """Draw the text once on a transparent layer the size of its own bounding box."""
+    # Previews draw with a proportionally smaller font instead of shrinking a full-size sprite
+    font = load_font(max(1, round(font_size * scale)), font_family)
+    fill_color = color + (int(255 * opacity / 100.0),)   # e.g. (255, 255, 255) + (140,)
+
+    # Measure the text before drawing it: [0] Left, [1] Top, [2] Right, [3] Bottom
+    left, top, right, bottom = ImageDraw.Draw(Image.new("RGBA", (1, 1))).textbbox((0, 0), text, font=font)
+
+    # The layer spans from the drawing origin (or further left/up, if the glyphs overhang it)
+    # to the far corner of the bounding box, so placing it at the origin matches draw.text((x, y)).
+    offset = (max(0, -left), max(0, -top))
+    layer = Image.new("RGBA", (right + offset[0], bottom + offset[1]), (0, 0, 0, 0))
+    ImageDraw.Draw(layer).text(offset, text, fill=fill_color, font=font)
+
+    return WatermarkSprite(image=layer, box_size=(right - left, bottom - top), offset=offset)
+
+
+@lru_cache(maxsize=LOGO_CACHE_SIZE)
+def _load_logo(logo_path: str, mtime_ns: int) -> Image.Image:
+    """Decode the logo file to RGBA once (shared by the cache: never modify it). mtime_ns is only part of the cache key."""
+    with Image.open(logo_path) as logo_file:
+        return logo_file.convert("RGBA")
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def _render_logo_sprite(logo_path: str, mtime_ns: int, logo_scale: int, opacity: int,
+                        scale: float = 1.0) -> WatermarkSprite:
+    """Resize and fade the logo once. mtime_ns is only part of the cache key."""
+    logo = _load_logo(logo_path, mtime_ns)
+
+    # Size on the full-resolution photo, then (previews) shrunk in the same single resize
+    new_w = max(MIN_LOGO_SIZE, int(logo.width * logo_scale / 100.0))
+    new_h = max(MIN_LOGO_SIZE, int(logo.height * logo_scale / 100.0))
+    new_w, new_h = max(1, round(new_w * scale)), max(1, round(new_h * scale))
+    logo = logo.resize((new_w, new_h), Image.Resampling.LANCZOS)
+
+    # Scale the logo's own alpha channel by the opacity
+    alpha = logo.getchannel("A").point(lambda p: int(p * opacity / 100.0))
+    logo.putalpha(alpha)
+
+    return WatermarkSprite(image=logo, box_size=(new_w, new_h))
+
+
+def get_tile(settings: WatermarkSettings, scale: float = 1.0) -> Image.Image:
+    """Return the repeating cell of the Tiled layout: the rotated sprite plus the gap, from the LRU cache.
+
+    Raises:
+        OSError: If the logo file cannot be opened.
+    """
+    return _render_tile(get_sprite(settings, scale), settings.tile_angle, round(settings.tile_gap * scale))
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def _render_tile(sprite: WatermarkSprite, angle: int, gap: int) -> Image.Image:
+    """Rotate the sprite once and pad it with half the gap on every side."""
+    # Rotate with premultiplied alpha ("RGBa"), otherwise the transparent black around the
+    # glyphs bleeds into their anti-aliased edges as a dark fringe.
+    rotated = sprite.image.convert("RGBa").rotate(angle, Image.Resampling.BICUBIC, expand=True).convert("RGBA")
+    bbox = rotated.getchannel("A").getbbox()
+    if bbox is not None:
+        rotated = rotated.crop(bbox)   # Drop the empty corners added by expand=True
+
+    tile = Image.new("RGBA", (rotated.width + gap, rotated.height + gap), (0, 0, 0, 0))
+    tile.paste(rotated, (gap // 2, gap // 2))
+    return tile
+
+
+def _visible_part(x: int, y: int, sprite_w: int, sprite_h: int, img_w: int, img_h: int):
+    """Clip a sprite placed at (x, y) to the image.
+
+    Returns:
+        tuple | None: ((dest_x, dest_y), (src_left, src_top, src_right, src_bottom)), or None if nothing is visible.
+    """
+    left, top = max(0, x), max(0, y)
+    right, bottom = min(img_w, x + sprite_w), min(img_h, y + sprite_h)
+    if left >= right or top >= bottom:
+        return None
+    return (left, top), (left - x, top - y, right - x, bottom - y)
+
+
+# ---------------------------- COMPOSITING ------------------------------- #
+# ------------------------------------------------------------------------------------ #
+def _working_mode(image: Image.Image) -> str:
+    """Mode the watermark is blended in: RGB for opaque images, RGBA when the image has transparency."""
+    if image.mode in ("RGB", "RGBA"):
+        return image.mode
+    if image.mode in ("LA", "PA") or "transparency" in image.info:
+        return "RGBA"
+    return "RGB"
+
+
+def apply_watermark(image: Image.Image, settings: WatermarkSettings, in_place: bool = False,
+                    scale: float = 1.0, canvas_size: tuple | None = None, top: int = 0) -> Image.Image:
+    """Composite the text or logo watermark onto image (or a copy of it).
+
+    Only the rectangle covered by the (cached) sprite is blended. An RGB photo stays RGB:
+    on an opaque background, alpha compositing the sprite is exactly a paste that uses the
+    sprite's alpha channel as mask, so no full-frame RGBA copy (and no full-size layer)
+    is ever allocated. Peak memory and time follow the watermark's area, not the photo's.
+
+    Args:
+        image (Image.Image): Source image (any mode).
+        settings (WatermarkSettings): What to draw and where.
+        in_place (bool): Blend into image itself instead of a copy, when it is already RGB or RGBA.
+            Saves one full-frame copy when the caller does not need the original anymore.
+        scale (float): image is a proxy this many times the size of the real photo (preview): the
+            font, logo size and margin shrink with it, so the proxy looks like a thumbnail of the real result.
+        canvas_size (tuple | None): (w, h) of the whole image when `image` is only a horizontal strip of it
+            (large_image.py); the watermark is placed on the whole image and only its part in the strip is drawn.
+        top (int): Row of the whole image where the strip starts.
+
+    Returns:
+        Image.Image: RGB watermarked image (RGBA if the source had transparency).
+
+    Raises:
+        OSError: If the logo file cannot be opened.
+    """
+    mode = _working_mode(image)
+    if image.mode != mode:
+        result = image.convert(mode)   # Palette/grayscale/CMYK sources: the conversion is the copy
+    elif in_place:
+        result = image
+    else:
+        result = image.copy()
+    if settings.layout == "Tiled":
+        _composite_tiled(result, get_tile(settings, scale), mode == "RGBA" and settings.kind == "Text", top)
+        return result
+
+    sprite = get_sprite(settings, scale)
+
+    margin = round(MARGIN * scale)
+    canvas_w, canvas_h = canvas_size or result.size
+    x, y = get_position(canvas_w, canvas_h, *sprite.box_size, settings.position, margin)
+    x, y = x - sprite.offset[0], y - sprite.offset[1] - top
+
+    visible = _visible_part(x, y, sprite.image.width, sprite.image.height, result.width, result.height)
+    if visible is None:
+        return result
+    dest, source = visible
+
+    if mode == "RGBA" and settings.kind == "Text":
+        # Blend the text "stencil" onto its region based on both alpha channels
+        result.alpha_composite(sprite.image, dest=dest, source=source)
+    else:
+        # The sprite provides the colors, and is also the mask (its alpha channel) for blending.
+        # Only this crop is ever converted, never the photo.
+        part = sprite.image.crop(source)
+        result.paste(part, dest, part)
+    return result
+
+
+def _composite_tiled(result: Image.Image, tile: Image.Image, alpha_composite: bool, top: int = 0):
+    """Blend tile repeatedly over the whole of result (in place), rows staggered by half a tile.
+
+    The pattern starts at row 0 of the whole image: result may be a strip of it starting at `top`.
+
+    The text is never drawn more than once: one band (a tile high, the image plus a tile wide)
+    is filled by doubling pastes (1, 2, 4, 8… tiles: log2 pastes), then blended row after row.
+    Each pixel of the image is composited exactly once, so the cost stays the same however
+    small the tiles, and the overlay never grows beyond one band.
+    """
+    tile_w, tile_h = tile.size
+    band = Image.new("RGBA", (result.width + tile_w, tile_h), (0, 0, 0, 0))
+    band.paste(tile, (0, 0))
+    filled = tile_w
+    while filled < band.width:
+        band.paste(band.crop((0, 0, filled, tile_h)), (filled, 0))
+        filled *= 2
+
+    # Even rows start on a tile edge, odd rows half a tile further: the tiles line up diagonally
+    rows = (band.crop((0, 0, result.width, tile_h)), band.crop((tile_w // 2, 0, tile_w // 2 + result.width, tile_h)))
+
+    for index in range(top // tile_h, -(-(top + result.height) // tile_h)):
+        row = rows[index % 2]
+        # First/last rows may be cut by the edges of the image (or strip)
+        dest, source = _visible_part(0, index * tile_h - top, result.width, tile_h, result.width, result.height)
+        if alpha_composite:
+            result.alpha_composite(row, dest=dest, source=source)
+        else:
+            part = row.crop(source) if source[3] - source[1] < tile_h else row
+            result.paste(part, dest, part)
+
+
+def load_image(path: str) -> tuple:
+    """Open path upright and read the metadata to preserve on save.
+
+    The EXIF orientation is applied to the pixels (cameras store portrait photos sideways and
+    rely on that tag), and removed from the EXIF kept in ImageMetadata.
+
+    Returns:
+        tuple: (Image.Image, ImageMetadata). Close the image when done (it may hold the file open).
+
+    Raises:
+        OSError: If the file cannot be read or is not an image.
+    """
+    image = Image.open(path)
+    qtables = subsampling = None
+    if isinstance(image, JpegImagePlugin.JpegImageFile):
+        qtables = tuple(tuple(table) for _, table in sorted(image.quantization.items()))
+        sampling = JpegImagePlugin.get_sampling(image)
+        subsampling = JPEG_SUBSAMPLINGS[sampling] if 0 <= sampling < len(JPEG_SUBSAMPLINGS) else None
+
+    ImageOps.exif_transpose(image, in_place=True)   # Also rewrites info["exif"] without the orientation
+    metadata = ImageMetadata(exif=image.info.get("exif") or None, icc_profile=image.info.get("icc_profile") or None,
+                             qtables=qtables, subsampling=subsampling)
+    return image, metadata
+
+
+def _icc_matches(profile: bytes, mode: str) -> bool:
+    """True if the ICC profile's color space (header bytes 16-20) fits images of this mode.
+
+    A CMYK source converted to RGB must not carry its CMYK profile along.
+    """
+    return profile[16:20] == (b"GRAY" if mode in ("L", "LA") else b"RGB ")
+
+
+def _metadata_options(image: Image.Image, image_format: str, metadata: ImageMetadata | None) -> dict:
+    """Image.save() keyword arguments that write metadata back, where the format can store it."""
+    options = {}
+    if metadata is None:
+        return options
+    if metadata.exif and image_format in EXIF_FORMATS:
+        options['exif'] = metadata.exif
+    if metadata.icc_profile and image_format in ICC_FORMATS and _icc_matches(metadata.icc_profile, image.mode):
+        options['icc_profile'] = metadata.icc_profile
+    return options
+
+
+class _ProgressWriter:
+    """Binary file wrapper that reports every write to a callback.
+
+    It deliberately has no fileno(): given a real file, Pillow's encoders write to the
+    descriptor directly and the callback would never run.
+    """
+
+    def __init__(self, raw, on_write):
+        self._raw = raw
+        self._on_write = on_write
+
+    def write(self, data):
+        self._on_write(len(data))
+        return self._raw.write(data)
+
+    def seek(self, *args):
+        return self._raw.seek(*args)
+
+    def tell(self):
+        return self._raw.tell()
+
+    def flush(self):
+        self._raw.flush()
+
+
+def save_watermarked(image: Image.Image, path: str, progress=None, metadata: ImageMetadata | None = None,
+                     jpeg: JpegOptions | None = None, **save_options):
+    """Save a watermarked image, flattening RGBA results to RGB for formats without transparency (JPEG).
+
+    The file is encoded next to its destination under a temporary name, then renamed over it:
+    a crash, a full disk or a cancel never leaves a half-written image at `path`.
+
+    Args:
+        image (Image.Image): Image to save.
+        path (str): Destination; the format comes from the extension (or save_options['format']).
+        progress (Callable[[int], None] | None): Called with the size of every encoded chunk.
+            Raising from it (e.g. RenderCancelled) aborts the save.
+        metadata (ImageMetadata | None): Source EXIF / ICC profile to keep (see load_image()).
+        jpeg (JpegOptions | None): JPEG encoding options (default: JpegOptions()).
+        **save_options: Passed to Image.save(), over the options above.
+
+    Raises:
+        ValueError: If the extension is not an image format Pillow can write.
+        OSError: If the file cannot be written.
+    """
+    if image.mode != "RGB" and path.lower().endswith(OPAQUE_EXTENSIONS):
+        image = image.convert("RGB")
+
+    extension = os.path.splitext(path)[1].lower()
+    image_format = save_options.pop("format", None) or Image.registered_extensions().get(extension)
+    if image_format is None:
+        raise ValueError(f"Unknown image format for '{os.path.basename(path)}'")
+
+    options = _metadata_options(image, image_format, metadata)
+    if image_format == "JPEG":
+        options.update((jpeg or JpegOptions()).save_options(image.mode, metadata))
+    save_options = {**options, **save_options}
+
+    with atomic_write(path) as raw:
+        image.save(raw if progress is None else _ProgressWriter(raw, progress), format=image_format, **save_options)
+
+
+@contextmanager
+def atomic_write(path: str):
+    """Open a temporary file next to path for binary writing; rename it over path only if the block succeeds.
+
+    On any error (or RenderCancelled) the temporary file is removed and path is left untouched.
+    """
+    temp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        with open(temp_path, "xb") as raw:
+            yield raw
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def watermark_file(src_path: str, dst_path: str, settings: WatermarkSettings, jpeg: JpegOptions | None = None):
+    """Open src_path upright, watermark it and save it to dst_path with its metadata (parent folders are created).
+
+    Raises:
+        OSError: If the image or logo cannot be read, or the result cannot be written.
+    """
+    image, metadata = load_image(src_path)
+    with image:
+        # The decoded file is ours alone: blend into it rather than into a second copy
+        result = apply_watermark(image, settings, in_place=True)
+
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    save_watermarked(result, dst_path, metadata=metadata, jpeg=jpeg)
@@ -0,0 +1,874 @@
+# ---------------------------- AUDIOBOOK ENGINE ------------------------------- #
+# The PDF → MP3 conversion of the PDF to Audiobook Converter, without any Tkinter,
+# so it can run from the GUI's background thread, a script or a benchmark.
+#
+#   - iter_pdf_pages → strip_running_lines → iter_paragraphs → iter_chunks: a generator
+#     pipeline, PDF pages → pages without running headers/footers and page numbers →
+#     paragraphs (hyphenated line breaks rejoined, sentences carried across page breaks)
+#     → TTS-sized chunks that end on sentence (preferably paragraph) boundaries, so the
+#     voice never stops mid-sentence. Every step is linear in the text and nothing holds
+#     the whole book: a chunk is ready as soon as its pages are read.
+#   - Synthesizers: turn one chunk into one MP3 part. EdgeSynthesizer talks to the
+#     Microsoft Edge neural voices (edge-tts); FakeSynthesizer writes silent MP3
+#     frames after a simulated delay, for tests and benchmarks (no network).
+#   - ChunkCache / JobManifest: every part is stored under a hash of (chunk text, voice,
+#     rate, backend) in a persistent cache, and each conversion keeps a manifest of its
+#     parts on disk. A conversion that crashed or lost the network at part 180 of 250
+#     restarts with those 180 parts; re-converting an unchanged book synthesizes nothing,
+#     and another voice reuses nothing.
+#   - synthesize_chunks: ONE event loop for the whole book. The chunk generator is read
+#     on a worker thread into a bounded queue that `concurrency` synthesis workers
+#     empty, each chunk retried with exponential backoff. The first part is being
+#     synthesized while the rest of the PDF is still being parsed, and the parser
+#     never runs more than the queue's size ahead (memory stays bounded).
+#   - convert_pdf_to_audiobook: the whole conversion with progress/status callbacks. The
+#     PDF's outline (bookmarks) makes each chapter start a new part, and the parts are
+#     streamed into one MP3 with chapter markers (mp3_assembly.py).
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+import PyPDF2
+
+from mp3_assembly import assemble_mp3
+
+# TTS defaults
+DEFAULT_VOICE = "en-US-ChristopherNeural"
+DEFAULT_RATE = 0
+CHUNK_SIZE = 3000
+
+# A chunk that already holds this share of CHUNK_SIZE ends with its paragraph, rather than
+# with a sentence of the next one (paragraph breaks are where a narrator pauses anyway)
+PARAGRAPH_BREAK_RATIO = 0.75
+
+# Running headers/footers: the first/last lines of each page are compared with the same
+# lines of the HEADER_WINDOW pages before and after it. A line (numbers ignored) found on
+# at least HEADER_MIN_SHARE of them is a running title, not text.
+HEADER_LINES = 2
+HEADER_WINDOW = 4
+HEADER_MIN_SHARE = 1 / 3
+HEADER_MAX_CHARS = 100
+
+# Chunks synthesized at the same time. The TTS service answers each request at speaking
+# speed, so one request at a time leaves it idle most of the time; much higher than this
+# and Edge starts refusing connections.
+DEFAULT_CONCURRENCY = 4
+
+# Chunks read ahead of the synthesis workers, per worker (the pipeline's memory window)
+QUEUE_CHUNKS_PER_WORKER = 2
+
+# Attempts per chunk (first try included) and the backoff between them: 1 s, 2 s, 4 s, ... (capped), with jitter
+RETRY_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Chunk cache: parts kept for reuse, least recently used removed first past CACHE_MAX_BYTES
+# (about 45 hours of speech at Edge's 48 kbps). Manifests of conversions that never
+# finished are forgotten after JOB_MAX_AGE_SECONDS.
+CACHE_MAX_BYTES = 1024 ** 3
+JOB_MAX_AGE_SECONDS = 30 * 24 * 3600
+CACHE_VERSION = 1
+
+# The manifest is rewritten at most this often while chunks are being read
+MANIFEST_SAVE_SECONDS = 2.0
+
+# Progress bar share of each step (%)
+PROGRESS_EXTRACTED = 10
+PROGRESS_CHUNKED = 20
+PROGRESS_SYNTHESIZED = 90
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#                           Data Prepare Construction
+# ──────────────────────────────────────────────────────────────────────────
+
+def iter_pdf_pages(pdf_path: str, on_page=None):
+    """
+    Yield the text of each page of a PDF file, one page at a time, using PyPDF2.
+
+    Args:
+        pdf_path (str): Full path to the PDF file.
+        on_page (Callable[[int, int], None] | None): Called with (pages read, total pages)
+            after each page.
+
+    Yields:
+        str: Text of one page (empty for pages without text, e.g. scans).
+    """
+    try:
+        # mode: r = read, b = binary
+        with open(pdf_path, "rb") as file:
+            reader = PyPDF2.PdfReader(file)  # PdfReader reads the raw bytes and parses the PDF structure
+            total = len(reader.pages)
+            for number, page in enumerate(reader.pages, start=1):
+                page_text = page.extract_text() or ""
+                if on_page is not None:
+                    on_page(number, total)
+                yield page_text
+    except Exception as e:
+        raise Exception(f"Failed to extract text from PDF: {str(e)}")
+
+
+def pdf_chapters(pdf_path: str) -> list:
+    """
+    The top-level entries of a PDF's outline (bookmarks), as chapters.
+
+    Args:
+        pdf_path (str): Full path to the PDF file.
+
+    Returns:
+        list[tuple[str, int]]: (title, 0-based page index) in page order; empty when the PDF
+        has no outline or an unreadable one (chapters are optional).
+    """
+    try:
+        with open(pdf_path, "rb") as file:
+            reader = PyPDF2.PdfReader(file)
+            chapters = []
+            for entry in reader.outline:
+                if isinstance(entry, list):   # Sub-entries of the previous chapter
+                    continue
+                page = reader.get_destination_page_number(entry)
+                title = " ".join(str(entry.title or "").split())
+                if page is not None and page >= 0 and title:
+                    chapters.append((title, page))
+    except Exception:
+        return []
+    return sorted(chapters, key=lambda chapter: chapter[1])
+
+
+def extract_text_from_pdf(pdf_path: str) -> str:
+    """
+    Extract the text of a whole PDF file (pages separated by blank lines).
+
+    Args:
+        pdf_path (str): Full path to the PDF file.
+
+    Returns:
+        str: Extracted plain text.
+    """
+    return "\n\n".join(text for text in iter_pdf_pages(pdf_path) if text).strip()
+
+
+# Lines that are only a page number: "12", "- 12 -", "Page 12", "12 / 300", "Page 12 of 300"
+_PAGE_NUMBER = re.compile(r"^\W*(page\s*)?\d+(\s*(/|of)\s*\d+)?\W*$", re.IGNORECASE)
+# "exam-\nple" → "example" (a lower-case letter on both sides: "Jean-\nPaul" keeps its hyphen)
+_HYPHEN_BREAK = re.compile(r"(?<=[a-z])-[ \t]*\n[ \t]*(?=[a-z])")
+# "Jean-\nPaul" → "Jean-Paul"
+_HYPHEN_COMPOUND_BREAK = re.compile(r"(?<=\w-)[ \t]*\n[ \t]*(?=[A-Z0-9])")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# End of a sentence: . ! ? … (closing quotes/brackets included), then whitespace
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*\s+")
+# Clause boundaries, to split sentences longer than a chunk
+_CLAUSE_END = re.compile(r"[,;:—]\s+")
+# Words that end with a period without ending the sentence
+ABBREVIATIONS = frozenset({"mr", "mrs", "ms", "dr", "prof", "st", "sr", "jr", "vs", "etc", "e.g", "i.e", "fig",
+                           "no", "vol", "ch", "p", "pp", "cf", "approx"})
+
+
+def _edge_signature(line: str) -> str:
+    """How a header/footer line is compared between pages: numbers (page, chapter) ignored."""
+    return re.sub(r"\d+", "#", line.strip().casefold())
+
+
+def _strip_page_edges(lines: list, others: list) -> list:
+    """Remove page-number lines and running titles from the top and bottom of one page's lines.
+
+    others: (top signatures, bottom signatures) of the neighboring pages.
+    """
+    needed = max(1, round(HEADER_MIN_SHARE * len(others)))
+
+    def is_running(line, edge):
+        if _PAGE_NUMBER.match(line):
+            return True
+        if len(line) > HEADER_MAX_CHARS or not others:
+            return False
+        signature = _edge_signature(line)
+        return sum(signature in page[edge] for page in others) >= needed
+
+    # Indices of the non-blank lines: blank lines between paragraphs are kept
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    top = 0
+    while top < min(HEADER_LINES, len(content)) and is_running(lines[content[top]], 0):
+        top += 1
+    bottom = len(content)
+    while bottom > max(top, len(content) - HEADER_LINES) and is_running(lines[content[bottom - 1]], 1):
+        bottom -= 1
+    if top == bottom:
+        return []
+    return lines[content[top]:content[bottom - 1] + 1]
+
+
+def strip_running_lines(pages, window: int = HEADER_WINDOW):
+    """
+    Remove running headers/footers (book or chapter title on every page) and page numbers
+    from a stream of page texts.
+
+    Each page is compared with the `window` pages before and after it, so only
+    2 × window + 1 pages are held at once.
+
+    Yields:
+        str: Page text without its running lines.
+    """
+    buffer = []   # (lines, (top signatures, bottom signatures)) of up to `window` pages around the next one
+    position = 0  # Index in buffer of the next page to yield
+
+    def edges(lines):
+        content = [line for line in lines if line.strip()]
+        return ({_edge_signature(line) for line in content[:HEADER_LINES]},
+                {_edge_signature(line) for line in content[-HEADER_LINES:]})
+
+    def strip():
+        lines = buffer[position][0]
+        others = [page[1] for i, page in enumerate(buffer) if i != position]
+        return "\n".join(_strip_page_edges(lines, others))
+
+    for page_text in pages:
+        lines = page_text.splitlines()
+        buffer.append((lines, edges(lines)))
+        # The next page has all its neighbors after it (the first pages have fewer before)
+        if len(buffer) - position > window:
+            yield strip()
+            if position < window:
+                position += 1
+            else:
+                buffer.pop(0)
+    # The last pages have fewer neighbors after them
+    while position < len(buffer):
+        yield strip()
+        position += 1
+
+
+class SectionBreak(NamedTuple):
+    """In a stream of paragraphs: a chapter starts here (iter_chunks starts a new chunk)."""
+    title: str
+
+
+def iter_paragraphs(pages, max_chars: int = CHUNK_SIZE * 4, sections=None):
+    """
+    Turn page texts into paragraphs of normalized text: hyphenated line breaks rejoined, line
+    breaks and runs of spaces collapsed, and a paragraph cut by a page break continued on the
+    next page. A paragraph longer than max_chars (text without any paragraph break) is handed
+    over in pieces, so memory stays bounded.
+
+    Args:
+        pages (Iterable[str]): Page texts, one per page of the PDF.
+        max_chars (int): Longest paragraph held back.
+        sections (dict[int, list[str]] | None): Titles of the chapters starting on each page
+            (0-based index); a SectionBreak is yielded before the page's text.
+
+    Yields:
+        str | SectionBreak: One paragraph, whitespace-normalized, or a chapter start.
+    """
+    carry = ""   # Unfinished paragraph at the end of the previous page
+    for page_index, page_text in enumerate(pages):
+        if sections and page_index in sections:
+            # A chapter never continues the previous page's paragraph
+            if carry:
+                yield carry
+                carry = ""
+            for title in sections[page_index]:
+                yield SectionBreak(title)
+        paragraphs = _PARAGRAPH_BREAK.split(_HYPHEN_COMPOUND_BREAK.sub("", _HYPHEN_BREAK.sub("", page_text)))
+        for position, paragraph in enumerate(paragraphs):
+            text = " ".join(paragraph.split())
+            if not text:
+                continue
+            if position == 0 and carry:
+                if carry.endswith("-") and carry[-2:-1].islower() and text[:1].islower():
+                    text = carry[:-1] + text   # Word hyphenated across the page break
+                else:
+                    text = carry + " " + text
+                carry = ""
+            if carry:
+                yield carry
+            carry = text
+        # The page's last paragraph stays open unless it ends a sentence
+        if carry and (carry.endswith((".", "!", "?", "…", '"', "”", "’", ")")) or len(carry) > max_chars):
+            yield carry
+            carry = ""
+    if carry:
+        yield carry
+
+
+def split_sentences(paragraph: str, max_chars: int = CHUNK_SIZE):
+    """
+    Yield the sentences of a paragraph. A sentence longer than max_chars is split at clause
+    boundaries (, ; : —), then between words; a single word longer than max_chars stays whole.
+    """
+    start = 0
+    for match in _SENTENCE_END.finditer(paragraph):
+        # "Mr. Smith", "e.g. this", "J. R. R. Tolkien": not the end of a sentence
+        last_word = paragraph[start:match.start()].rsplit(None, 1)[-1:] or [""]
+        last_word = last_word[0].lower()
+        if match.group().startswith(".") and (last_word in ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha())):
+            continue
+        yield from _split_long(paragraph[start:match.end()].rstrip(), max_chars)
+        start = match.end()
+    if start < len(paragraph):
+        yield from _split_long(paragraph[start:].rstrip(), max_chars)
+
+
+def _split_long(sentence: str, max_chars: int):
+    """The sentence itself, or pieces of at most max_chars cut at clause ends, then at spaces."""
+    if len(sentence) <= max_chars:
+        yield sentence
+        return
+    pieces = []
+    start = 0
+    for match in _CLAUSE_END.finditer(sentence):
+        pieces.append(sentence[start:match.end()].rstrip())
+        start = match.end()
+    pieces.append(sentence[start:])
+    # Pieces still too long fall back to words; then pack the pieces greedily with a running length
+    pieces = [word for piece in pieces for word in (piece.split() if len(piece) > max_chars else [piece])]
+    current, length = [], 0
+    for piece in pieces:
+        if current and length + 1 + len(piece) > max_chars:
+            yield " ".join(current)
+            current, length = [], 0
+        length += len(piece) + (1 if current else 0)
+        current.append(piece)
+    if current:
+        yield " ".join(current)
+
+
+def iter_chunks(paragraphs, chunk_size: int = CHUNK_SIZE, on_section=None):
+    """
+    Pack a stream of paragraphs into chunks for reliable TTS processing, yielding each chunk
+    as soon as it is full.
+
+    Chunks end on sentence boundaries, and on a paragraph boundary when the chunk is already
+    PARAGRAPH_BREAK_RATIO full. The length of the chunk being built is kept in a running
+    counter: each sentence is added in constant time (no re-joining to measure it).
+
+    Args:
+        paragraphs (Iterable[str | SectionBreak]): Normalized paragraphs (iter_paragraphs()), in
+            reading order. A SectionBreak ends the chunk being built.
+        chunk_size (int): Max characters per chunk (only a single word longer than this exceeds it).
+        on_section (Callable[[str, int], None] | None): Called for each SectionBreak with (its
+            title, index of the chunk the section starts with).
+
+    Yields:
+        str: Text chunks; paragraphs inside a chunk are separated by a line break.
+    """
+    current_chunk = []   # Sentences, each with its separator (" " or "\n") in front but the first
+    length = 0
+    count = 0            # Chunks yielded so far
+
+    for paragraph in paragraphs:
+        if isinstance(paragraph, SectionBreak):
+            if current_chunk:
+                yield "".join(current_chunk)
+                count += 1
+                current_chunk, length = [], 0
+            if on_section is not None:
+                on_section(paragraph.title, count)
+            continue
+
+        separator = "\n"
+        for sentence in split_sentences(paragraph, chunk_size):
+            # Seal the chunk when the next sentence doesn't fit; the sentence starts the next one
+            if current_chunk and length + 1 + len(sentence) > chunk_size:
+                yield "".join(current_chunk)
+                count += 1
+                current_chunk, length = [], 0
+            if current_chunk:
+                current_chunk.append(separator + sentence)
+                length += 1 + len(sentence)
+            else:
+                current_chunk.append(sentence)
+                length = len(sentence)
+            separator = " "
+
+        if length >= PARAGRAPH_BREAK_RATIO * chunk_size:
+            yield "".join(current_chunk)
+            count += 1
+            current_chunk, length = [], 0
+
+    # The final chunk, if it didn't get to the limit
+    if current_chunk:
+        yield "".join(current_chunk)
+
+
+def split_text_into_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> list:
+    """
+    Split long text into smaller chunks for reliable TTS processing.
+
+    Args:
+        text (str): Full extracted text.
+        chunk_size (int): Max characters per chunk.
+
+    Returns:
+        list[str]: List of text chunks.
+    """
+    return list(iter_chunks(iter_paragraphs([text], max_chars=max(len(text), 1)), chunk_size))
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#                           Synthesizers (pluggable TTS backends)
+# ──────────────────────────────────────────────────────────────────────────
+# A synthesizer is any object with:
+#     async def synthesize(self, text: str, voice: str, rate: int, output_path: str) -> None
+# that writes one MP3 file. Raising any exception makes synthesize_chunks retry the chunk.
+
+class EdgeSynthesizer:
+    """Microsoft Edge neural voices through edge-tts (needs a network connection)."""
+
+    async def synthesize(self, text: str, voice: str, rate: int, output_path: str):
+        """Convert text to speech using edge-tts."""
+        import edge_tts   # Imported here: the rest of the engine (and FakeSynthesizer) works without it
+
+        # 'communicate' is the object that talks to the Microsoft Server
+        communicate = edge_tts.Communicate(text, voice=voice, rate=f"{rate:+d}%")
+        # await can only be used inside an async function, and it waits for it's code to return a response
+        await communicate.save(output_path)
+
+
+class FakeSynthesizer:
+    """Offline stand-in for EdgeSynthesizer: waits like a TTS request, then writes silent MP3 frames.
+
+    The frames have Edge's output format (MPEG-2 Layer III, 24 kHz, 48 kbps, mono) and
+    last about as long as the text would take to read, so the parts can be assembled
+    and played like real ones.
+
+    Args:
+        latency (float): Seconds each request takes (the service speaks at about real time,
+            so a real 3000-character chunk takes several seconds).
+        failure_rate (float): Probability (0-1) that a request fails, to exercise the retries.
+        seed (int | None): Seed of the failure draws, for reproducible runs.
+    """
+
+    # MPEG-2 Layer III, no CRC | 48 kbps, 24 kHz, no padding | mono, original
+    FRAME_HEADER = bytes((0xFF, 0xF3, 0x64, 0xC4))
+    FRAME_SIZE = 144                # 72 × 48000 / 24000 bytes
+    FRAME_SECONDS = 576 / 24000     # 24 ms of audio per frame
+    CHARS_PER_SECOND = 15           # Typical narration speed
+
+    def __init__(self, latency: float = 0.5, failure_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.requests = 0
+
+    @classmethod
+    def silent_mp3(cls, seconds: float) -> bytes:
+        """Silent frames (all-zero side info and audio data) lasting about this long."""
+        frame = cls.FRAME_HEADER + bytes(cls.FRAME_SIZE - len(cls.FRAME_HEADER))
+        return frame * max(1, round(seconds / cls.FRAME_SECONDS))
+
+    async def synthesize(self, text: str, voice: str, rate: int, output_path: str):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError("Simulated TTS failure")
+        seconds = len(text) / self.CHARS_PER_SECOND / (1 + rate / 100)
+        with open(output_path, "wb") as f:
+            f.write(self.silent_mp3(seconds))
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#                           Chunk Cache (resumable conversions)
+# ──────────────────────────────────────────────────────────────────────────
+
+def user_cache_dir() -> str:
+    """Per-user cache folder of the app (LOCALAPPDATA on Windows, Library/Caches on macOS, XDG elsewhere)."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "pdf-to-audiobook")
+
+
+CACHE_DIR = user_cache_dir()
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write data next to path under a temporary name, then rename it: readers never see half a file."""
+    temp_path = f"{path}.{os.getpid()}.{random.getrandbits(32):08x}.part"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ChunkCache:
+    """Synthesized parts, stored under the hash of everything that changes their audio.
+
+    parts/ab/ab12....mp3 holds the MP3 of one (chunk text, voice, rate, backend); jobs/
+    holds the JobManifest of each conversion in progress. Any number of conversions (and
+    processes) can share one cache: parts are written under a temporary name and renamed.
+
+    Args:
+        cache_dir (str): Root folder of the cache (default: CACHE_DIR).
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.parts_dir = os.path.join(cache_dir, "parts")
+        self.jobs_dir = os.path.join(cache_dir, "jobs")
+        os.makedirs(self.parts_dir, exist_ok=True)
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text: str, voice: str, rate: int, backend: str = "EdgeSynthesizer") -> str:
+        """Hex digest identifying one part: the same text read by the same voice at the same speed."""
+        digest = hashlib.sha256(f"{CACHE_VERSION}\0{backend}\0{voice}\0{rate:+d}\0".encode())
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        """Where the part of this key is (or will be) stored."""
+        return os.path.join(self.parts_dir, key[:2], f"{key}.mp3")
+
+    def lookup(self, key: str) -> str | None:
+        """Path of the cached part, or None. A hit is marked as recently used (mtime) for prune()."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def temp_path(self, key: str) -> str:
+        """A private file name to synthesize a part into, before commit() publishes it."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{os.getpid()}.{random.getrandbits(32):08x}.part"
+
+    def commit(self, key: str, temp_path: str) -> str:
+        """Publish a finished part under its key (atomically) and return its path."""
+        path = self.path(key)
+        os.replace(temp_path, path)
+        return path
+
+    def prune(self, max_bytes: int = CACHE_MAX_BYTES):
+        """
+        Remove the least recently used parts until the cache holds at most max_bytes.
+        Parts listed in the manifest of an unfinished conversion are kept, so it can still
+        resume; manifests older than JOB_MAX_AGE_SECONDS are removed first.
+        """
+        keep = set()
+        now = time.time()
+        for entry in os.scandir(self.jobs_dir):
+            try:
+                if now - entry.stat().st_mtime > JOB_MAX_AGE_SECONDS:
+                    os.remove(entry.path)
+                    continue
+                with open(entry.path, encoding="utf-8") as f:
+                    keep.update(json.load(f).get("parts", []))
+            except (OSError, ValueError):
+                pass
+
+        parts = []
+        total = 0
+        for shard in os.scandir(self.parts_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                total += stat.st_size
+                key = entry.name.split(".", 1)[0]
+                if entry.name.endswith(".mp3") and key not in keep:
+                    parts.append((stat.st_mtime, stat.st_size, entry.path))
+                elif entry.name.endswith(".part") and now - stat.st_mtime > JOB_MAX_AGE_SECONDS:
+                    parts.append((stat.st_mtime, stat.st_size, entry.path))   # Left by a crash
+
+        for _, size, path in sorted(parts):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+class JobManifest:
+    """The parts of one conversion (a PDF file in its current state, a voice, a rate), on disk.
+
+    It lists the cache keys of the book's chunks in order as they are read, and whether all
+    of them have been. A restarted conversion knows how many parts the book has and how many
+    are already synthesized, and ChunkCache.prune() keeps its parts until it finishes.
+
+    Args:
+        cache (ChunkCache): The cache the manifest (and the parts) live in.
+        pdf_path (str): The book.
+        voice (str), rate (int), backend (str): As in ChunkCache.key().
+    """
+
+    def __init__(self, cache: ChunkCache, pdf_path: str, voice: str, rate: int, backend: str = "EdgeSynthesizer"):
+        stat = os.stat(pdf_path)
+        job = [CACHE_VERSION, os.path.abspath(pdf_path), stat.st_size, stat.st_mtime_ns, voice, rate, backend,
+               CHUNK_SIZE]
+        job_id = hashlib.sha256(json.dumps(job).encode()).hexdigest()[:32]
+        self.path = os.path.join(cache.jobs_dir, f"{job_id}.json")
+        self.pdf_path = os.path.abspath(pdf_path)
+        self.parts = []
+        self.complete = False
+        # What a previous run of the same job got to
+        self.previous = []
+        self.previous_complete = False
+        self._saved_at = 0.0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.previous = list(manifest["parts"])
+            self.previous_complete = bool(manifest["complete"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    @property
+    def expected_parts(self) -> int | None:
+        """Parts in the book according to a previous run that read all of it, else None."""
+        return len(self.previous) if self.previous_complete else None
+
+    def add(self, key: str):
+        """Record the next chunk's key (saved every MANIFEST_SAVE_SECONDS)."""
+        self.parts.append(key)
+        if time.monotonic() - self._saved_at > MANIFEST_SAVE_SECONDS:
+            self.save()
+
+    def save(self):
+        """Write the manifest atomically. A previous run's longer list is kept until this one gets past it."""
+        tail = [] if self.complete else self.previous[len(self.parts):]
+        data = {"version": CACHE_VERSION, "pdf": self.pdf_path, "parts": self.parts + tail,
+                "complete": self.complete or (bool(tail) and self.previous_complete)}
+        _write_atomic(self.path, json.dumps(data).encode("utf-8"))
+        self._saved_at = time.monotonic()
+
+    def remove(self):
+        """Forget the job (it finished): its parts become ordinary cache entries."""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+# ──────────────────────────────────────────────────────────────────────────
+#                           Convertion Functions
+# ──────────────────────────────────────────────────────────────────────────
+
+async def synthesize_with_retry(synthesizer, text: str, voice: str, rate: int, output_path: str,
+                                attempts: int = RETRY_ATTEMPTS):
+    """Synthesize one chunk, retrying failures with exponential backoff (and jitter, so parallel
+    chunks that failed together do not all retry at the same instant)."""
+    for attempt in range(attempts):
+        try:
+            await synthesizer.synthesize(text, voice, rate, output_path)
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+
+async def synthesize_chunks(chunks, cache: ChunkCache, voice: str, rate: int, synthesizer=None,
+                            concurrency: int = DEFAULT_CONCURRENCY, on_part_done=None, manifest=None) -> list:
+    """
+    Synthesize every chunk that is not in the cache yet, up to `concurrency` at a time, on the
+    running event loop.
+
+    Args:
+        chunks (Iterable[str]): Text chunks, in book order. A generator is read lazily, on a
+            worker thread (PDF parsing blocks), at most QUEUE_CHUNKS_PER_WORKER × concurrency
+            chunks ahead of the synthesis.
+        cache (ChunkCache): Where parts are looked up and stored.
+        voice (str), rate (int): TTS voice and speed (-50 to +50 %).
+        synthesizer: TTS backend (default: EdgeSynthesizer()).
+        concurrency (int): Chunks in progress at the same time.
+        on_part_done (Callable[[int, int, bool, int], None] | None): Called each time a part is
+            ready with (parts done, chunks read so far, whether all chunks have been read,
+            parts found in the cache so far).
+        manifest (JobManifest | None): Records the key of each chunk read (on the reading thread).
+
+    Returns:
+        list[str]: Part file paths (in the cache), in book order.
+
+    Raises:
+        Exception: The error of a chunk that still failed after RETRY_ATTEMPTS, or of the chunk
+            generator; the rest of the pipeline is cancelled.
+    """
+    synthesizer = synthesizer or EdgeSynthesizer()
+    backend = type(synthesizer).__name__   # Parts of another backend (FakeSynthesizer's silence) never match
+    queue = asyncio.Queue(maxsize=QUEUE_CHUNKS_PER_WORKER * concurrency)
+    paths = []
+    done = 0
+    reused = 0
+    exhausted = False
+
+    def next_chunk(chunk_iter):
+        # Runs on the worker thread: read (and hash) the next chunk
+        chunk = next(chunk_iter, None)
+        if chunk is None:
+            return None
+        key = cache.key(chunk, voice, rate, backend)
+        if manifest is not None:
+            manifest.add(key)
+        return chunk, key
+
+    def part_done():
+        nonlocal done
+        done += 1
+        if on_part_done is not None:
+            on_part_done(done, len(paths), exhausted, reused)
+
+    async def read_chunks():
+        # Producer: pages → chunks, off the event loop, blocking on the queue when it is full.
+        # Chunks already in the cache are done as soon as they are read.
+        nonlocal exhausted, reused
+        chunk_iter = iter(chunks)
+        while (item := await asyncio.to_thread(next_chunk, chunk_iter)) is not None:
+            chunk, key = item
+            index = len(paths)
+            path = cache.lookup(key)
+            paths.append(path)
+            if path is not None:
+                reused += 1
+                part_done()
+            else:
+                await queue.put((chunk, key, index))
+        exhausted = True
+        if manifest is not None:
+            manifest.complete = True
+        for _ in range(concurrency):
+            await queue.put(None)   # One "no more chunks" per worker
+
+    async def synthesize_parts():
+        # Consumer: `concurrency` of these run at once. Each part is written under a private
+        # name and published in the cache only once complete (an interrupted part is redone).
+        while (item := await queue.get()) is not None:
+            chunk, key, index = item
+            temp_path = cache.temp_path(key)
+            try:
+                await synthesize_with_retry(synthesizer, chunk, voice, rate, temp_path)
+                paths[index] = cache.commit(key, temp_path)
+            except BaseException:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                raise
+            part_done()
+
+    tasks = [asyncio.create_task(read_chunks())]
+    tasks += [asyncio.create_task(synthesize_parts()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return paths
+
+
+def convert_pdf_to_audiobook(pdf_path: str, output_dir: str, voice: str, rate: int, progress_callback, status_callback,
+                             synthesizer=None, concurrency: int = DEFAULT_CONCURRENCY, cache_dir: str = CACHE_DIR):
+    """Main conversion logic running in background thread."""
+    try:
+        status_callback("Opening PDF...")          # <========= CALLBACK STATUS
+        progress_callback(PROGRESS_EXTRACTED)      # <========= callback
+
+        # Parts of previous runs (this book after a crash, or the same text, voice and speed) are reused
+        synthesizer = synthesizer or EdgeSynthesizer()
+        cache = ChunkCache(cache_dir)
+        manifest = JobManifest(cache, pdf_path, voice, rate, type(synthesizer).__name__)
+
+        # Pages are read while the first parts are already being synthesized: the number of
+        # parts is only known at the end, so it is estimated from the share of pages read.
+        reading = {'page': 0, 'pages': 1}
+
+        def on_page(number, total):
+            reading.update(page=number, pages=total)
+
+        # Each outline entry starts a new part, so its chapter marker falls exactly on the part's start
+        sections = {}
+        for title, page in pdf_chapters(pdf_path):
+            sections.setdefault(page, []).append(title)
+        chapters = []   # (title, index of the part it starts with), filled in as the chunks are read
+
+        # Generators: nothing is read yet
+        chunks = iter_chunks(iter_paragraphs(strip_running_lines(iter_pdf_pages(pdf_path, on_page)), sections=sections),
+                             on_section=lambda title, index: chapters.append((title, index)))
+
+        # Automatic unique name generation
+        pdf_name = Path(pdf_path).stem
+        timestamp = datetime.now().strftime("%b-%d-%Y_%I%p")
+        output_file = os.path.join(output_dir, f"{pdf_name}_audiobook_{timestamp}.mp3")
+
+        last_progress = PROGRESS_CHUNKED
+
+        def on_part_done(done, read, exhausted, reused):
+            # Parts finish out of order: report how many are done, not which one
+            nonlocal last_progress
+            if exhausted:
+                total, label = read, f"{read}"
+            elif manifest.expected_parts:
+                total = max(read, manifest.expected_parts)   # Known from the interrupted run
+                label = f"{total}"
+            else:
+                total = max(read, len(manifest.previous),   # An interrupted run got at least that far
+                            round(read * reading['pages'] / max(1, reading['page'])))
+                label = f"~{total}"
+            resumed = f" ({reused} from earlier runs)" if reused else ""
+            status_callback(f"Converted {done} of {label} parts{resumed}...")  # <========= CALLBACK STATUS
+            # The estimate can grow (dense pages later on): never move the bar backwards
+            last_progress = max(last_progress, PROGRESS_CHUNKED + int((PROGRESS_SYNTHESIZED - PROGRESS_CHUNKED)
+                                                                      * done / total))
+            progress_callback(last_progress)
+
+        status_callback(f"Reading and converting ({concurrency} parts at a time)...")
+        progress_callback(PROGRESS_CHUNKED)
+
+        # The parts are named after their content (never after their index), so conversions
+        # into the same output folder can't overwrite each other's parts.
+        try:
+            # ONE event loop for the whole book (asyncio.run per chunk would build and tear down
+            # a loop every time, and only ever run one request at once).
+            temp_files = asyncio.run(synthesize_chunks(chunks, cache, voice, rate, synthesizer=synthesizer,
+                                                       concurrency=concurrency, on_part_done=on_part_done,
+                                                       manifest=manifest))
+        finally:
+            # Whatever happened, the next run knows which parts this one got to
+            manifest.save()
+        if not temp_files:
+            raise ValueError("No text could be extracted from the PDF.")
+
+        status_callback("Finalizing audiobook file...")     # <========= CALLBACK STATUS
+
+        # Parts streamed into one file (no part is read into memory), with one ID3 tag and the chapters
+        assemble_mp3(temp_files, output_file, title=pdf_name, chapters=chapters)
+
+        # The book is done: its parts stay cached (a re-run reuses them) until the cache is full
+        manifest.remove()
+        cache.prune()
+
+        progress_callback(100)  # <========= callback
+
+        status_callback(f"✅ Audiobook created successfully!\n{output_file}")    # <========= CALLBACK STATUS
+
+    except Exception as e:
+        status_callback(f"❌ Error: {str(e)}")       # <========= CALLBACK STATUS
+        progress_callback(0)    # <========= callback
@@ -0,0 +1,114 @@
+# ----------------------------- CHUNKER BENCHMARK -------------------------------- #
+# Time and chunk quality of the original word-by-word chunker (it re-joins the chunk
+# being built for every word to measure it) and of the sentence-aware pipeline
+# (strip_running_lines → iter_paragraphs → iter_chunks), on the same synthetic book:
+# pages with a running title and a page number, paragraphs, hyphenated line breaks.
+#
+#     python benchmark_chunker.py                    # 1M words
+#     python benchmark_chunker.py --words 200000 --chunk-size 1500
+#
+# "sentence ends" is the share of chunks that stop at the end of a sentence (the rest
+# cut the voice mid-sentence); "headers" counts running titles / page numbers read aloud.
+
+import argparse
+import random
+import sys
+import time
+
+from audiobook import iter_chunks, iter_paragraphs, strip_running_lines, CHUNK_SIZE
+
+DEFAULT_WORDS = 1_000_000
+WORDS_PER_PAGE = 350
+LINE_CHARS = 70
+RUNNING_TITLE = "THE SYNTHETIC BOOK"
+
+VOCABULARY = ("the", "of", "and", "a", "to", "in", "was", "he", "she", "it", "that", "river", "stone",
+              "light", "window", "remember", "morning", "quietly", "afternoon", "conversation",
+              "extraordinary", "understanding", "Mr.", "Dr.", "e.g.")
+
+
+def legacy(text: str, chunk_size: int = CHUNK_SIZE) -> list:
+    """The original split_text_into_chunks: words only, each test re-joins the whole chunk."""
+    words = text.split()
+    chunks = []
+    current_chunk = []
+    for word in words:
+        if len(" ".join(current_chunk) + " " + word) > chunk_size and current_chunk:
+            chunks.append(" ".join(current_chunk))
+            current_chunk = [word]
+        else:
+            current_chunk.append(word)
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+    return chunks
+
+
+def synthetic_pages(total_words: int, seed: int = 0) -> list:
+    """Page texts as PyPDF2 extracts them: title line, wrapped lines (some hyphenated), page number."""
+    rnd = random.Random(seed)
+    pages, lines, line, page_words = [], [], "", 0
+    sentence_left = rnd.randint(6, 30)
+    paragraph_left = rnd.randint(3, 8)
+
+    def close_page():
+        pages.append("\n".join([RUNNING_TITLE, *lines, line, "", str(len(pages) + 1)]))
+
+    for _ in range(total_words):
+        word = rnd.choice(VOCABULARY)
+        sentence_left -= 1
+        if sentence_left == 0:
+            word += "."
+            sentence_left = rnd.randint(6, 30)
+            paragraph_left -= 1
+        if len(line) + 1 + len(word) > LINE_CHARS:
+            if len(word) > 8 and not word.endswith("."):   # Hyphenate across the line break
+                line += " " + word[:4] + "-"
+                word = word[4:]
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word.capitalize()
+        page_words += 1
+        if word.endswith(".") and paragraph_left == 0:
+            lines.extend([line, ""])
+            line = ""
+            paragraph_left = rnd.randint(3, 8)
+        if page_words >= WORDS_PER_PAGE:
+            close_page()
+            lines, line, page_words = [], "", 0
+    if lines or line:
+        close_page()
+    return pages
+
+
+def report(label: str, seconds: float, chunks: list):
+    """Print one result row."""
+    sentence_ends = sum(chunk.endswith(".") for chunk in chunks) / len(chunks)
+    headers = sum(chunk.count(RUNNING_TITLE) for chunk in chunks)
+    average = sum(map(len, chunks)) / len(chunks)
+    print(f"{label:<14}{seconds:>9.2f}{len(chunks):>9}{average:>9.0f}{sentence_ends:>17.1%}{headers:>9}")
+
+
+def main(argv=None):
+    """Parse arguments, build the book and time both chunkers on it."""
+    parser = argparse.ArgumentParser(description="Original vs sentence-aware text chunker.")
+    parser.add_argument('--words', type=int, default=DEFAULT_WORDS, help="Words in the book (default: 1000000)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Max characters per chunk (default: 3000)")
+    args = parser.parse_args(argv)
+
+    pages = synthetic_pages(args.words)
+    print(f"{args.words} words, {len(pages)} pages, chunks of {args.chunk_size} characters")
+    print(f"{'chunker':<14}{'seconds':>9}{'chunks':>9}{'avg len':>9}{'sentence ends':>17}{'headers':>9}")
+
+    start = time.perf_counter()
+    chunks = legacy("\n\n".join(pages), args.chunk_size)
+    report("legacy", time.perf_counter() - start, chunks)
+
+    start = time.perf_counter()
+    chunks = list(iter_chunks(iter_paragraphs(strip_running_lines(pages)), args.chunk_size))
+    report("sentence", time.perf_counter() - start, chunks)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
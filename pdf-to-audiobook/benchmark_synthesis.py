@@ -0,0 +1,72 @@
+# ---------------------------- SYNTHESIS BENCHMARK ------------------------------- #
+# Wall time of synthesizing one book's chunks with the original loop (asyncio.run per
+# chunk, one request at a time) and with synthesize_chunks() at several concurrency
+# levels, against FakeSynthesizer (no network: the latency of a TTS request is simulated).
+#
+#     python benchmark_synthesis.py
+#     python benchmark_synthesis.py --chunks 100 --latency 2 --concurrency 1 4 8 16 --failure-rate 0.05
+#
+# With real edge-tts requests taking several seconds each, the speed-up is about the
+# concurrency level, up to what the service accepts.
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from audiobook import ChunkCache, FakeSynthesizer, synthesize_chunks, CHUNK_SIZE, DEFAULT_VOICE, DEFAULT_RATE
+
+DEFAULT_CHUNKS = 24
+DEFAULT_LATENCY = 0.25
+DEFAULT_LEVELS = (1, 2, 4, 8, 16)
+
+
+def legacy(chunks: list, parts_dir: str, synthesizer) -> list:
+    """The original loop: a new event loop per chunk, strictly one after another."""
+    paths = []
+    for i, chunk in enumerate(chunks):
+        path = os.path.join(parts_dir, f"temp_chunk_{i}.mp3")
+        asyncio.run(synthesizer.synthesize(chunk, DEFAULT_VOICE, DEFAULT_RATE, path))
+        paths.append(path)
+    return paths
+
+
+def measure(label: str, run) -> float:
+    """Run run(parts_dir) in a fresh folder (an empty chunk cache: nothing reused) and print its wall time."""
+    with tempfile.TemporaryDirectory() as parts_dir:
+        start = time.perf_counter()
+        run(parts_dir)
+        elapsed = time.perf_counter() - start
+    print(f"{label:<18}{elapsed:>9.2f}")
+    return elapsed
+
+
+def main(argv=None):
+    """Parse arguments and time every strategy on the same chunks."""
+    parser = argparse.ArgumentParser(description="Sequential vs concurrent TTS synthesis (fake backend).")
+    parser.add_argument('--chunks', type=int, default=DEFAULT_CHUNKS, help="Chunks in the book (default: 24)")
+    parser.add_argument('--latency', type=float, default=DEFAULT_LATENCY,
+                        help="Seconds per simulated TTS request (default: 0.25)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=DEFAULT_LEVELS,
+                        help="Concurrency levels to test (default: 1 2 4 8 16)")
+    parser.add_argument('--failure-rate', type=float, default=0.0,
+                        help="Share of requests that fail and are retried (default: 0)")
+    args = parser.parse_args(argv)
+
+    chunks = [f"{i:05d}".ljust(CHUNK_SIZE, "x") for i in range(args.chunks)]   # Distinct: no cache hits
+    print(f"{args.chunks} chunks, {args.latency:g} s per request, failure rate {args.failure_rate:g}")
+    print(f"{'strategy':<18}{'seconds':>9}")
+
+    if args.failure_rate == 0:   # The original loop has no retries: it would abort
+        measure("legacy", lambda parts_dir: legacy(chunks, parts_dir, FakeSynthesizer(args.latency)))
+    for level in args.concurrency:
+        synthesizer = FakeSynthesizer(args.latency, failure_rate=args.failure_rate, seed=level)
+        measure(f"concurrency {level}", lambda parts_dir: asyncio.run(synthesize_chunks(
+            chunks, ChunkCache(parts_dir), DEFAULT_VOICE, DEFAULT_RATE, synthesizer=synthesizer, concurrency=level)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,13 +5,11 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinterdnd2 import DND_FILES, TkinterDnD
-import PyPDF2
-import edge_tts
-import asyncio
 import threading
 import os
-from pathlib import Path
-from datetime import datetime
+
+# The conversion itself (PDF text extraction, chunking, concurrent TTS) lives in audiobook.py
+from audiobook import convert_pdf_to_audiobook, DEFAULT_VOICE, DEFAULT_RATE
 
 # ---------------------------- CONSTANTS ------------------------------- #
 # Custom palette from user design
@@ -21,153 +19,6 @@ MEDIUM_GREEN = "#6A7E3F"    # Success & highlights
 DARK_GREEN = "#4C5C2D"      # Text and strong contrast
 OFF_WHITE = "#FFFFFF"
 
-# TTS defaults
-DEFAULT_VOICE = "en-US-ChristopherNeural"
-DEFAULT_RATE = 0
-CHUNK_SIZE = 3000
-
-
-# ──────────────────────────────────────────────────────────────────────────
-#                           Data Prepare Construction
-# ──────────────────────────────────────────────────────────────────────────
-
-# ---------------------------- HELPER FUNCTIONS ------------------------------- #
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """
-    Extract text from a PDF file using PyPDF2.
-
-    Args:
-        pdf_path (str): Full path to the PDF file.
-
-    Returns:
-        str: Extracted plain text.
-    """
-    text = ""
-    try:
-        # mode: r = read, b = binary
-        with open(pdf_path, "rb") as file:
-            reader = PyPDF2.PdfReader(file)  # PdfReader reads the raw bytes and parses the PDF structure
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
-        return text.strip()
-    except Exception as e:
-        raise Exception(f"Failed to extract text from PDF: {str(e)}")
-
-
-def split_text_into_chunks(text: str, chunk_size: int = CHUNK_SIZE) -> list:
-    """
-    Split long text into smaller chunks for reliable TTS processing.
-
-    Args:
-        text (str): Full extracted text.
-        chunk_size (int): Max characters per chunk.
-
-    Returns:
-        list[str]: List of text chunks.
-    """
-    words = text.split()
-    chunks = []
-    current_chunk = []
-
-    # for loop appends a chunk to the chunks list when it hits the limit
-    for word in words:
-        # If the new word overpasses the chunk_size limit and there is more than one item on current_chunk
-        # it seals the packege and starts a new current_chunk list with that word as the only one on it
-        if len(" ".join(current_chunk) + " " + word) > chunk_size and current_chunk: # " ".join add a space between elements
-            chunks.append(" ".join(current_chunk)) # Save all the items as a "paragraph" into the chunks list
-            current_chunk = [word]  # Resets and starts a new list with just the current word item
-
-        # triggers when the word fits or in the case of a very long first word
-        else:
-            current_chunk.append(word)
-
-    # It's execute on the final chunk if this didn't get to the 3k limit characters and is left over
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-
-    return chunks
-
-
-# ──────────────────────────────────────────────────────────────────────────
-#                           Convertion Functions
-# ──────────────────────────────────────────────────────────────────────────
-
-# Async keyword tells the program that this is and asynchronous function
-async def text_to_speech_async(text: str, output_path: str, voice: str, rate: int):
-    """Convert text to speech using edge-tts."""
-    # 'communicate' is the object that talks to the Microsoft Server
-    communicate = edge_tts.Communicate(text, voice=voice, rate=f"{rate:+d}%")
-    # await can only be used inside an async function, and it waits for it's code to return a response
-    await communicate.save(output_path)
-
-
-def convert_pdf_to_audiobook(pdf_path: str, output_dir: str, voice: str, rate: int, progress_callback, status_callback):
-    """Main conversion logic running in background thread."""
-    try:
-        status_callback("Extracting text from PDF...")          # <========= CALLBACK STATUS
-        progress_callback(10)                       # <========= callback
-
-        text = extract_text_from_pdf(pdf_path)      # Helper function
-        if not text:
-            raise ValueError("No text could be extracted from the PDF.")
-
-        status_callback("Preparing text chunks...")    # <========= CALLBACK STATUS
-        progress_callback(20)   # <========= callback
-
-        chunks = split_text_into_chunks(text)       # Helper function
-        total_chunks = len(chunks)
-
-        # Automatic unique name generation
-        pdf_name = Path(pdf_path).stem
-        timestamp = datetime.now().strftime("%b-%d-%Y_%I%p")
-        output_file = os.path.join(output_dir, f"{pdf_name}_audiobook_{timestamp}.mp3")
-
-
-        temp_files = []
-
-        for i, chunk in enumerate(chunks):
-            # Progress bar progression logic
-            status_callback(f"Converting part {i+1} of {total_chunks}...")  # <========= CALLBACK STATUS
-            progress = 20 + int(70 * ((i + 1) / total_chunks))
-
-            temp_path = os.path.join(output_dir, f"temp_chunk_{i}.mp3")  #  returns the full path name for each chunk
-
-            # asyncio.run lets the normal convert_pdf function trigger the async logic of text_to_speech_async.
-            # binary Data convertion
-            asyncio.run(text_to_speech_async(chunk, temp_path, voice, rate))
-
-            temp_files.append(temp_path)
-
-            progress_callback(progress)             # <========= callback
-
-
-
-        status_callback("Finalizing audiobook file...")     # <========= CALLBACK STATUS
-
-        with open(output_file, "wb") as outfile:  # "wb" (Write Binary) mode
-            for temp_file in temp_files:
-                with open(temp_file, "rb") as infile:   # "rb" (read Binary) mode
-                    outfile.write(infile.read())
-
-        # Cleanup section of the generated chunks
-        for temp in temp_files:
-            if os.path.exists(temp):
-                os.remove(temp)
-
-        progress_callback(100)  # <========= callback
-
-        status_callback(f"✅ Audiobook created successfully!\n{output_file}")    # <========= CALLBACK STATUS
-
-
-
-
-    except Exception as e:
-        status_callback(f"❌ Error: {str(e)}")       # <========= CALLBACK STATUS
-        progress_callback(0)    # <========= callback
-
-
 
 # ──────────────────────────────────────────────────────────────────────────
 #                           MAIN APPLICATION CLASS
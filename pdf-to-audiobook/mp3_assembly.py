@@ -0,0 +1,240 @@
+# ---------------------------- MP3 ASSEMBLY ------------------------------- #
+# Joins the synthesized parts of a book into one MP3 file.
+#
+#   - Each part is streamed into the output in COPY_BUFFER_BYTES pieces (os.sendfile
+#     where the OS copies file to file in the kernel, a fixed buffer elsewhere): memory
+#     use is the same for a 5-minute text and a 40-hour book.
+#   - What is not audio is dropped from each part: ID3v2 tags at the start, an ID3v1 tag
+#     at the end, and the Xing/Info/VBRI frame (a player would read it as the length of
+#     the whole file and stop or seek wrongly after the first part).
+#   - The book gets ONE ID3v2.3 tag: its title, its length, and optionally a chapter
+#     marker (CHAP frame, plus a CTOC table of contents) per PDF outline entry, so
+#     podcast/audiobook players can jump between chapters.
+
+import errno
+import os
+import struct
+
+# Bytes copied per system call / read
+COPY_BUFFER_BYTES = 1024 * 1024
+
+# Bytes read at the start of each part's audio to find the first frame (and its Xing header)
+FRAME_PROBE_BYTES = 4096
+
+# CTOC lists its entries with a one-byte count
+MAX_TOC_ENTRIES = 255
+
+# MPEG audio Layer III tables, by version bits (0: MPEG-2.5, 2: MPEG-2, 3: MPEG-1)
+_BITRATES_KBPS = {3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+                  2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)}
+_BITRATES_KBPS[0] = _BITRATES_KBPS[2]
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _syncsafe(data: bytes) -> int:
+    """An ID3v2 size: 4 bytes of 7 bits each."""
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _parse_frame_header(header: bytes):
+    """(frame length, samples per frame, sample rate, bitrate bps, Xing offset) of a Layer III frame header, or None."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None   # Reserved values, free format, or not Layer III
+    bitrate = _BITRATES_KBPS[version][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x01
+    mono = header[3] >> 6 == 0x03
+    if version == 3:
+        length, samples, side_info = 144 * bitrate // sample_rate + padding, 1152, 17 if mono else 32
+    else:
+        length, samples, side_info = 72 * bitrate // sample_rate + padding, 576, 9 if mono else 17
+    return length, samples, sample_rate, bitrate, 4 + side_info
+
+
+def audio_range(f, size: int):
+    """
+    Where the audio frames of an MP3 file are, without its tags and its Xing/Info frame.
+
+    Args:
+        f: The file, opened in binary mode.
+        size (int): Its size in bytes.
+
+    Returns:
+        tuple[int, int, float]: (first audio byte, end of the audio, duration in seconds). The
+        duration comes from the Xing/VBRI frame count when there is one, else from the bitrate
+        of the first frame (the parts are constant bitrate); 0 if no frame is found.
+    """
+    start = 0
+    f.seek(0)
+    header = f.read(10)
+    while header[:3] == b"ID3" and len(header) == 10:   # Some encoders write more than one tag
+        start += 10 + _syncsafe(header[6:10]) + (10 if header[5] & 0x10 else 0)   # + footer
+        f.seek(start)
+        header = f.read(10)
+
+    end = size
+    if end - start >= 128:
+        f.seek(end - 128)
+        if f.read(3) == b"TAG":
+            end -= 128
+
+    f.seek(start)
+    probe = f.read(min(FRAME_PROBE_BYTES, max(0, end - start)))
+    for i in range(max(0, len(probe) - 3)):
+        frame = _parse_frame_header(probe[i:i + 4])
+        if frame is not None:
+            break
+    else:
+        return start, end, 0.0
+    length, samples, sample_rate, bitrate, xing_offset = frame
+    audio_start = start + i
+
+    # A Xing/Info (LAME) or VBRI header frame carries no audio: skip it, but use its frame count
+    tag = probe[i + xing_offset:i + xing_offset + 4]
+    frames = None
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", probe[i + xing_offset + 4:i + xing_offset + 8])[0]
+        if flags & 0x01:
+            frames = struct.unpack(">I", probe[i + xing_offset + 8:i + xing_offset + 12])[0]
+        audio_start += length
+    elif probe[i + 36:i + 40] == b"VBRI":
+        frames = struct.unpack(">I", probe[i + 50:i + 54])[0]
+        audio_start += length
+
+    if frames is not None:
+        seconds = frames * samples / sample_rate
+    else:
+        seconds = max(0, end - audio_start) * 8 / bitrate
+    return audio_start, max(audio_start, end), seconds
+
+
+def _copy_range(src, dst, offset: int, count: int):
+    """Copy count bytes of src from offset to dst's position, COPY_BUFFER_BYTES at a time."""
+    if hasattr(os, "sendfile"):
+        try:
+            while count > 0:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, min(count, COPY_BUFFER_BYTES))
+                if sent == 0:
+                    break
+                offset += sent
+                count -= sent
+            return
+        except OSError as e:
+            # sendfile only works file → socket here (macOS, older kernels): copy through a buffer
+            if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP):
+                raise
+    src.seek(offset)
+    while count > 0:
+        data = src.read(min(count, COPY_BUFFER_BYTES))
+        if not data:
+            break
+        dst.write(data)
+        count -= len(data)
+
+
+# ---------------------------- ID3v2.3 TAG ------------------------------- #
+def _frame(frame_id: bytes, body: bytes) -> bytes:
+    """One ID3v2.3 frame (plain 32-bit size, no flags)."""
+    return frame_id + struct.pack(">I", len(body)) + b"\x00\x00" + body
+
+
+def _text_frame(frame_id: bytes, text: str) -> bytes:
+    """A text frame in UTF-16 with BOM (ID3v2.3 has no UTF-8)."""
+    return _frame(frame_id, b"\x01" + text.encode("utf-16"))
+
+
+def build_id3_tag(title: str = None, duration_ms: int = 0, chapters=()) -> bytes:
+    """
+    An ID3v2.3 tag with the book's title (TIT2), length (TLEN) and chapters.
+
+    Args:
+        title (str | None): Title of the book.
+        duration_ms (int): Length of the audio, in milliseconds.
+        chapters (Iterable[tuple[str, int, int]]): (title, start ms, end ms) of each chapter.
+            Each becomes a CHAP frame; a CTOC frame lists them in order (up to MAX_TOC_ENTRIES).
+    """
+    frames = []
+    if title:
+        frames.append(_text_frame(b"TIT2", title))
+    if duration_ms:
+        frames.append(_frame(b"TLEN", b"\x00" + str(duration_ms).encode("ascii")))
+
+    element_ids = []
+    for number, (chapter_title, start_ms, end_ms) in enumerate(chapters):
+        element_id = f"ch{number}".encode("ascii")
+        element_ids.append(element_id)
+        # Element ID, start/end time, start/end byte offset (0xFFFFFFFF: use the times), sub-frames
+        body = element_id + b"\x00" + struct.pack(">IIII", start_ms, end_ms, 0xFFFFFFFF, 0xFFFFFFFF)
+        frames.append(_frame(b"CHAP", body + _text_frame(b"TIT2", chapter_title)))
+    if element_ids:
+        entries = element_ids[:MAX_TOC_ENTRIES]
+        # Top-level (0x02) and ordered (0x01) table of contents
+        body = b"toc\x00" + bytes((0x03, len(entries))) + b"".join(e + b"\x00" for e in entries)
+        frames.insert(0, _frame(b"CTOC", body))
+
+    if not frames:
+        return b""
+    data = b"".join(frames)
+    size = len(data)
+    syncsafe = bytes(((size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F))
+    return b"ID3\x03\x00\x00" + syncsafe + data
+
+
+def assemble_mp3(part_paths: list, output_path: str, title: str = None, chapters=()) -> float:
+    """
+    Join MP3 parts into one file with a single ID3v2 tag, streaming (constant memory).
+
+    The output is written next to output_path under a temporary name and renamed when
+    complete: an interrupted run never leaves a truncated audiobook behind.
+
+    Args:
+        part_paths (list[str]): MP3 parts, in order.
+        output_path (str): The audiobook.
+        title (str | None): Title tag of the audiobook.
+        chapters (Iterable[tuple[str, int]]): (title, index of the part the chapter starts
+            with), in order; becomes chapter markers.
+
+    Returns:
+        float: Duration of the audiobook, in seconds.
+    """
+    # 1. Where each part's audio is and how long it lasts (a few KB read per part)
+    layouts = []
+    for path in part_paths:
+        with open(path, "rb") as f:
+            layouts.append(audio_range(f, os.fstat(f.fileno()).st_size))
+
+    # 2. Part index → start time, for the chapter markers
+    starts_ms = []
+    elapsed = 0.0
+    for _, _, seconds in layouts:
+        starts_ms.append(round(elapsed * 1000))
+        elapsed += seconds
+    duration_ms = round(elapsed * 1000)
+    chapters = [(chapter_title, index) for chapter_title, index in chapters if index < len(part_paths)]
+    markers = [(chapter_title, starts_ms[index],
+                starts_ms[chapters[n + 1][1]] if n + 1 < len(chapters) else duration_ms)
+               for n, (chapter_title, index) in enumerate(chapters)]
+
+    # 3. The tag, then the audio of every part
+    temp_path = f"{output_path}.{os.getpid()}.part"
+    try:
+        with open(temp_path, "wb") as outfile:  # "wb" (Write Binary) mode
+            outfile.write(build_id3_tag(title, duration_ms, markers))
+            outfile.flush()   # sendfile writes at the file descriptor's position, past the buffer
+            for path, (start, end, _) in zip(part_paths, layouts):
+                with open(path, "rb") as infile:   # "rb" (read Binary) mode
+                    _copy_range(infile, outfile, start, end - start)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return elapsed